@@ -0,0 +1,63 @@
+"""Compares the re-encoding crop with the lossless jpegtran crop.
+
+Usage (from the repository root):
+    python -m benchmarks.crop_benchmark [--images DIR] [--repeat N] [--crop L R T B]
+
+Each image is copied to a temporary directory before every run, so both modes
+always crop the original capture. Reports the mean wall time and the resulting
+file size for each mode.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from src.utils.image_processing import crop_image, find_jpegtran
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark crop_image re-encoding vs lossless modes.")
+    parser.add_argument('--images', default=os.path.join("resources", "img", "sample_images"))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--crop', type=int, nargs=4, default=[100, 100, 50, 50],
+                        metavar=('LEFT', 'RIGHT', 'TOP', 'BOTTOM'))
+    return parser.parse_args()
+
+
+def run_mode(image_path, crop, lossless, repeat, work_dir):
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        target = os.path.join(work_dir, os.path.basename(image_path))
+        shutil.copyfile(image_path, target)
+        started = time.perf_counter()
+        crop_image(target, *crop, lossless=lossless)
+        timings.append(time.perf_counter() - started)
+        size = os.path.getsize(target)
+    return statistics.mean(timings), size
+
+
+def main():
+    args = parse_args()
+    images = sorted(
+        os.path.join(args.images, f) for f in os.listdir(args.images) if f.lower().endswith(('.jpg', '.jpeg')))
+    modes = [('reencode', False)]
+    if find_jpegtran():
+        modes.append(('lossless', True))
+    else:
+        print("jpegtran not found: lossless mode skipped.")
+
+    print(f"{'image':<20} {'mode':<10} {'original, B':>12} {'result, B':>12} {'mean, ms':>10}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for image_path in images:
+            original_size = os.path.getsize(image_path)
+            for mode_name, lossless in modes:
+                mean_time, size = run_mode(image_path, args.crop, lossless, args.repeat, work_dir)
+                print(f"{os.path.basename(image_path):<20} {mode_name:<10} {original_size:>12} {size:>12} "
+                      f"{mean_time * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Compares DataBaseManager lookups on the original schema with the migrated one.
+
+Usage (from the repository root):
+    python -m benchmarks.db_benchmark [--intervals N] [--wells N] [--repeat N]
+
+Fills a temporary project database with N intervals spread over the wells, two
+photos per interval. The "before" run drops the indexes and switches back to the
+default rollback journal and synchronous mode; the "after" run uses the database
+as DataBaseManager sets it up. Reports the mean time of the hot queries and of
+adding one interval.
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+from src.models.interval import BaseIntervalSettings, IntervalCondition
+from src.models.project import Project
+from src.utils.data_base_manager import DataBaseManager
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark DataBaseManager before and after the SQLite tuning.")
+    parser.add_argument('--intervals', type=int, default=100000)
+    parser.add_argument('--wells', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    return parser.parse_args()
+
+
+def fill(db_manager, intervals, wells):
+    well_ids = [db_manager.add_well(f"well_{n}") for n in range(wells)]
+    per_well = intervals // wells
+    db_manager.cursor.executemany(
+        "INSERT INTO Intervals (version, well_id, interval_from, interval_to, condition, is_marked) "
+        "VALUES (1, ?, ?, ?, 'WET', 0)",
+        ((well_id, n * 0.5, n * 0.5 + 0.5) for well_id in well_ids for n in range(per_well)))
+    db_manager.cursor.executemany(
+        "INSERT INTO Photos (photo_path, interval_id) VALUES (?, ?)",
+        ((f"/media/photo_{interval_id}_camera{camera}.jpg", interval_id)
+         for interval_id in range(1, per_well * wells + 1) for camera in (0, 1)))
+    db_manager.connection.commit()
+    return well_ids, per_well
+
+
+def untune(db_manager):
+    """Turns the database back into the shape it had before migration 2."""
+    db_manager.cursor.execute("DROP INDEX Intervals_well_position")
+    db_manager.cursor.execute("DROP INDEX Photos_interval")
+    db_manager.cursor.execute("PRAGMA journal_mode = DELETE")
+    db_manager.cursor.execute("PRAGMA synchronous = FULL")
+    db_manager.cursor.execute("PRAGMA cache_size = -2000")
+    db_manager.connection.commit()
+
+
+def measure(function, repeat):
+    timings = []
+    for n in range(repeat):
+        started = time.perf_counter()
+        function(n)
+        timings.append(time.perf_counter() - started)
+    return statistics.mean(timings) * 1000
+
+
+def run(label, tuned, args):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_manager = DataBaseManager(Project("bench", work_dir))
+        well_ids, per_well = fill(db_manager, args.intervals, args.wells)
+        if not tuned:
+            untune(db_manager)
+        well_id = well_ids[len(well_ids) // 2]
+        results = {
+            'get_all_intervals_by_well_id': measure(
+                lambda n: db_manager.get_all_intervals_by_well_id(well_id), args.repeat),
+            'get_all_photos_by_interval_id': measure(
+                lambda n: db_manager.get_all_photos_by_interval_id(1 + n * 997 % args.intervals), args.repeat),
+            'get_max_version': measure(
+                lambda n: db_manager.get_max_version(BaseIntervalSettings(n * 0.5, n * 0.5 + 0.5), well_id),
+                args.repeat),
+            'add_interval': measure(
+                lambda n: db_manager.add_interval(
+                    well_id, BaseIntervalSettings(n * 0.5, n * 0.5 + 0.5, IntervalCondition.WET, False)),
+                args.repeat),
+        }
+        db_manager.close_connection()
+    print(f"{label}:")
+    for name, milliseconds in results.items():
+        print(f"  {name:32} {milliseconds:9.3f} ms")
+    return results
+
+
+def main():
+    args = parse_args()
+    print(f"{args.intervals} intervals in {args.wells} wells, mean of {args.repeat} runs")
+    before = run("before (no indexes, rollback journal)", False, args)
+    after = run("after (indexes, WAL)", True, args)
+    print("speedup:")
+    for name in before:
+        print(f"  {name:32} {before[name] / after[name]:9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Compares full-size and reduced-scale decoding of photos for display.
+
+Usage (from the repository root):
+    python -m benchmarks.decode_benchmark [--images DIR] [--size PX] [--repeat N]
+
+Every method produces an image that fits in a SIZE x SIZE square, as the photo
+windows need. "full" decodes the whole frame and scales it down afterwards, as
+the windows did before; "draft" and "scaled reader" let libjpeg decode at 1/2,
+1/4 or 1/8 scale. Each method is run in a separate process, so the reported peak
+RSS (ru_maxrss, Linux only) belongs to that method; "baseline" is the process
+with the modules imported but nothing decoded.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from PIL import Image
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+
+from src.utils.image_processing import make_preview
+from src.utils.qt_image import read_scaled_qimage
+
+
+def decode_full_pil(path, size):
+    with Image.open(path) as img:
+        img.load()
+        preview = img.convert('RGB')
+    preview.thumbnail((size, size), Image.BILINEAR)
+    return preview.size
+
+
+def decode_full_qt(path, size):
+    image = QImage(path).scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image.width(), image.height()
+
+
+def decode_draft_pil(path, size):
+    return make_preview(path, size).size
+
+
+def decode_scaled_qt(path, size):
+    image = read_scaled_qimage(path, size)
+    return image.width(), image.height()
+
+
+METHODS = {
+    'baseline': None,
+    'full (PIL)': decode_full_pil,
+    'full (QImage)': decode_full_qt,
+    'draft (PIL)': decode_draft_pil,
+    'scaled reader (Qt)': decode_scaled_qt,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark full vs reduced-scale JPEG decoding for display.")
+    parser.add_argument('--images', default=os.path.join("resources", "img", "sample_images"))
+    parser.add_argument('--size', type=int, default=480)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--method', choices=METHODS, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def run_method(method, images, size, repeat):
+    """Runs in the child process and returns the timings of one method."""
+    decode = METHODS[method]
+    timings = []
+    result_size = None
+    if decode is not None:
+        for _ in range(repeat):
+            for path in images:
+                started = time.perf_counter()
+                result_size = decode(path, size)
+                timings.append(time.perf_counter() - started)
+    return {
+        'mean': statistics.mean(timings) if timings else 0.0,
+        'size': result_size,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    args = parse_args()
+    images = sorted(
+        os.path.join(args.images, f) for f in os.listdir(args.images) if f.lower().endswith(('.jpg', '.jpeg')))
+    if args.method:
+        print(json.dumps(run_method(args.method, images, args.size, args.repeat)))
+        return
+
+    print(f"{len(images)} images from {args.images} fitted into {args.size} px, {args.repeat} runs each")
+    print(f"{'method':<20} {'mean, ms':>10} {'result':>12} {'peak RSS, MB':>13}")
+    for method in METHODS:
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.decode_benchmark', '--images', args.images, '--size', str(args.size),
+             '--repeat', str(args.repeat), '--method', method],
+            check=True, stdout=subprocess.PIPE, text=True).stdout
+        result = json.loads(output)
+        result_size = 'x'.join(map(str, result['size'])) if result['size'] else '-'
+        print(f"{method:<20} {result['mean'] * 1000:>10.2f} {result_size:>12} {result['max_rss_kb'] / 1024:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
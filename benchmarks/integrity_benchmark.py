@@ -0,0 +1,84 @@
+"""Measures the time and peak memory of an integrity scan of a large project.
+
+Usage (from the repository root):
+    python -m benchmarks.integrity_benchmark [--photos N] [--wells N] [--workers N]
+
+Fills a temporary project with N photos, two per interval, stored as tiny JPEG
+files in the named layout. One photo in a thousand is removed from the disk and
+as many orphan files are added. Reports the scan time, the problems found and
+the peak resident memory of the process before and during the scan.
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from src.models.project import Project
+from src.utils.data_base_manager import DataBaseManager
+from src.utils.integrity_scanner import IntegrityScanner
+
+# The smallest file the truncation check accepts: start and end markers
+JPEG_STUB = b'\xff\xd8\xff\xd9'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the integrity scanner on a large project.")
+    parser.add_argument('--photos', type=int, default=500000)
+    parser.add_argument('--wells', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    return parser.parse_args()
+
+
+def fill(project, photos, wells):
+    db_manager = DataBaseManager(project)
+    per_well = photos // wells // 2
+    for n in range(wells):
+        well_id = db_manager.add_well(f"well_{n}")
+        folder = os.path.join(project.media_path, project.name, f"well_{n}")
+        os.makedirs(folder)
+        rows = []
+        for index in range(per_well):
+            db_manager.cursor.execute(
+                "INSERT INTO Intervals (version, well_id, interval_from, interval_to, condition, is_marked) "
+                "VALUES (1, ?, ?, ?, 'WET', 0)", (well_id, index * 0.5, index * 0.5 + 0.5))
+            interval_id = db_manager.cursor.lastrowid
+            for camera in (1, 2):
+                path = os.path.join(folder, f"photo_{index}_camera{camera}.jpg")
+                rows.append((path, interval_id, len(JPEG_STUB)))
+                if index % 500 or camera == 2:
+                    with open(path, 'wb') as file:
+                        file.write(JPEG_STUB)
+        db_manager.cursor.executemany("INSERT INTO Photos (photo_path, interval_id, size) VALUES (?, ?, ?)", rows)
+        db_manager.connection.commit()
+        for index in range(0, per_well, 500):
+            path = os.path.join(folder, f"orphan_{index}.jpg")
+            with open(path, 'wb') as file:
+                file.write(JPEG_STUB)
+    db_manager.close_connection()
+
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        project = Project("bench", directory)
+        started = time.perf_counter()
+        fill(project, args.photos, args.wells)
+        print(f"Filled {args.photos} photos in {time.perf_counter() - started:.1f} s")
+        before = peak_memory_mb()
+        # The files were all just written, none of them belongs to a commit in progress
+        scanner = IntegrityScanner(project, workers=args.workers, settle_seconds=0)
+        started = time.perf_counter()
+        report = scanner.run()
+        elapsed = time.perf_counter() - started
+        print(report.summary().splitlines()[0])
+        print(', '.join(f"{problem}: {count}" for problem, count in report.counts.items()))
+        print(f"Scan: {elapsed:.1f} s, peak memory {before:.0f} MB before the scan, {peak_memory_mb():.0f} MB after")
+
+
+if __name__ == '__main__':
+    main()
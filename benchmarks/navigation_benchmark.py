@@ -0,0 +1,106 @@
+"""Measures application startup and how long switching between the windows of the interval loop takes.
+
+Usage (from the repository root):
+    python -m benchmarks.navigation_benchmark [--cycles N]
+
+Runs the camera emulator on a temporary project and repeats the loop that is
+walked for every interval: new interval -> photo review -> (reject) new interval
+-> interval -> new interval. Each step is timed from the button press or window
+switch until the events it posted, including painting, are processed. The loop
+is run without and with the window cache. Startup is timed from creating App until
+the start window has been painted. Set QT_QPA_PLATFORM=offscreen to run it without
+a display.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+from src.core.app import App
+from src.core.window_types import WindowType
+from src.models.interval import BaseIntervalSettings
+from src.models.well import Well
+from src.utils.config_manager import ConfigManager
+from src.utils.data_base_manager import DataBaseManager
+
+SAMPLE_IMAGES = os.path.join("resources", "img", "sample_images")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark navigation between the interval windows.")
+    parser.add_argument('--cycles', type=int, default=10)
+    return parser.parse_args()
+
+
+def add_interval_with_photos(db_manager, well_id):
+    images = sorted(os.path.abspath(os.path.join(SAMPLE_IMAGES, name)) for name in os.listdir(SAMPLE_IMAGES))
+    return db_manager.commit_interval(well_id, BaseIntervalSettings(), images[:2])
+
+
+def wait_until(qt_app, condition, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Condition not reached in time")
+        qt_app.processEvents()
+
+
+def timed(qt_app, timings, step, action):
+    started = time.perf_counter()
+    action()
+    qt_app.processEvents()
+    timings.setdefault(step, []).append(time.perf_counter() - started)
+
+
+def run_loop(qt_app, app, project, well, interval, cycles):
+    timings = {}
+    current = app.stacked_widget.currentWidget
+    app.switch_interface(WindowType.NEW_INTERVAL_WINDOW, project, well, BaseIntervalSettings())
+    for _ in range(cycles):
+        timed(qt_app, timings, 'new interval -> photo review',
+              lambda: current().ui.create_new_interval_button.click())
+        wait_until(qt_app, lambda: current().ui.no_pushButton.isEnabled())
+        timed(qt_app, timings, 'photo review -> new interval', lambda: current().ui.no_pushButton.click())
+        timed(qt_app, timings, 'new interval -> interval',
+              lambda: app.switch_interface(WindowType.INTERVAL_WINDOW, project, well, interval))
+        timed(qt_app, timings, 'interval -> new interval', lambda: current().ui.next_interval_pushButton.click())
+    return timings
+
+
+def main():
+    args = parse_args()
+    qt_app = QApplication(sys.argv)
+    started = time.perf_counter()
+    app = App(sys.argv, ConfigManager(), emulate=True, resolution="1280x720")
+    qt_app.processEvents()
+    startup = time.perf_counter() - started
+    with tempfile.TemporaryDirectory() as work_dir:
+        project = app.create_and_verify_project("bench", work_dir)
+        well_id = app.database_service.write(DataBaseManager.add_well, "well").result()
+        well = Well(well_id, "well")
+        interval = app.database_service.write(add_interval_with_photos, well_id).result()
+
+        app.cached_window_types = set()
+        before = run_loop(qt_app, app, project, well, interval, args.cycles)
+        app.cached_window_types = {WindowType.NEW_INTERVAL_WINDOW, WindowType.PHOTO_REVIEW_WINDOW,
+                                   WindowType.INTERVAL_WINDOW}
+        after = run_loop(qt_app, app, project, well, interval, args.cycles)
+
+        app.switch_interface(WindowType.START_WINDOW)
+        qt_app.processEvents()
+        app.close_database_connection()
+    app.camera_io.stop()
+
+    print(f"Startup: {startup * 1000:.1f} ms")
+    print(f"Mean navigation time over {args.cycles} cycles, ms")
+    print(f"  {'step':32} {'rebuilt':>9} {'cached':>9}")
+    for step in before:
+        print(f"  {step:32} {statistics.mean(before[step]) * 1000:9.1f} {statistics.mean(after[step]) * 1000:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Measures how long opening a well with many intervals takes.
+
+Usage (from the repository root):
+    python -m benchmarks.well_window_benchmark [--intervals N] [--repeat N]
+
+Creates a temporary project with one well of N intervals and runs the camera
+emulator. "buttons" loads all intervals and creates one QPushButton per interval,
+as the well window did before the lazy list; "lazy list" opens WellWindow and
+waits until its first page of intervals is shown. Set QT_QPA_PLATFORM=offscreen
+to run it without a display.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+
+from PyQt5.QtWidgets import QApplication, QPushButton, QVBoxLayout, QWidget
+
+from src.core.app import App
+from src.core.window_types import WindowType
+from src.models.well import Well
+from src.utils.config_manager import ConfigManager
+from src.utils.data_base_manager import DataBaseManager
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark opening a well with many intervals.")
+    parser.add_argument('--intervals', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    return parser.parse_args()
+
+
+def fill_well(db_manager, name, intervals):
+    well_id = db_manager.add_well(name)
+    db_manager.cursor.executemany(
+        "INSERT INTO Intervals (version, well_id, interval_from, interval_to, condition, is_marked) "
+        "VALUES (1, ?, ?, ?, 'WET', 0)",
+        ((well_id, n * 0.5, n * 0.5 + 0.5) for n in range(intervals)))
+    db_manager.connection.commit()
+    return well_id
+
+
+def wait_until(qt_app, condition, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Condition not reached in time")
+        qt_app.processEvents()
+
+
+def open_with_buttons(qt_app, app, well):
+    started = time.perf_counter()
+    intervals = app.database_service.read(DataBaseManager.get_all_intervals_by_well_id, well.id).result()
+    widget = QWidget()
+    layout = QVBoxLayout(widget)
+    for interval in intervals:
+        layout.addWidget(QPushButton(interval.get_full_name()))
+    widget.show()
+    qt_app.processEvents()
+    elapsed = time.perf_counter() - started
+    widget.deleteLater()
+    return elapsed
+
+
+def open_lazy_list(qt_app, app, project, well):
+    started = time.perf_counter()
+    app.switch_interface(WindowType.WELL_WINDOW, project, well)
+    window = app.stacked_widget.currentWidget()
+    wait_until(qt_app, lambda: window.intervals_model.rowCount() > 0)
+    qt_app.processEvents()
+    return time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+    qt_app = QApplication(sys.argv)
+    app = App(sys.argv, ConfigManager(), emulate=True, resolution="1280x720")
+    with tempfile.TemporaryDirectory() as work_dir:
+        project = app.create_and_verify_project("bench", work_dir)
+        well_name = "deep_well"
+        well = Well(app.database_service.write(fill_well, well_name, args.intervals).result(), well_name)
+
+        results = {
+            'buttons': [open_with_buttons(qt_app, app, well) for _ in range(args.repeat)],
+            'lazy list': [open_lazy_list(qt_app, app, project, well) for _ in range(args.repeat)],
+        }
+        app.switch_interface(WindowType.START_WINDOW)
+        qt_app.processEvents()
+        app.close_database_connection()
+
+    print(f"Opening a well with {args.intervals} intervals, mean of {args.repeat} runs")
+    for name, timings in results.items():
+        print(f"  {name:12} {statistics.mean(timings) * 1000:9.1f} ms")
+    app.camera_io.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,18 @@
 import sys
+import time
 import argparse
 import logging
 
 from src.utils.setup_logging import setup_logging
 from src.utils.config_manager import ConfigManager
+from src.utils.tracing import tracer, DEFAULT_CAPACITY
+from src.models.project import Project
+from src.models.interval import IntervalCondition
+from src.utils.integrity_scanner import IntegrityScanner
+from src.utils.project_exporter import ProjectExporter
+from src.utils.batch_runner import BatchRunner, make_interval_settings, BATCH_TEMP_STORAGE, BATCH_SPOOL_STORAGE
+from src.utils.photo_manager.photo_manager import PhotoManager, make_fake_resident_command
+from src.utils.photo_manager.photo_manager_emulator import PhotoManagerEmulator
 from src.core.app import App
 
 from PyQt5.QtWidgets import QApplication
@@ -15,26 +24,157 @@ def parse_args():
     parser.add_argument('--log-level', type=str, default='INFO',
                         help='Logging level (e.g., DEBUG, INFO, WARNING, ERROR, CRITICAL)')
     parser.add_argument('--emulate', action='store_true', help='Use camera emulator instead of real cameras')
+    parser.add_argument('--fake-cameras', action='store_true',
+                        help='Use fake resident camera processes instead of real cameras')
+    parser.add_argument('--dev', action='store_true',
+                        help='Development mode: reload resources/styles/styles.qss whenever it changes')
+    parser.add_argument('--trace', type=str, metavar='DIR',
+                        help='Record timing spans and write a CSV per interval and trace.json into DIR')
+    parser.add_argument('--trace-buffer', type=int, default=DEFAULT_CAPACITY,
+                        help='Number of most recent spans kept in memory while tracing')
+
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND',
+                                     help='Run a command without the user interface instead of the application')
+    scan_parser = commands.add_parser('scan', help='Check the photos of a project against its database')
+    scan_parser.add_argument('project', help='Path to the project file <name>.json')
+    scan_parser.add_argument('--fix', action='store_true',
+                             help='Remove missing photos from the database, move orphan files to the orphans '
+                                  'folder, remove orphan previews and fill in missing checksums')
+    scan_parser.add_argument('--verify', action='store_true', help='Also compare every photo with its checksum')
+    scan_parser.add_argument('--workers', type=int, help='Number of threads listing and checking files')
+    scan_parser.add_argument('--report', type=str, metavar='CSV', help='Write every problem found into a CSV file')
+    export_parser = commands.add_parser(
+        'export', help='Write a project with its database snapshot and a manifest into a .tar or .zip archive')
+    export_parser.add_argument('project', help='Path to the project file <name>.json')
+    export_parser.add_argument('output', help='Archive to write, ending in .tar or .zip; '
+                                              'an interrupted .tar export continues where it stopped')
+    export_parser.add_argument('--well', action='append', metavar='NAME', dest='wells',
+                               help='Export only this well; can be given several times')
+
+    batch_parser = commands.add_parser(
+        'batch', help='Capture intervals or process stored photos without a display; '
+                      'give --emulate or --fake-cameras before "batch" to capture without cameras')
+    batch_commands = batch_parser.add_subparsers(dest='batch_command', metavar='BATCH_COMMAND', required=True)
+    capture_parser = batch_commands.add_parser('capture', help='Capture consecutive intervals of a well')
+    capture_parser.add_argument('project', help='Path to the project file <name>.json')
+    capture_parser.add_argument('--well', required=True, help='Well to capture; created if it does not exist')
+    capture_parser.add_argument('--from', type=float, default=0.0, dest='interval_from',
+                                help='Start of the first interval')
+    capture_parser.add_argument('--to', type=float, required=True, dest='interval_to',
+                                help='End of the last interval')
+    capture_parser.add_argument('--step', type=float, help='Length of an interval; [logic] interval_step by default')
+    capture_parser.add_argument('--condition', choices=['WET', 'DRY'], default='WET', help='Condition of the core')
+    capture_parser.add_argument('--marked', action='store_true', help='Mark the intervals')
+    recrop_parser = batch_commands.add_parser(
+        'recrop', help='Crop the stored photos saved without a crop with the crop from config.ini')
+    recrop_parser.add_argument('project', help='Path to the project file <name>.json')
+    recrop_parser.add_argument('--well', help='Re-crop only this well')
+    recrop_parser.add_argument('--force', action='store_true',
+                               help='Also crop the photos saved before the crop of every photo was recorded; '
+                                    'they may be cropped already')
+    previews_parser = batch_commands.add_parser('previews', help='Make the missing and stale previews of photos')
+    previews_parser.add_argument('project', help='Path to the project file <name>.json')
+    previews_parser.add_argument('--well', help='Make the previews of this well only')
+    previews_parser.add_argument('--force', action='store_true', help='Make every preview again')
     args = parser.parse_args()
     return args
 
 
+def run_scan(args, config_manager):
+    scanner = IntegrityScanner(
+        Project.load(args.project),
+        workers=args.workers or int(config_manager.get('integrity', 'workers', fallback='4')),
+        verify=args.verify or config_manager.get('integrity', 'verify', fallback='false').lower() == 'true',
+        fix=args.fix,
+        report_path=args.report)
+    report = scanner.run()
+    print(report.summary())
+    return 1 if report.has_problems() else 0
+
+
+def run_export(args):
+    exporter = ProjectExporter(Project.load(args.project), args.output, args.wells)
+    photos = exporter.run()
+    print(f"Exported {photos} photos into {args.output}.")
+    if exporter.missing:
+        print(f"{exporter.missing} photos were missing and not exported; run the scan command for details.")
+    return 0
+
+
+def create_batch_photo_manager(args, config_manager):
+    if args.emulate:
+        return PhotoManagerEmulator(BATCH_TEMP_STORAGE)
+    if args.fake_cameras:
+        return PhotoManager(BATCH_TEMP_STORAGE, command_factory=make_fake_resident_command,
+                            spool_storage=BATCH_SPOOL_STORAGE, warmup=0.5)
+    return PhotoManager(BATCH_TEMP_STORAGE,
+                        resident=config_manager.get('camera', 'resident', fallback='true').lower() == 'true',
+                        spool_storage=BATCH_SPOOL_STORAGE,
+                        warmup=float(config_manager.get('camera', 'warmup', fallback='2.0')))
+
+
+def run_batch(args, config_manager):
+    runner = BatchRunner(Project.load(args.project), config_manager)
+    try:
+        if args.batch_command == 'recrop':
+            print(f"Re-cropped {runner.recrop(args.well, args.force)} photos.")
+            return 0
+        if args.batch_command == 'previews':
+            print(f"Made the previews of {runner.regenerate_previews(args.well, args.force)} photos.")
+            return 0
+    except ValueError as e:
+        print(e)
+        return 1
+    step = args.step or float(config_manager.get('logic', 'interval_step', fallback='0.5'))
+    interval_settings = make_interval_settings(args.interval_from, args.interval_to, step,
+                                               IntervalCondition[args.condition], args.marked)
+    photo_manager = create_batch_photo_manager(args, config_manager)
+    try:
+        intervals = runner.capture(photo_manager, args.well, interval_settings)
+    finally:
+        photo_manager.shutdown()
+    print(f"Captured {len(intervals)} of {len(interval_settings)} intervals.")
+    return 1 if runner.failed else 0
+
+
 if __name__ == '__main__':
+    started_at = time.perf_counter()
     args = parse_args()
     setup_logging(args.log_level)
+    if args.trace:
+        tracer.enable(args.trace, args.trace_buffer)
 
     logging.debug("Starting application setup.")
     config_manager = ConfigManager()
     logging.debug("ConfigManager initialized.")
 
+    if args.command == 'scan':
+        sys.exit(run_scan(args, config_manager))
+    if args.command == 'export':
+        sys.exit(run_export(args))
+    if args.command == 'batch':
+        exit_code = run_batch(args, config_manager)
+        if tracer.enabled:
+            tracer.export_chrome_trace()
+        sys.exit(exit_code)
+
     logging.info(f"Application will run with resolution: {args.resolution if args.resolution else 'fullscreen'}")
 
     qt_app = QApplication(sys.argv)
     logging.debug("QApplication instance created.")
 
-    app = App(sys.argv, config_manager, resolution=args.resolution, emulate=args.emulate)
+    app = App(sys.argv, config_manager, resolution=args.resolution, emulate=args.emulate,
+              fake_cameras=args.fake_cameras, started_at=started_at, dev=args.dev)
     logging.info("Application instance created and configured.")
 
     exit_code = qt_app.exec_()
+    app.pre_capture_scheduler.cancel()
+    app.camera_io.stop()
+    if app.photo_manager:
+        app.photo_manager.shutdown()
+    app.processing_executor.shutdown()
+    app.close_database_connection()
+    if tracer.enabled:
+        tracer.export_chrome_trace()
     logging.info("Application execution finished.")
     sys.exit(exit_code)
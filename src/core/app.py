@@ -1,18 +1,29 @@
 import json
 import logging
 import os
-import asyncio
 import sys
+import time
 
-from PyQt5.QtWidgets import QMainWindow, QStackedWidget
+from PyQt5.QtCore import QEvent, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QMainWindow, QStackedWidget, QLabel
 from src.core.window_types import WindowType
 from src.models.project import Project
 
-from src.utils.data_base_manager import DataBaseManager
+from src.utils.database_service import DatabaseService
+from src.utils.deletion_service import DeletionService
+from src.utils.image_processing import CropSettings, process_captured_photo, DEFAULT_PREVIEW_SIZE
+from src.utils.preview_cache import PreviewCache
+from src.utils.processing_executor import ProcessingExecutor
+from src.utils.style_sheet import StyleSheet
 
 from src.utils.photo_manager.photo_manager_emulator import PhotoManagerEmulator
-from src.utils.photo_manager.photo_manager import PhotoManager, check_cameras
+from src.utils.photo_manager.photo_manager import PhotoManager, probe_cameras, make_fake_resident_command, \
+    REQUIRED_CAMERAS
+from src.utils.photo_manager.camera_state_cache import CameraStateCache
+from src.utils.photo_manager.pre_capture import PreCaptureScheduler
+from src.utils.photo_manager.camera_io_thread import CameraIoThread
 
+from src.windows.base_window import resource_path
 from src.windows.start_window import StartWindow
 from src.windows.interval_window import IntervalWindow
 from src.windows.new_interval_window import NewIntervalWindow
@@ -28,25 +39,69 @@ from src.windows.settings_window import SettingsWindow
 
 LAST_PROJECT_SAVE = './last_project_save.txt'
 
+# Screens visited for every interval; they are built once and rebound to new data on each visit
+CACHED_WINDOW_TYPES = {
+    WindowType.NEW_INTERVAL_WINDOW,
+    WindowType.PHOTO_REVIEW_WINDOW,
+    WindowType.INTERVAL_WINDOW,
+}
+
 class App(QMainWindow):
-    def __init__(self, sys_argv, config_manager, emulate=False, resolution=None):
+    # Emitted with the photo manager once camera discovery finishes, or with None if no cameras were found
+    photo_manager_ready = pyqtSignal(object)
+
+    def __init__(self, sys_argv, config_manager, emulate=False, resolution=None, fake_cameras=False,
+                 started_at=None, dev=False):
         logging.debug("Initializing the application.")
         super().__init__()
 
+        self.started_at = started_at or time.perf_counter()
         self.current_window = None
         self.resolution = resolution
         self.config_manager = config_manager
-        self.db_manager = None
+        self.database_service = None
+        self.deletion_service = None
         self.photo_manager = None
+        self.cached_window_types = set(CACHED_WINDOW_TYPES)
+        self.window_cache = {}
+        self.processing_executor = ProcessingExecutor(
+            int(self.config_manager.get('processing', 'workers', fallback='0')),
+            int(self.config_manager.get('processing', 'max_pending', fallback='8')))
+        self.preview_cache = PreviewCache.from_config(self.config_manager, self.processing_executor)
+        self.camera_io = CameraIoThread().start()
+        self.pre_capture_scheduler = PreCaptureScheduler(
+            self.camera_io,
+            lambda: self.photo_manager,
+            self.config_manager.get('logic', 'pipelined_capture', fallback='false').lower() == 'true',
+            float(self.config_manager.get('logic', 'precapture_delay', fallback='1.0')),
+            self.process_captured_photos,
+            self)
+
+        self.camera_discovery_running = False
+        self.camera_state_cache = CameraStateCache(
+            ttl=float(self.config_manager.get('camera', 'probe_ttl', fallback='3600')))
+
+        # Parsed once for the whole application; in dev mode edits to the file are applied immediately
+        self.style_sheet = StyleSheet(resource_path(os.path.join("resources", "styles", "styles.qss")), dev, self)
+        self.style_sheet.apply()
 
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
+        self.stacked_widget.installEventFilter(self)
+
+        self.camera_status_label = QLabel()
+        self.statusBar().addPermanentWidget(self.camera_status_label)
 
         logging.debug(f'Trying to start photo manager... emulate: {str(emulate)}')
         if emulate:
             self.init_photo_manager_emulator()
+        elif fake_cameras:
+            self.init_photo_manager_with_fake_cameras()
         else:
-            self.init_photo_manager()
+            # Discovery can take seconds on a cold Pi, so it runs once the start window is on screen
+            self.camera_discovery_running = True
+            self.set_camera_status("Поиск камер...")
+            QTimer.singleShot(0, self.init_photo_manager)
 
         logging.debug('Switching start window...')
 
@@ -61,17 +116,50 @@ class App(QMainWindow):
             self.showFullScreen()
         self.show()
 
+    def eventFilter(self, source, event):
+        if source is self.stacked_widget and event.type() == QEvent.Paint:
+            self.stacked_widget.removeEventFilter(self)
+            logging.info(f"Time to first frame of the start window: "
+                         f"{(time.perf_counter() - self.started_at) * 1000:.0f} ms.")
+        return super().eventFilter(source, event)
+
+    def set_camera_status(self, text):
+        self.camera_status_label.setText(text)
+
     def switch_interface(self, window_type, *args, **kwargs):
-        widget = self.create_window(window_type, *args, **kwargs)
-        self.clean_stacked_widget()
-        self.stacked_widget.addWidget(widget)
+        widget = self.window_cache.get(window_type)
+        if widget is not None:
+            logging.debug(f"Reusing the cached window of type {window_type}.")
+            widget.rebind(*args, **kwargs)
+        else:
+            widget = self.create_window(window_type, *args, **kwargs)
+            if window_type in self.cached_window_types:
+                self.window_cache[window_type] = widget
+        self.clean_stacked_widget(keep=widget)
+        if self.stacked_widget.indexOf(widget) == -1:
+            self.stacked_widget.addWidget(widget)
+        if self.stacked_widget.currentWidget() is widget:
+            # Rebound while on screen, so there is no show event to set the focus
+            if widget.start_focus is not None:
+                widget.start_focus.setFocus()
         self.stacked_widget.setCurrentWidget(widget)
 
-    def clean_stacked_widget(self):
-        while self.stacked_widget.count() > 0:
-            widget_to_remove = self.stacked_widget.widget(0)
-            self.stacked_widget.removeWidget(widget_to_remove)
-            widget_to_remove.deleteLater()
+    def clean_stacked_widget(self, keep=None):
+        """Deletes the windows that are not cached; cached windows stay hidden in the stack."""
+        cached_windows = set(self.window_cache.values())
+        for index in reversed(range(self.stacked_widget.count())):
+            widget = self.stacked_widget.widget(index)
+            if widget is keep or widget in cached_windows:
+                continue
+            self.stacked_widget.removeWidget(widget)
+            widget.deleteLater()
+
+    def clear_window_cache(self):
+        for widget in self.window_cache.values():
+            if widget is not self.stacked_widget.currentWidget():
+                self.stacked_widget.removeWidget(widget)
+                widget.deleteLater()
+        self.window_cache = {}
 
     def create_window(self, window_type, *args, **kwargs):
         logging.debug(f"Creating a new window of type {window_type}.")
@@ -119,19 +207,42 @@ class App(QMainWindow):
 
         self.switch_interface(WindowType.START_WINDOW)
 
+    def process_captured_photos(self, photos):
+        """Crops captured photos and makes their previews, one processing task per camera."""
+        return self.processing_executor.submit_each(
+            process_captured_photo,
+            photos,
+            CropSettings.from_config(self.config_manager),
+            int(self.config_manager.get('preview', 'size', fallback=DEFAULT_PREVIEW_SIZE)))
+
     def init_database_connection(self, project):
         """Initializes the database connection for the given project."""
-        if not self.db_manager:
-            self.db_manager = DataBaseManager(project)
+        if not self.database_service:
+            self.database_service = DatabaseService(project)
+            self.deletion_service = DeletionService(self.database_service, project, self.preview_cache, parent=self)
+            self.deletion_service.progress.connect(self.on_deletion_progress)
+            self.deletion_service.finished.connect(self.on_deletion_finished)
+            self.deletion_service.resume()
             logging.info(f"Database initialized for project {project.name}.")
 
     def close_database_connection(self):
         """Closes the current database connection, if any."""
-        if self.db_manager:
-            self.db_manager.close_connection()
-            self.db_manager = None
+        if self.database_service:
+            self.deletion_service.stop()
+            self.deletion_service.deleteLater()
+            self.deletion_service = None
+            self.database_service.close()
+            self.database_service = None
+            self.clear_window_cache()
             logging.info("Database connection closed.")
 
+    def on_deletion_progress(self, removed, total):
+        self.statusBar().showMessage(f"Удаление фотографий: {removed} из {total}")
+
+    def on_deletion_finished(self, deletion_id):
+        if not self.deletion_service.is_busy():
+            self.statusBar().clearMessage()
+
     def load_project_from_file(self, file_path):
         """Loads project from a specified JSON file."""
         try:
@@ -164,23 +275,65 @@ class App(QMainWindow):
             return None
 
     def init_photo_manager(self):
-        """Initializes the photo manager based on camera availability."""
+        """Starts the photo manager once enough cameras are found, without blocking the GUI."""
         logging.info("Photo manager starting...")
-        try:
+        cached_cameras = self.camera_state_cache.load()
+        if cached_cameras is not None and cached_cameras >= REQUIRED_CAMERAS:
+            self.start_photo_manager(cached_cameras)
+            return
+        self.camera_discovery_running = True
+        self.set_camera_status("Поиск камер...")
+        self.camera_io.submit(probe_cameras()).then(self.on_cameras_probed, self.on_camera_probe_failed)
+
+    def on_cameras_probed(self, num_cameras):
+        if num_cameras >= REQUIRED_CAMERAS:
+            logging.info(f"Camera availability confirmed. Number of cameras: {num_cameras}")
+            self.camera_state_cache.save(num_cameras)
+            self.start_photo_manager(num_cameras)
+        else:
+            logging.error(f"Photo_manager: at least {REQUIRED_CAMERAS} cameras are required, "
+                          f"{num_cameras} found. Aborted.")
+            self.finish_camera_discovery(None, "Камеры не найдены")
 
+    def on_camera_probe_failed(self, error):
+        logging.error(f"Photo_manager: camera discovery failed: {error}")
+        self.finish_camera_discovery(None, "Камеры не найдены")
 
-            # Start asynchronous camera test in a synchronous
-            camera_check = asyncio.run(check_cameras())
-            if camera_check:
-                self.photo_manager = PhotoManager()
-                logging.info("Photo manager started.")
-            else:
-                logging.error("Photo_manager: No cameras found. Aborted.")
-        except ImportError:
-            logging.warning("PhotoManager not available, initializing PhotoManagerEmulator.")
-            return PhotoManagerEmulator()
+    def start_photo_manager(self, num_cameras):
+        try:
+            self.photo_manager = PhotoManager(
+                resident=self.config_manager.get('camera', 'resident', fallback='true').lower() == 'true',
+                warmup=float(self.config_manager.get('camera', 'warmup', fallback='2.0')))
+        except Exception as e:
+            logging.error(f"Photo manager failed to start: {e}")
+            self.camera_state_cache.invalidate()
+            self.finish_camera_discovery(None, "Ошибка камер")
+            return
+        self.start_camera_watchdog()
+        logging.info("Photo manager started.")
+        self.finish_camera_discovery(self.photo_manager, f"Камер подключено: {num_cameras}")
+
+    def finish_camera_discovery(self, photo_manager, status):
+        self.camera_discovery_running = False
+        self.set_camera_status(status)
+        self.photo_manager_ready.emit(photo_manager)
 
     def init_photo_manager_emulator(self):
         logging.info("Photo manager emulator starting...")
         self.photo_manager = PhotoManagerEmulator()
+        self.set_camera_status("Эмулятор камер")
         logging.info("Photo manager emulator started.")
+
+    def init_photo_manager_with_fake_cameras(self):
+        """Runs the resident capture pipeline against fake camera processes."""
+        logging.info("Photo manager with fake cameras starting...")
+        self.photo_manager = PhotoManager(command_factory=make_fake_resident_command, warmup=0.5)
+        self.start_camera_watchdog()
+        self.set_camera_status("Эмулятор камер")
+        logging.info("Photo manager with fake cameras started.")
+
+    def start_camera_watchdog(self):
+        """Checks the resident camera processes periodically on the camera I/O loop."""
+        self.camera_io.call_periodic(
+            self.photo_manager.check_camera_health,
+            float(self.config_manager.get('camera', 'watchdog_interval', fallback='5.0')))
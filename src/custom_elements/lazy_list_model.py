@@ -0,0 +1,58 @@
+import logging
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+
+class LazyListModel(QAbstractListModel):
+    """List model that loads its items page by page as the view scrolls.
+
+    fetch_page(last_item, limit) must return a QtFuture with up to limit items that
+    follow last_item (None for the first page). A page shorter than limit marks the
+    end of the list. Only one page is requested at a time.
+    """
+
+    def __init__(self, fetch_page, display, page_size=100, parent=None):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.display = display
+        self.page_size = page_size
+        self.items = []
+        self.exhausted = False
+        self.loading = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.items):
+            return None
+        if role == Qt.DisplayRole:
+            return self.display(self.items[index.row()])
+        return None
+
+    def item(self, index):
+        return self.items[index.row()] if index.isValid() else None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self.loading = True
+        last_item = self.items[-1] if self.items else None
+        self.fetch_page(last_item, self.page_size).then(self.on_page_loaded, self.on_page_failed)
+
+    def on_page_loaded(self, page):
+        self.loading = False
+        if len(page) < self.page_size:
+            self.exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.items), len(self.items) + len(page) - 1)
+            self.items.extend(page)
+            self.endInsertRows()
+
+    def on_page_failed(self, error):
+        self.loading = False
+        self.exhausted = True
+        logging.error(f"Failed to load list page: {error}")
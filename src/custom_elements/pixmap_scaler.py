@@ -0,0 +1,52 @@
+from PyQt5.QtCore import Qt, QTimer, QEvent, QObject
+
+from src.utils.tracing import span
+
+RESIZE_SETTLE_MS = 150
+
+
+class PixmapScaler(QObject):
+    """Shows a pixmap in a label, scaled to the label's size.
+
+    While the label is being resized the pixmap is rescaled with the fast
+    transformation on every resize event; once no resize has arrived for
+    settle_ms, it is rescaled once more with the smooth one. The windows only
+    set the pixmap; resizes are followed through an event filter on the label.
+    """
+
+    def __init__(self, label, settle_ms=RESIZE_SETTLE_MS, parent=None):
+        super().__init__(parent)
+        self.label = label
+        self.pixmap = None
+        # A label holding a pixmap does not shrink below it, which would keep the window from getting smaller
+        self.label.setMinimumSize(1, 1)
+        self.label.installEventFilter(self)
+
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(settle_ms)
+        self.settle_timer.timeout.connect(self.render_smooth)
+
+    def set_pixmap(self, pixmap):
+        self.pixmap = pixmap
+        self.settle_timer.stop()
+        self.render_smooth()
+
+    def clear(self):
+        """Forgets the pixmap, so the label can show text or an animation instead."""
+        self.pixmap = None
+        self.settle_timer.stop()
+
+    def eventFilter(self, source, event):
+        if event.type() == QEvent.Resize and source == self.label and self.pixmap is not None:
+            self.render(Qt.FastTransformation)
+            self.settle_timer.start()
+        return False
+
+    def render_smooth(self):
+        if self.pixmap is not None:
+            with span('QPixmap scale', 'ui'):
+                self.render(Qt.SmoothTransformation)
+
+    def render(self, transformation):
+        self.label.setPixmap(self.pixmap.scaled(self.label.size(), Qt.KeepAspectRatio, transformation))
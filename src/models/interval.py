@@ -13,6 +13,18 @@ class BaseIntervalSettings:
         self.condition = condition
         self.is_marked = is_marked
 
+    def get_next_settings(self, step):
+        """Settings of the interval that follows this one on the core."""
+        return BaseIntervalSettings(
+            float(self.interval_to),
+            float(self.interval_to) + step,
+            self.condition,
+            self.is_marked)
+
+    def has_same_position(self, other):
+        return (round(float(self.interval_from), 2) == round(float(other.interval_from), 2)
+                and round(float(self.interval_to), 2) == round(float(other.interval_to), 2))
+
 
 class Interval(BaseIntervalSettings):
     def __init__(self, _id, _version, well_id, interval_from, interval_to, condition, is_marked):
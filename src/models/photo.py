@@ -2,9 +2,14 @@ import os
 
 
 class Photo:
-    def __init__(self, _id, path, interval_id):
+    def __init__(self, _id, path, interval_id, size=None, hash=None, name=None, crop=None):
         self.id = _id
         self.path = path
         self.interval_id = interval_id
-        name, _ = os.path.splitext(os.path.basename(self.path))
-        self.name = name
\ No newline at end of file
+        self.size = size
+        self.hash = hash
+        if name is None:
+            name, _ = os.path.splitext(os.path.basename(self.path))
+        self.name = name
+        # The crop applied to the stored file as "left,right,top,bottom", None if it is not known
+        self.crop = crop
@@ -1,3 +1,4 @@
+import json
 import os
 
 
@@ -20,4 +21,11 @@ class Project:
     def from_dict(data):
         if "name" not in data or "path" not in data:
             raise ValueError("Missing required field in project data")
-        return Project(data["name"], data["path"])
\ No newline at end of file
+        return Project(data["name"], data["path"])
+
+    @staticmethod
+    def load(file_path):
+        """Loads the project described by a <name>.json project file; the project folder is the file's folder."""
+        with open(file_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        return Project(data["name"], os.path.dirname(os.path.abspath(file_path)))
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.interval import BaseIntervalSettings
+from src.models.well import Well
+from src.utils.data_base_manager import DataBaseManager
+from src.utils.image_processing import CropSettings, DEFAULT_PREVIEW_SIZE, process_captured_photo
+from src.utils.integrity_scanner import get_photo_key, resolve_photo_path
+from src.utils.photo_manager.base_photo_manager import CONTENT_FOLDER, STORAGE_LAYOUT_NAMED
+from src.utils.preview_cache import PreviewStore, SCREEN, THUMBNAIL
+from src.utils.tracing import tracer
+
+# Captures made by batch runs are staged apart from those of the application, which may be running meanwhile
+BATCH_TEMP_STORAGE = os.path.join('temp', 'batch', 'photos')
+BATCH_SPOOL_STORAGE = os.path.join('temp', 'batch', 'spool')
+NO_CROP = CropSettings().describe()
+
+
+def make_interval_settings(start, end, step, condition, is_marked=False):
+    """Returns the settings of consecutive intervals of length step from start up to end."""
+    settings = []
+    index = 0
+    while start + (index + 1) * step <= end + 1e-9:
+        settings.append(BaseIntervalSettings(round(start + index * step, 2), round(start + (index + 1) * step, 2),
+                                             condition, is_marked))
+        index += 1
+    return settings
+
+
+class BatchRunner:
+    """Captures intervals and maintains the photos of a project without the user interface.
+
+    It does what the windows do for an interval, with the same crop, preview and
+    storage settings from config.ini. The cameras are driven on an asyncio loop,
+    the photos are processed on a pool of threads and the intervals are committed
+    on a database thread of their own, so the next interval is captured while the
+    previous one is being processed and committed. Maintenance commands work on
+    the stored photos a page at a time.
+    """
+
+    def __init__(self, project, config):
+        self.project = project
+        self.crop = CropSettings.from_config(config)
+        self.preview_size = int(config.get('preview', 'size', fallback=DEFAULT_PREVIEW_SIZE))
+        self.layout = config.get('storage', 'layout', fallback=STORAGE_LAYOUT_NAMED)
+        self.preview_store = PreviewStore(project.path, self.preview_size,
+                                          int(config.get('preview', 'thumbnail_size', fallback='320')))
+        self.workers = int(config.get('processing', 'workers', fallback='0')) or os.cpu_count()
+        self.page_size = self.workers * 4
+        self.failed = []
+
+    def get_well(self, db_manager, well_name, create=False):
+        well = db_manager.get_well_by_name(well_name)
+        if well is None and create:
+            well = Well(db_manager.add_well(well_name), well_name)
+        if well is None:
+            raise ValueError(f"Well {well_name} not found in project {self.project.name}")
+        return well
+
+    def capture(self, photo_manager, well_name, interval_settings, width=0, height=0):
+        """Captures, processes and commits the intervals in order and returns the committed Intervals.
+
+        The well is created if it does not exist. Intervals whose capture or
+        processing failed are skipped and kept in self.failed.
+        """
+        self.failed = []
+        # The connection is opened, used and closed on this one thread
+        with ThreadPoolExecutor(1, thread_name_prefix='BatchDatabase') as database_executor:
+            db_manager = database_executor.submit(DataBaseManager, self.project).result()
+            try:
+                well = database_executor.submit(self.get_well, db_manager, well_name, True).result()
+                with ThreadPoolExecutor(self.workers, thread_name_prefix='BatchProcessing') as executor:
+                    started_at = time.perf_counter()
+                    intervals = asyncio.run(self.capture_intervals(
+                        db_manager, database_executor, executor, photo_manager, well, interval_settings,
+                        width, height))
+                    elapsed = time.perf_counter() - started_at
+            finally:
+                database_executor.submit(db_manager.close_connection).result()
+        logging.info(f"Captured {len(intervals)} intervals of well {well_name} in {elapsed:.1f} s "
+                     f"({elapsed / max(len(intervals), 1):.2f} s per interval), {len(self.failed)} failed.")
+        return intervals
+
+    async def capture_intervals(self, db_manager, database_executor, executor, photo_manager, well,
+                                interval_settings, width, height):
+        intervals = []
+        pending = None
+        for settings in interval_settings:
+            session = photo_manager.create_capture_session(self.project, well)
+            photos = await photo_manager.take_photos(self.project, well, width, height, session)
+            # The previous interval was being processed while this one was captured
+            if pending is not None:
+                intervals.append(await pending)
+            pending = asyncio.ensure_future(
+                self.process_and_commit(db_manager, database_executor, executor, photo_manager, well, settings,
+                                        session, photos))
+        if pending is not None:
+            intervals.append(await pending)
+        return [interval for interval in intervals if interval is not None]
+
+    async def process_and_commit(self, db_manager, database_executor, executor, photo_manager, well, settings,
+                                 session, photos):
+        """Crops the photos of one capture, commits them as an interval and stores their previews."""
+        loop = asyncio.get_running_loop()
+        try:
+            if not photos or not all(photos):
+                raise RuntimeError("not every camera returned a photo")
+            processed_photos = await asyncio.gather(*[
+                loop.run_in_executor(executor, process_captured_photo, photo, self.crop, self.preview_size)
+                for photo in photos])
+            for processed_photo in processed_photos:
+                session.set_processed(processed_photo)
+            # The transaction, renames and fsyncs run on the database thread, which owns the connection
+            interval = await loop.run_in_executor(
+                database_executor, photo_manager.commit_interval, db_manager, self.project, well, settings, session,
+                self.layout)
+        except Exception as e:
+            logging.error(f"Interval {settings.interval_from}-{settings.interval_to} of well {well.name} "
+                          f"not captured: {e}")
+            photo_manager.clear_temp_storage(session)
+            self.failed.append(settings)
+            return None
+        destinations = {target['source']: target['destination'] for target in session.targets}
+        await asyncio.gather(*[
+            loop.run_in_executor(executor, self.preview_store.generate,
+                                 destinations[os.path.basename(processed_photo.path)], processed_photo.preview)
+            for processed_photo in processed_photos])
+        tracer.flush_interval(f"{well.name}_{interval.get_full_name()}")
+        logging.info(f"Interval {interval.get_full_name()} of well {well.name} committed.")
+        return interval
+
+    def iterate_photos(self, db_manager, well_name=None):
+        """Yields the photos of the project, or of one well, a page at a time."""
+        well_id = self.get_well(db_manager, well_name).id if well_name else None
+        after_id = 0
+        while True:
+            photos = db_manager.get_photos_page(after_id, self.page_size, well_id)
+            if not photos:
+                return
+            after_id = photos[-1].id
+            yield photos
+
+    def recrop(self, well_name=None, force=False):
+        """Crops the uncropped stored photos with the current crop settings and returns how many were cropped.
+
+        It is meant for photos saved before a crop was configured. Every photo
+        records the crop applied to it, so photos that are already cropped are
+        never cropped again. Photos saved before crops were recorded may be
+        cropped already and are included only with force. Sizes, checksums and
+        previews are updated. Photos in the content-addressed layout are named
+        after their checksum and are left alone.
+        """
+        if self.crop.is_empty():
+            logging.warning("No crop is configured in config.ini, nothing to re-crop.")
+            return 0
+        cropped = 0
+        db_manager = DataBaseManager(self.project)
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix='BatchProcessing') as executor:
+                for photos in self.iterate_photos(db_manager, well_name):
+                    photos = [photo for photo in photos if self.needs_crop(photo, force)]
+                    crops = [crop for crop in executor.map(self.recrop_photo, photos) if crop is not None]
+                    db_manager.set_photo_crops(crops)
+                    cropped += len(crops)
+            db_manager.recalculate_well_sizes()
+        finally:
+            db_manager.close_connection()
+        logging.info(f"Re-cropped {cropped} photos of project {self.project.name}.")
+        return cropped
+
+    @staticmethod
+    def needs_crop(photo, force):
+        if get_photo_key(photo.path).startswith(f"{CONTENT_FOLDER}/"):
+            return False
+        return photo.crop == NO_CROP or (force and photo.crop is None)
+
+    def recrop_photo(self, photo):
+        """Crops one photo and makes its previews; returns its new (size, hash, crop, ID), or None if it failed."""
+        path = resolve_photo_path(self.project, photo.path)
+        try:
+            processed_photo = process_captured_photo(path, self.crop, self.preview_size)
+            self.preview_store.generate(path, processed_photo.preview)
+        except Exception as e:
+            logging.error(f"Photo {path} not re-cropped: {e}")
+            return None
+        return processed_photo.size, processed_photo.digest, processed_photo.crop, photo.id
+
+    def regenerate_previews(self, well_name=None, force=False):
+        """Makes the previews of the stored photos that are missing or stale, or of all of them with force.
+
+        Returns the number of photos whose previews were made.
+        """
+        generated = 0
+        db_manager = DataBaseManager(self.project)
+        try:
+            with ThreadPoolExecutor(self.workers, thread_name_prefix='BatchProcessing') as executor:
+                for photos in self.iterate_photos(db_manager, well_name):
+                    generated += sum(executor.map(lambda photo: self.regenerate_preview(photo, force), photos))
+        finally:
+            db_manager.close_connection()
+        logging.info(f"Made previews of {generated} photos of project {self.project.name}.")
+        return generated
+
+    def regenerate_preview(self, photo, force):
+        path = resolve_photo_path(self.project, photo.path)
+        if not force and all(self.preview_store.is_fresh(path, kind) for kind in (SCREEN, THUMBNAIL)):
+            return False
+        try:
+            self.preview_store.generate(path)
+        except Exception as e:
+            logging.error(f"Previews of {path} not made: {e}")
+            return False
+        return True
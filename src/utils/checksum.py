@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+CHUNK_SIZE = 1024 * 1024
+
+ALGORITHM_XXH3 = 'xxh3_128'
+ALGORITHM_BLAKE3 = 'blake3'
+ALGORITHM_BLAKE2B = 'blake2b'
+
+# The fastest installed hash; blake2b from the standard library works everywhere
+if xxhash is not None:
+    DEFAULT_ALGORITHM = ALGORITHM_XXH3
+elif blake3 is not None:
+    DEFAULT_ALGORITHM = ALGORITHM_BLAKE3
+else:
+    DEFAULT_ALGORITHM = ALGORITHM_BLAKE2B
+
+
+def is_available(algorithm):
+    return (algorithm == ALGORITHM_BLAKE2B
+            or (algorithm == ALGORITHM_XXH3 and xxhash is not None)
+            or (algorithm == ALGORITHM_BLAKE3 and blake3 is not None))
+
+
+def new_hasher(algorithm=DEFAULT_ALGORITHM):
+    if algorithm == ALGORITHM_XXH3 and xxhash is not None:
+        return xxhash.xxh3_128()
+    if algorithm == ALGORITHM_BLAKE3 and blake3 is not None:
+        return blake3.blake3()
+    if algorithm == ALGORITHM_BLAKE2B:
+        return hashlib.blake2b(digest_size=16)
+    raise ValueError(f"Hash algorithm {algorithm} is not available")
+
+
+def split_digest(digest):
+    """Splits a stored digest "<algorithm>:<hex>" into its parts."""
+    algorithm, _, value = digest.partition(':')
+    return algorithm, value
+
+
+def hash_file(path, algorithm=DEFAULT_ALGORITHM):
+    """Reads a file in large chunks and returns its size and digest "<algorithm>:<hex>"."""
+    hasher = new_hasher(algorithm)
+    size = 0
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+    return size, f"{algorithm}:{hasher.hexdigest()}"
+
+
+def verify_file(path, size, digest, full=True):
+    """Tells whether a file still has the recorded size and, if full is set, the recorded digest.
+
+    The size is checked first, so truncated files are found without reading
+    them. A digest made with a hash that is not installed is not checked.
+    """
+    try:
+        if os.path.getsize(path) != size:
+            return False
+    except OSError:
+        return False
+    algorithm, _ = split_digest(digest)
+    if not full or not is_available(algorithm):
+        return True
+    return hash_file(path, algorithm) == (size, digest)
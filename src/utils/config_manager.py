@@ -21,17 +21,42 @@ class ConfigManager:
         }
         self.config['logic'] = {
             'interval_step': '0.5',
-            'interval_button_step': '0.05'
+            'interval_button_step': '0.05',
+            'pipelined_capture': 'false',
+            'precapture_delay': '1.0'
         }
         self.config['crop'] = {
             'left': '0',
             'right': '0',
             'top': '0',
-            'bottom': '0'
+            'bottom': '0',
+            'mode': 'reencode',
+            'snap': 'true'
         }
         self.config['camera'] = {
             'width': '0',
-            'height': '0'
+            'height': '0',
+            'resident': 'true',
+            'warmup': '2.0',
+            'watchdog_interval': '5.0',
+            'probe_ttl': '3600'
+        }
+        self.config['preview'] = {
+            'size': '1920',
+            'thumbnail_size': '320',
+            'cache_mb': '64',
+            'review_layout': 'sequential'
+        }
+        self.config['storage'] = {
+            'layout': 'named'
+        }
+        self.config['integrity'] = {
+            'workers': '4',
+            'verify': 'false'
+        }
+        self.config['processing'] = {
+            'workers': '0',
+            'max_pending': '8'
         }
         with open(self.config_path, 'w') as configfile:
             self.config.write(configfile)
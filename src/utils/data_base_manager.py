@@ -1,48 +1,136 @@
 import os
 import sqlite3
 import logging
+import urllib.request
 from src.models.interval import IntervalCondition, Interval
 from src.models.well import Well
 from src.models.photo import Photo
+from src.utils.tracing import traced
+
+
+# Applied in order on every connection; WAL lets readers run during a commit and, with
+# synchronous=NORMAL, a commit no longer waits for an fsync of the journal.
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16384",  # 16 MiB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+]
+
+# Schema migrations, indexed by the PRAGMA user_version they bring the database to.
+# Append new migrations to the end; never change one that has already been released.
+MIGRATIONS = [
+    # 1: initial schema
+    [
+        '''CREATE TABLE IF NOT EXISTS Wells(
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL
+            )''',
+        '''CREATE TABLE IF NOT EXISTS Intervals(
+            id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 1,
+            well_id INTEGER NOT NULL,
+            interval_from REAL NOT NULL,
+            interval_to REAL NOT NULL,
+            condition TEXT NOT NULL,
+            is_marked BOOLEAN NOT NULL,
+            FOREIGN KEY(well_id) REFERENCES Wells(id) ON DELETE CASCADE
+            )''',
+        '''CREATE TABLE IF NOT EXISTS Photos(
+            id INTEGER PRIMARY KEY,
+            photo_path TEXT NOT NULL,
+            interval_id INTEGER NOT NULL,
+            FOREIGN KEY(interval_id) REFERENCES Intervals(id) ON DELETE CASCADE
+            )''',
+    ],
+    # 2: a covering index for the MAX(version) search and an index for the photos of an interval
+    [
+        '''CREATE INDEX IF NOT EXISTS Intervals_well_position
+            ON Intervals(well_id, interval_from, interval_to, condition, is_marked, version)''',
+        '''CREATE INDEX IF NOT EXISTS Photos_interval
+            ON Photos(interval_id, photo_path)''',
+    ],
+    # 3: intervals of a well in insertion order, for keyset pagination of the well window
+    [
+        '''CREATE INDEX IF NOT EXISTS Intervals_well_order
+            ON Intervals(well_id, id)''',
+    ],
+    # 4: tombstones and the journal of deletions whose photos are still being removed
+    [
+        '''ALTER TABLE Wells ADD COLUMN deleted BOOLEAN NOT NULL DEFAULT 0''',
+        '''ALTER TABLE Intervals ADD COLUMN deleted BOOLEAN NOT NULL DEFAULT 0''',
+        '''CREATE TABLE IF NOT EXISTS Deletions(
+            id INTEGER PRIMARY KEY,
+            well_id INTEGER,
+            interval_id INTEGER
+            )''',
+        '''CREATE INDEX IF NOT EXISTS Photos_path
+            ON Photos(photo_path)''',
+    ],
+    # 5: size and checksum of every photo, its name in the content-addressed layout and the size of each well
+    [
+        '''ALTER TABLE Photos ADD COLUMN size INTEGER''',
+        '''ALTER TABLE Photos ADD COLUMN hash TEXT''',
+        '''ALTER TABLE Photos ADD COLUMN name TEXT''',
+        '''ALTER TABLE Wells ADD COLUMN photos_size INTEGER NOT NULL DEFAULT 0''',
+    ],
+    # 6: the crop applied to every stored photo, so a photo is never cropped twice
+    [
+        '''ALTER TABLE Photos ADD COLUMN crop TEXT''',
+    ],
+]
 
 
 class DataBaseManager:
-    def __init__(self, project):
-        database_dir = os.path.join(project.path, "database")
-        db_path = os.path.join(database_dir, f"{project.name}_geo_photo_database.db")
-        os.makedirs(database_dir, exist_ok=True)
-        self.connection = sqlite3.connect(db_path)
+    def __init__(self, project, read_only=False):
+        db_path = self.get_database_path(project)
+        database_dir = os.path.dirname(db_path)
+        self.project_path = project.path
+        self.read_only = read_only
+        if read_only:
+            # Query-only connection; the database must already have been set up by a writable one
+            uri = f"file:{urllib.request.pathname2url(os.path.abspath(db_path))}?mode=ro"
+            self.connection = sqlite3.connect(uri, uri=True)
+        else:
+            os.makedirs(database_dir, exist_ok=True)
+            self.connection = sqlite3.connect(db_path)
         self.cursor = self.connection.cursor()
-        self.setup_database()
+        self.configure_connection()
+        if not read_only:
+            self.setup_database()
         logging.info("DatabaseManager initialized for project: %s", project.name)
 
-    # Create tables if not exist
+    @staticmethod
+    def get_database_path(project):
+        return os.path.join(project.path, "database", f"{project.name}_geo_photo_database.db")
+
+    def configure_connection(self):
+        for pragma in CONNECTION_PRAGMAS:
+            # The journal mode is stored in the database file and cannot be changed by a reader
+            if self.read_only and 'journal_mode' in pragma:
+                continue
+            self.cursor.execute(pragma)
+
+    def get_schema_version(self):
+        return self.cursor.execute("PRAGMA user_version").fetchone()[0]
+
+    # Create tables if not exist and bring the schema up to date
     def setup_database(self):
-        queries = [
-            '''CREATE TABLE IF NOT EXISTS Wells(
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL
-                )''',
-            '''CREATE TABLE IF NOT EXISTS Intervals(
-                id INTEGER PRIMARY KEY,
-                version INTEGER NOT NULL DEFAULT 1,
-                well_id INTEGER NOT NULL,
-                interval_from REAL NOT NULL,
-                interval_to REAL NOT NULL,
-                condition TEXT NOT NULL,
-                is_marked BOOLEAN NOT NULL,
-                FOREIGN KEY(well_id) REFERENCES Wells(id) ON DELETE CASCADE
-                )''',
-            '''CREATE TABLE IF NOT EXISTS Photos(
-                id INTEGER PRIMARY KEY,
-                photo_path TEXT NOT NULL,
-                interval_id INTEGER NOT NULL,
-                FOREIGN KEY(interval_id) REFERENCES Intervals(id) ON DELETE CASCADE
-                )'''
-        ]
-        for query in queries:
-            self.cursor.execute(query)
-        self.connection.commit()
+        version = self.get_schema_version()
+        if version > len(MIGRATIONS):
+            raise RuntimeError(f"Database schema version {version} is newer than this application supports")
+        for new_version, queries in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                self.cursor.execute("BEGIN")
+                for query in queries:
+                    self.cursor.execute(query)
+                self.cursor.execute(f"PRAGMA user_version = {new_version}")
+                self.connection.commit()
+            except sqlite3.Error:
+                self.connection.rollback()
+                raise
+            logging.info("Database schema migrated to version %s.", new_version)
         logging.info("Database tables set up successfully.")
 
     def get_well(self, well_id):
@@ -56,7 +144,7 @@ class DataBaseManager:
 
     def get_all_wells(self):
         """Retrieve all wells."""
-        self.cursor.execute("SELECT * FROM Wells")
+        self.cursor.execute("SELECT * FROM Wells WHERE NOT deleted")
         wells_data = self.cursor.fetchall()
         return [Well(row[0], row[1]) for row in wells_data]
 
@@ -71,17 +159,40 @@ class DataBaseManager:
 
     def get_all_intervals_by_well_id(self, well_id):
         """Retrieve all intervals associated with a specific well."""
-        self.cursor.execute("SELECT * FROM Intervals WHERE well_id = ?", (well_id,))
+        self.cursor.execute("SELECT * FROM Intervals WHERE well_id = ? AND NOT deleted ORDER BY id", (well_id,))
         intervals_data = self.cursor.fetchall()
         return [Interval(row[0], row[1], well_id, row[3], row[4], IntervalCondition[row[5].upper()], row[6]) for row in
                 intervals_data]
 
+    def get_intervals_page_by_well_id(self, well_id, after_id=0, limit=100):
+        """Retrieve up to limit intervals of a well added after the interval with ID after_id."""
+        self.cursor.execute("SELECT * FROM Intervals WHERE well_id = ? AND id > ? AND NOT deleted ORDER BY id LIMIT ?",
+                            (well_id, after_id, limit))
+        intervals_data = self.cursor.fetchall()
+        return [Interval(row[0], row[1], well_id, row[3], row[4], IntervalCondition[row[5].upper()], row[6]) for row in
+                intervals_data]
+
+    def get_last_interval_by_well_id(self, well_id):
+        """Retrieve the most recently added interval of a well, or None if it has none."""
+        self.cursor.execute("SELECT * FROM Intervals WHERE well_id = ? AND NOT deleted ORDER BY id DESC LIMIT 1",
+                            (well_id,))
+        row = self.cursor.fetchone()
+        if row:
+            return Interval(row[0], row[1], well_id, row[3], row[4], IntervalCondition[row[5].upper()], row[6])
+        return None
+
+    def get_absolute_photo_path(self, photo_path):
+        """Photos of an exported project are stored relative to the project folder; others with absolute paths."""
+        if os.path.isabs(photo_path):
+            return photo_path
+        return os.path.join(self.project_path, photo_path)
+
     def get_photo(self, photo_id):
         """Retrieve a single photo by its ID."""
         self.cursor.execute("SELECT * FROM Photos WHERE id = ?", (photo_id,))
         row = self.cursor.fetchone()
         if row:
-            return Photo(row[0], row[1], row[2])
+            return Photo(row[0], self.get_absolute_photo_path(row[1]), row[2], row[3], row[4], row[5], row[6])
         logging.warning("No photo found with ID: %s", photo_id)
         return None
 
@@ -89,8 +200,24 @@ class DataBaseManager:
         """Retrieve all photos associated with a specific interval."""
         self.cursor.execute("SELECT * FROM Photos WHERE interval_id = ?", (interval_id,))
         photos_data = self.cursor.fetchall()
-        return [Photo(row[0], row[1], row[2]) for row in photos_data]
+        return [Photo(row[0], self.get_absolute_photo_path(row[1]), row[2], row[3], row[4], row[5], row[6])
+                for row in photos_data]
 
+    def get_photos_page(self, after_id, limit, well_id=None):
+        """Retrieve up to limit photos of intervals that are not deleted, after the photo with ID after_id."""
+        well_condition = "AND Intervals.well_id = ?" if well_id is not None else ""
+        self.cursor.execute(f"""
+            SELECT Photos.id, Photos.photo_path, Photos.interval_id, Photos.size, Photos.hash, Photos.name, Photos.crop
+            FROM Photos
+            JOIN Intervals ON Intervals.id = Photos.interval_id
+            JOIN Wells ON Wells.id = Intervals.well_id
+            WHERE Photos.id > ? AND NOT Intervals.deleted AND NOT Wells.deleted {well_condition}
+            ORDER BY Photos.id LIMIT ?
+        """, (after_id,) + ((well_id,) if well_id is not None else ()) + (limit,))
+        return [Photo(row[0], self.get_absolute_photo_path(row[1]), row[2], row[3], row[4], row[5], row[6])
+                for row in self.cursor.fetchall()]
+
+    @traced('db.add_well', 'db')
     def add_well(self, name):
         """Adds a new well to the Wells table."""
         try:
@@ -103,15 +230,35 @@ class DataBaseManager:
             logging.error("Failed to add well '%s': %s", name, e)
             return None
 
+    def get_well_by_name(self, name):
+        """Retrieve the first well with this name that is not deleted, or None."""
+        self.cursor.execute("SELECT id, name FROM Wells WHERE name = ? AND NOT deleted ORDER BY id LIMIT 1", (name,))
+        row = self.cursor.fetchone()
+        return Well(row[0], row[1]) if row else None
+
+    def get_well_size(self, well_id):
+        """Returns the total size in bytes of the photos of a well, kept up to date on every change."""
+        self.cursor.execute("SELECT photos_size FROM Wells WHERE id = ?", (well_id,))
+        row = self.cursor.fetchone()
+        return row[0] if row else 0
+
     def get_max_version(self, settings, well_id):
         """Retrieves the maximum version number for a given interval and well."""
         query = """SELECT MAX(version) FROM Intervals WHERE well_id = ? AND interval_from = ? AND interval_to = ?"""
         self.cursor.execute(query, (well_id, settings.interval_from, settings.interval_to))
         return self.cursor.fetchone()[0]
 
+    @traced('db.add_interval', 'db')
     def add_interval(self, well_id, interval_settings):
         """Inserts a new interval into the database with automatic version management."""
-        # Get the current maximum version for the given interval
+        interval_id, _ = self.insert_interval(well_id, interval_settings)
+        self.connection.commit()
+        return interval_id
+
+    def insert_interval(self, well_id, interval_settings):
+        """Inserts a new interval with the next free version without committing. Returns (id, version)."""
+        # Get the current maximum version for the given interval. Deleted intervals count until they are
+        # purged, so a new interval never gets the photo names of one whose photos are still being removed
         self.cursor.execute("""
             SELECT MAX(version) FROM Intervals 
             WHERE well_id = ? AND interval_from = ? AND interval_to = ? AND condition = ? AND is_marked = ?
@@ -134,44 +281,327 @@ class DataBaseManager:
             interval_settings.is_marked,
             new_version
         ))
-        self.connection.commit()
 
         logging.info(f"Added new interval with version {new_version} for well ID {well_id}.")
-        return self.cursor.lastrowid
+        return self.cursor.lastrowid, new_version
 
+    @traced('db.commit_interval', 'db')
+    def commit_interval(self, well_id, interval_settings, photo_paths):
+        """Adds an interval together with its photos in one transaction and returns the new Interval.
+
+        photo_paths is either a list of paths or Photo objects, or a function that receives
+        the new Interval and returns them. A function runs inside the transaction, so the
+        photos can be named after the interval version; if it raises, nothing is stored.
+        The sizes of the photos are added to the size of the well.
+        """
+        try:
+            interval_id, version = self.insert_interval(well_id, interval_settings)
+            interval = Interval(interval_id, version, well_id, float(interval_settings.interval_from),
+                                float(interval_settings.interval_to), interval_settings.condition,
+                                interval_settings.is_marked)
+            if callable(photo_paths):
+                photo_paths = photo_paths(interval)
+            photos = [Photo(None, photo, interval_id) if isinstance(photo, str) else photo for photo in photo_paths]
+            self.cursor.executemany(
+                "INSERT INTO Photos (photo_path, interval_id, size, hash, name, crop) VALUES (?, ?, ?, ?, ?, ?)",
+                [(photo.path, interval_id, photo.size, photo.hash, photo.name, photo.crop) for photo in photos])
+            self.cursor.execute("UPDATE Wells SET photos_size = photos_size + ? WHERE id = ?",
+                                (sum(photo.size or 0 for photo in photos), well_id))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        logging.info(f"Committed interval {interval_id} with {len(photo_paths)} photos.")
+        return interval
+
+    def has_photo(self, interval_id, photo_path):
+        """Tells whether the interval has a photo stored at photo_path."""
+        self.cursor.execute("SELECT 1 FROM Photos WHERE interval_id = ? AND photo_path = ? LIMIT 1",
+                            (interval_id, photo_path))
+        return self.cursor.fetchone() is not None
+
+    @traced('db.add_photo', 'db')
     def add_photo(self, path, interval_id):
         """Adds a photo record linked to an interval."""
         query = "INSERT INTO Photos (photo_path, interval_id) VALUES (?, ?)"
         self.cursor.execute(query, (path, interval_id))
+        self.connection.commit()
+
+    @traced('db.mark_well_deleted', 'db')
+    def mark_well_deleted(self, well_id):
+        """Hides the well and journals its deletion. Returns the ID of the journal entry.
 
-    def delete_well_and_related_data(self, well_id):
-        """Deletes the well and all associated intervals and photos."""
+        The intervals, photos and files of the well are removed later, in small
+        batches, by the deletion service.
+        """
         try:
-            # Delete all photos associated with the intervals of this well
-            self.cursor.execute("DELETE FROM Photos WHERE interval_id IN (SELECT id FROM Intervals WHERE well_id = ?)",
-                                (well_id,))
-            # Delete all intervals of this well
-            self.cursor.execute("DELETE FROM Intervals WHERE well_id = ?", (well_id,))
-            # Remove the well itself
-            self.cursor.execute("DELETE FROM Wells WHERE id = ?", (well_id,))
+            self.cursor.execute("UPDATE Wells SET deleted = 1 WHERE id = ?", (well_id,))
+            self.cursor.execute("INSERT INTO Deletions (well_id) VALUES (?)", (well_id,))
             self.connection.commit()
-            logging.info("Well and all related intervals and photos deleted successfully.")
-        except sqlite3.Error as e:
-            logging.error("Failed to delete well and related data: %s", e)
+        except sqlite3.Error:
             self.connection.rollback()
+            raise
+        logging.info(f"Well {well_id} marked as deleted.")
+        return self.cursor.lastrowid
 
-    def delete_interval_and_related_photos(self, interval_id):
-        """Deletes the interval and all associated photos."""
+    @traced('db.mark_interval_deleted', 'db')
+    def mark_interval_deleted(self, interval_id):
+        """Hides the interval and journals its deletion. Returns the ID of the journal entry."""
         try:
-            # Delete all photos associated with this interval
-            self.cursor.execute("DELETE FROM Photos WHERE interval_id = ?", (interval_id,))
-            # Delete the interval itself
-            self.cursor.execute("DELETE FROM Intervals WHERE id = ?", (interval_id,))
+            self.cursor.execute("UPDATE Intervals SET deleted = 1 WHERE id = ?", (interval_id,))
+            self.cursor.execute("INSERT INTO Deletions (interval_id) VALUES (?)", (interval_id,))
             self.connection.commit()
-            logging.info("Interval and all related photos deleted successfully.")
-        except sqlite3.Error as e:
-            logging.error("Failed to delete interval and related photos: %s", e)
+        except sqlite3.Error:
             self.connection.rollback()
+            raise
+        logging.info(f"Interval {interval_id} marked as deleted.")
+        return self.cursor.lastrowid
+
+    def get_pending_deletions(self):
+        """Retrieve the IDs of the journaled deletions that are not finished yet."""
+        self.cursor.execute("SELECT id FROM Deletions ORDER BY id")
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_deletion_filter(self, deletion_id):
+        """Returns the condition on Intervals and its parameters that select the intervals of a deletion."""
+        self.cursor.execute("SELECT well_id, interval_id FROM Deletions WHERE id = ?", (deletion_id,))
+        well_id, interval_id = self.cursor.fetchone()
+        if well_id is not None:
+            return "well_id = ?", (well_id,)
+        return "id = ?", (interval_id,)
+
+    def count_deleted_photos(self, deletion_id):
+        condition, params = self.get_deletion_filter(deletion_id)
+        self.cursor.execute(f"""
+            SELECT COUNT(*) FROM Intervals JOIN Photos ON Photos.interval_id = Intervals.id
+            WHERE Intervals.{condition}
+        """, params)
+        return self.cursor.fetchone()[0]
+
+    def get_deleted_intervals(self, deletion_id, limit):
+        """Retrieve the IDs of up to limit intervals that a deletion still has to remove."""
+        condition, params = self.get_deletion_filter(deletion_id)
+        self.cursor.execute(f"SELECT id FROM Intervals WHERE {condition} ORDER BY id LIMIT ?", params + (limit,))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_photo_paths_by_interval_ids(self, interval_ids):
+        placeholders = ', '.join('?' * len(interval_ids))
+        self.cursor.execute(f"SELECT photo_path FROM Photos WHERE interval_id IN ({placeholders})", interval_ids)
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_live_photo_paths(self, paths):
+        """Returns the paths that are still used by a photo of an interval that is not deleted."""
+        placeholders = ', '.join('?' * len(paths))
+        self.cursor.execute(f"""
+            SELECT Photos.photo_path FROM Photos
+            JOIN Intervals ON Intervals.id = Photos.interval_id
+            JOIN Wells ON Wells.id = Intervals.well_id
+            WHERE Photos.photo_path IN ({placeholders}) AND NOT Intervals.deleted AND NOT Wells.deleted
+        """, paths)
+        return {row[0] for row in self.cursor.fetchall()}
+
+    def purge_intervals(self, interval_ids):
+        """Removes intervals together with their photos in one transaction."""
+        placeholders = ', '.join('?' * len(interval_ids))
+        try:
+            self.cursor.execute(f"""
+                UPDATE Wells SET photos_size = photos_size - (
+                    SELECT COALESCE(SUM(Photos.size), 0) FROM Photos JOIN Intervals ON Intervals.id = Photos.interval_id
+                    WHERE Intervals.well_id = Wells.id AND Intervals.id IN ({placeholders}))
+                WHERE id IN (SELECT well_id FROM Intervals WHERE id IN ({placeholders}))
+            """, interval_ids + interval_ids)
+            self.cursor.execute(f"DELETE FROM Photos WHERE interval_id IN ({placeholders})", interval_ids)
+            self.cursor.execute(f"DELETE FROM Intervals WHERE id IN ({placeholders})", interval_ids)
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+
+    @traced('db.finish_deletion', 'db')
+    def finish_deletion(self, deletion_id):
+        """Removes the deleted well, if any, and the journal entry once everything else is gone."""
+        try:
+            self.cursor.execute("DELETE FROM Wells WHERE id = (SELECT well_id FROM Deletions WHERE id = ?)",
+                                (deletion_id,))
+            self.cursor.execute("DELETE FROM Deletions WHERE id = ?", (deletion_id,))
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        logging.info(f"Deletion {deletion_id} finished.")
+
+    def create_scan_table(self, key_function):
+        """Creates the temporary table of the files found by an integrity scan.
+
+        Files are matched with photos by key_function(path) rather than by the
+        path itself, which may have been stored while the project was in another
+        folder. The table lives in a temporary file rather than in memory, so a
+        scan of a large project does not hold every path at once.
+        """
+        self.connection.create_function('photo_key', 1, key_function, deterministic=True)
+        self.cursor.execute("PRAGMA temp_store = FILE")
+        self.cursor.execute("DROP TABLE IF EXISTS temp.ScannedFiles")
+        self.cursor.execute('''CREATE TABLE temp.ScannedFiles(
+            key TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            stem TEXT,
+            size INTEGER NOT NULL,
+            changed_at REAL NOT NULL,
+            referenced BOOLEAN NOT NULL DEFAULT 0
+            ) WITHOUT ROWID''')
+        self.cursor.execute("CREATE INDEX temp.ScannedFiles_stem ON ScannedFiles(kind, stem)")
+
+    def add_scanned_files(self, files):
+        """Adds (key, path, kind, stem, size, changed_at) rows to the scan table."""
+        self.cursor.executemany(
+            "INSERT OR REPLACE INTO temp.ScannedFiles (key, path, kind, stem, size, changed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", files)
+        self.connection.commit()
+
+    def drop_scan_table(self):
+        self.cursor.execute("DROP TABLE IF EXISTS temp.ScannedFiles")
+        self.cursor.execute("PRAGMA temp_store = MEMORY")
+
+    def get_max_photo_id(self):
+        self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM Photos")
+        return self.cursor.fetchone()[0]
+
+    def get_scanned_photos_page(self, after_id, limit):
+        """Retrieve up to limit photos with the file found for each of them.
+
+        Rows are (id, path, size, hash, deleted, file key, file path, file size);
+        the file columns are None if the file was not found, and deleted tells
+        whether the photo belongs to a deleted interval or well.
+        """
+        self.cursor.execute("""
+            SELECT Photos.id, Photos.photo_path, Photos.size, Photos.hash, Intervals.deleted OR Wells.deleted,
+                ScannedFiles.key, ScannedFiles.path, ScannedFiles.size
+            FROM Photos
+            JOIN Intervals ON Intervals.id = Photos.interval_id
+            JOIN Wells ON Wells.id = Intervals.well_id
+            LEFT JOIN temp.ScannedFiles ON ScannedFiles.key = photo_key(Photos.photo_path)
+            WHERE Photos.id > ?
+            ORDER BY Photos.id LIMIT ?
+        """, (after_id, limit))
+        return self.cursor.fetchall()
+
+    def mark_scanned_files_referenced(self, keys):
+        self.cursor.executemany("UPDATE temp.ScannedFiles SET referenced = 1 WHERE key = ?",
+                                [(key,) for key in keys])
+        self.connection.commit()
+
+    def get_orphan_files_page(self, after_key, changed_before, limit):
+        """Retrieve up to limit scanned photo files that no photo refers to, as (key, path) rows.
+
+        Files changed after changed_before are left out; they may belong to an
+        interval that is being committed.
+        """
+        self.cursor.execute("""
+            SELECT key, path FROM temp.ScannedFiles
+            WHERE kind = 'photo' AND NOT referenced AND key > ? AND changed_at < ?
+            ORDER BY key LIMIT ?
+        """, (after_key, changed_before, limit))
+        return self.cursor.fetchall()
+
+    def get_orphan_previews_page(self, after_key, limit):
+        """Retrieve up to limit scanned previews whose photo file was not found, as (key, path) rows."""
+        self.cursor.execute("""
+            SELECT key, path FROM temp.ScannedFiles AS Previews
+            WHERE kind = 'preview' AND key > ? AND NOT EXISTS (
+                SELECT 1 FROM temp.ScannedFiles WHERE kind = 'photo' AND stem = Previews.stem)
+            ORDER BY key LIMIT ?
+        """, (after_key, limit))
+        return self.cursor.fetchall()
+
+    def set_photo_checksums(self, checksums):
+        """Stores (size, hash, photo ID) rows for photos saved before checksums were recorded."""
+        self.cursor.executemany("UPDATE Photos SET size = ?, hash = ? WHERE id = ?", checksums)
+        self.connection.commit()
+
+    def set_photo_crops(self, crops):
+        """Stores (size, hash, crop, photo ID) rows for photos cropped after they were saved."""
+        self.cursor.executemany("UPDATE Photos SET size = ?, hash = ?, crop = ? WHERE id = ?", crops)
+        self.connection.commit()
+
+    def remove_photos(self, photo_ids):
+        placeholders = ', '.join('?' * len(photo_ids))
+        self.cursor.execute(f"DELETE FROM Photos WHERE id IN ({placeholders})", photo_ids)
+        self.connection.commit()
+
+    def recalculate_well_sizes(self):
+        """Recounts the size of every well from its photos."""
+        self.cursor.execute("""
+            UPDATE Wells SET photos_size = (
+                SELECT COALESCE(SUM(Photos.size), 0) FROM Photos JOIN Intervals ON Intervals.id = Photos.interval_id
+                WHERE Intervals.well_id = Wells.id)
+        """)
+        self.connection.commit()
+
+    def backup_to(self, path):
+        """Copies the database into a new file at path with the SQLite backup API.
+
+        The copy is made in one step, a consistent snapshot; in WAL mode it does
+        not block the writer of the project.
+        """
+        target = sqlite3.connect(path)
+        try:
+            self.connection.backup(target)
+        finally:
+            target.close()
+
+    def trim_for_export(self, key_function, well_names=None):
+        """Removes deleted wells and intervals and, if well_names is given, every other well.
+
+        The path of every photo is replaced with key_function(path), its path
+        relative to the project folder, so the snapshot can be opened wherever the
+        archive is unpacked. Meant for a snapshot made by backup_to, never for the
+        database of a project.
+        """
+        self.connection.create_function('photo_key', 1, key_function, deterministic=True)
+        try:
+            if well_names is not None:
+                placeholders = ', '.join('?' * len(well_names))
+                self.cursor.execute(f"DELETE FROM Wells WHERE name NOT IN ({placeholders})", list(well_names))
+            self.cursor.execute("DELETE FROM Intervals WHERE deleted")
+            self.cursor.execute("DELETE FROM Wells WHERE deleted")
+            self.cursor.execute("DELETE FROM Deletions")
+            self.cursor.execute("UPDATE Photos SET photo_path = photo_key(photo_path)")
+            self.cursor.execute("""
+                UPDATE Wells SET photos_size = (
+                    SELECT COALESCE(SUM(Photos.size), 0) FROM Photos
+                    JOIN Intervals ON Intervals.id = Photos.interval_id
+                    WHERE Intervals.well_id = Wells.id)
+            """)
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        if well_names is not None:
+            self.cursor.execute("VACUUM")
+
+    def get_photo_paths_page(self, after_path, limit):
+        """Retrieve up to limit distinct photo paths after after_path, in path order."""
+        self.cursor.execute("SELECT DISTINCT photo_path FROM Photos WHERE photo_path > ? ORDER BY photo_path LIMIT ?",
+                            (after_path, limit))
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_manifest_rows(self):
+        """Returns a cursor over every photo with its well and interval, ordered by well and interval.
+
+        Rows are (well, interval_from, interval_to, condition, is_marked, version,
+        name, path, size, hash); the cursor is read as it is iterated. CROSS JOIN
+        keeps this join order, so the rows come in index order instead of being
+        sorted in a temporary table.
+        """
+        return self.connection.execute("""
+            SELECT Wells.name, Intervals.interval_from, Intervals.interval_to, Intervals.condition,
+                Intervals.is_marked, Intervals.version, Photos.name, Photos.photo_path, Photos.size, Photos.hash
+            FROM Wells
+            CROSS JOIN Intervals ON Intervals.well_id = Wells.id
+            CROSS JOIN Photos ON Photos.interval_id = Intervals.id
+            ORDER BY Wells.id, Intervals.id, Photos.photo_path
+        """)
 
     def close_connection(self):
         """Close the database connection."""
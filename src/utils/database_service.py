@@ -0,0 +1,94 @@
+import itertools
+import logging
+import queue
+import threading
+
+from src.utils.data_base_manager import DataBaseManager
+from src.utils.qt_future import QtFuture
+
+
+class DatabaseWorker(threading.Thread):
+    """Owns one DataBaseManager connection and runs queued requests on it one at a time."""
+
+    def __init__(self, name, open_database):
+        super().__init__(name=name, daemon=True)
+        self.open_database = open_database
+        self.requests = queue.Queue()
+        self.db_manager = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def run(self):
+        try:
+            self.db_manager = self.open_database()
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            self._ready.set()
+
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            function, args, kwargs, future = request
+            try:
+                result = function(self.db_manager, *args, **kwargs)
+            except Exception as e:
+                logging.error(f"Database request {function.__name__} failed: {e}")
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+        self.db_manager.close_connection()
+
+    def start(self):
+        """Starts the thread and waits until its connection is open."""
+        super().start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def submit(self, function, *args, **kwargs):
+        """Queues function(db_manager, *args, **kwargs) and returns a QtFuture with its result."""
+        future = QtFuture()
+        self.requests.put((function, args, kwargs, future))
+        return future
+
+    def stop(self):
+        if self.is_alive():
+            self.requests.put(None)
+            self.join()
+
+
+class DatabaseService:
+    """Runs all database work of a project off the GUI thread.
+
+    Writes go through a single writer thread with the read-write connection, which
+    also migrates the schema. Queries go to reader threads with read-only
+    connections; in WAL mode they are not blocked by a commit in progress. Requests
+    take a DataBaseManager method and its arguments, for example
+    ``service.read(DataBaseManager.get_all_wells).then(self.on_wells_loaded)``.
+    """
+
+    def __init__(self, project, readers=1):
+        self.project = project
+        self.writer = DatabaseWorker("DatabaseWriter", lambda: DataBaseManager(project)).start()
+        self.readers = [
+            DatabaseWorker(f"DatabaseReader{n}", lambda: DataBaseManager(project, read_only=True)).start()
+            for n in range(readers)
+        ]
+        self._next_reader = itertools.cycle(self.readers)
+        logging.info(f"Database service started for project {project.name} with {readers} readers.")
+
+    def read(self, function, *args, **kwargs):
+        return next(self._next_reader).submit(function, *args, **kwargs)
+
+    def write(self, function, *args, **kwargs):
+        return self.writer.submit(function, *args, **kwargs)
+
+    def close(self):
+        """Finishes the queued requests and closes all connections."""
+        for worker in [*self.readers, self.writer]:
+            worker.stop()
+        logging.info("Database service stopped.")
@@ -0,0 +1,157 @@
+import collections
+import logging
+import os
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from src.utils.data_base_manager import DataBaseManager
+
+DELETION_BATCH_SIZE = 50  # intervals
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not remove {path}: {e}")
+
+
+def remove_empty_directories(directories):
+    for directory in directories:
+        try:
+            os.rmdir(directory)
+            logging.info(f"Removed empty directory {directory}.")
+        except OSError:
+            pass
+
+
+def purge_batch(db_manager, deletion_id, limit, preview_store):
+    """Removes the photos, previews and rows of up to limit intervals of a deletion.
+
+    Runs on the database writer thread, so no interval can be committed with the
+    same photo names in between. The files are removed before the rows, so a
+    batch interrupted by a crash is simply repeated. Returns the number of
+    intervals removed, 0 once the deletion has none left, and their photo paths.
+    """
+    interval_ids = db_manager.get_deleted_intervals(deletion_id, limit)
+    if not interval_ids:
+        return 0, []
+    stored_paths = db_manager.get_photo_paths_by_interval_ids(interval_ids)
+    # A well created again under the same name reuses the photo names; such files belong to it now
+    live_paths = db_manager.get_live_photo_paths(stored_paths) if stored_paths else set()
+    paths = [db_manager.get_absolute_photo_path(path) for path in stored_paths]
+    for stored_path, path in zip(stored_paths, paths):
+        if stored_path not in live_paths:
+            remove_file(path)
+            preview_store.remove(path)
+    remove_empty_directories({os.path.dirname(path) for path in paths})
+    db_manager.purge_intervals(interval_ids)
+    return len(interval_ids), paths
+
+
+class DeletionService(QObject):
+    """Deletes wells and intervals without blocking the interface.
+
+    A deletion first marks the well or interval as deleted and records it in the
+    Deletions journal, which hides it at once. Its photos, previews and rows are
+    then removed in batches of intervals, each batch a separate request to the
+    database writer, so captures keep being saved in between. Deletions left
+    unfinished when the application stopped are resumed by resume(). Use it from
+    the GUI thread.
+    """
+    # Photos removed so far and the total number of photos of the running deletion
+    progress = pyqtSignal(int, int)
+    # Emitted with the journal ID of every finished deletion
+    finished = pyqtSignal(int)
+
+    def __init__(self, database_service, project, preview_cache, batch_size=DELETION_BATCH_SIZE, parent=None):
+        super().__init__(parent)
+        self.database_service = database_service
+        self.preview_cache = preview_cache
+        self.preview_store = preview_cache.get_store(project)
+        self.batch_size = batch_size
+        self.queue = collections.deque()
+        self.running = None
+        self.removed = 0
+        self.total = 0
+        self.stopped = False
+
+    def delete_well(self, well_id):
+        """Returns a QtFuture that completes once the well is hidden; its data is removed afterwards."""
+        return self.database_service.write(DataBaseManager.mark_well_deleted, well_id).then(self.enqueue)
+
+    def delete_interval(self, interval_id):
+        return self.database_service.write(DataBaseManager.mark_interval_deleted, interval_id).then(self.enqueue)
+
+    def resume(self):
+        """Continues the deletions journaled in the database."""
+        self.database_service.write(DataBaseManager.get_pending_deletions).then(self.on_pending_loaded)
+
+    def stop(self):
+        """Stops after the running batch; the rest stays in the journal."""
+        self.stopped = True
+        self.queue.clear()
+
+    def is_busy(self):
+        return self.running is not None
+
+    def on_pending_loaded(self, deletion_ids):
+        if deletion_ids:
+            logging.info(f"Resuming {len(deletion_ids)} unfinished deletions.")
+        for deletion_id in deletion_ids:
+            self.enqueue(deletion_id)
+
+    def enqueue(self, deletion_id):
+        if self.stopped or deletion_id == self.running or deletion_id in self.queue:
+            return
+        self.queue.append(deletion_id)
+        if self.running is None:
+            self.start_next()
+
+    def start_next(self):
+        self.running = None
+        if self.stopped or not self.queue:
+            return
+        self.running = self.queue.popleft()
+        self.removed = 0
+        self.database_service.write(DataBaseManager.count_deleted_photos, self.running).then(
+            self.on_counted, self.on_failed)
+
+    def on_counted(self, total):
+        if self.stopped:
+            return
+        self.total = total
+        self.progress.emit(self.removed, self.total)
+        self.purge_next()
+
+    def purge_next(self):
+        self.database_service.write(purge_batch, self.running, self.batch_size, self.preview_store).then(
+            self.on_batch_purged, self.on_failed)
+
+    def on_batch_purged(self, result):
+        intervals, paths = result
+        for path in paths:
+            self.preview_cache.forget(path)
+        if self.stopped:
+            return
+        if intervals == 0:
+            self.database_service.write(DataBaseManager.finish_deletion, self.running).then(
+                self.on_finished, self.on_failed)
+            return
+        self.removed += len(paths)
+        self.progress.emit(self.removed, self.total)
+        self.purge_next()
+
+    def on_finished(self, _):
+        if self.stopped:
+            return
+        deletion_id = self.running
+        self.start_next()
+        self.finished.emit(deletion_id)
+
+    def on_failed(self, error):
+        # The deletion stays in the journal and is retried on the next start
+        logging.error(f"Deletion {self.running} failed: {error}")
+        self.start_next()
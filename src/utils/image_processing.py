@@ -0,0 +1,197 @@
+import logging
+import os
+import shutil
+import subprocess
+
+from PIL import Image
+
+from src.utils.checksum import hash_file
+from src.utils.tracing import traced
+
+JPEG_QUALITY = 95
+DEFAULT_PREVIEW_SIZE = 1920
+
+CROP_MODE_REENCODE = 'reencode'
+CROP_MODE_LOSSLESS = 'lossless'
+
+
+class CropSettings:
+    def __init__(self, left=0, right=0, top=0, bottom=0, mode=CROP_MODE_REENCODE, snap=True):
+        self.left = left
+        self.right = right
+        self.top = top
+        self.bottom = bottom
+        self.mode = mode
+        self.snap = snap
+
+    @staticmethod
+    def from_config(config):
+        return CropSettings(
+            int(config.get("crop", "left", fallback=0)),
+            int(config.get("crop", "right", fallback=0)),
+            int(config.get("crop", "top", fallback=0)),
+            int(config.get("crop", "bottom", fallback=0)),
+            config.get("crop", "mode", fallback=CROP_MODE_REENCODE).lower(),
+            config.get("crop", "snap", fallback="true").lower() == "true")
+
+    def describe(self):
+        """Returns the crop as "left,right,top,bottom", the form it is recorded in with every photo."""
+        return f"{self.left},{self.right},{self.top},{self.bottom}"
+
+    def is_empty(self):
+        return not (self.left or self.right or self.top or self.bottom)
+
+    def area(self, width, height):
+        return self.left, self.top, width - self.right, height - self.bottom
+
+
+class ProcessedPhoto:
+    """A stored photo together with a preview made from the same decoded frame, its size, checksum and crop."""
+
+    def __init__(self, path, preview, size=None, digest=None, crop=None):
+        self.path = path
+        self.preview = preview
+        self.size = size
+        self.digest = digest
+        self.crop = crop
+
+
+@traced('crop_image', 'image')
+def crop_image(file_path, left, right, top, bottom, lossless=False, snap=True):
+    if lossless and crop_image_lossless(file_path, CropSettings(left, right, top, bottom, snap=snap)):
+        return
+    try:
+        with Image.open(file_path) as img:
+            width, height = img.size
+
+            crop_area = (left, top, width - right, height - bottom)
+            cropped_img = img.crop(crop_area)
+            cropped_img.save(file_path, quality=JPEG_QUALITY)
+    except Exception as e:
+        logging.error(f"Error while cropp {file_path}: {str(e)}")
+        raise
+
+
+def get_mcu_size(img):
+    """Returns the (width, height) of a JPEG minimum coded unit, or None for non-JPEG images."""
+    layers = getattr(img, 'layer', None)
+    if img.format != 'JPEG' or not layers:
+        return None
+    return 8 * max(layer[1] for layer in layers), 8 * max(layer[2] for layer in layers)
+
+
+def snap_crop_to_mcu(crop, mcu_size):
+    """Moves the left and top edges outwards onto MCU boundaries.
+
+    Only the origin of a lossless crop has to be block aligned; the right and bottom
+    edges may cut through a block. Snapping outwards never removes pixels the
+    configured crop would have kept.
+    """
+    mcu_width, mcu_height = mcu_size
+    return CropSettings(
+        crop.left - crop.left % mcu_width,
+        crop.right,
+        crop.top - crop.top % mcu_height,
+        crop.bottom,
+        crop.mode,
+        crop.snap)
+
+
+def find_jpegtran():
+    return shutil.which('jpegtran')
+
+
+@traced('crop_image_lossless', 'image')
+def crop_image_lossless(file_path, crop):
+    """Crops a JPEG on its DCT coefficients with jpegtran, without decoding or re-encoding.
+
+    Returns the crop that was applied, which differs from crop when its origin was
+    snapped to the MCU grid, or None when the lossless path cannot be used (jpegtran
+    missing, not a JPEG, or an unaligned crop with snapping disabled) so the caller
+    can fall back to PIL.
+    """
+    jpegtran = find_jpegtran()
+    if jpegtran is None:
+        logging.warning("jpegtran not found, falling back to re-encoding crop.")
+        return None
+
+    with Image.open(file_path) as img:
+        width, height = img.size
+        mcu_size = get_mcu_size(img)
+    if mcu_size is None:
+        return None
+
+    if crop.left % mcu_size[0] or crop.top % mcu_size[1]:
+        if not crop.snap:
+            logging.info(f"Crop of {file_path} is not aligned to {mcu_size} MCU, using re-encoding crop.")
+            return None
+        crop = snap_crop_to_mcu(crop, mcu_size)
+
+    left, top, right, bottom = crop.area(width, height)
+    temp_path = file_path + '.tmp'
+    command = [jpegtran, '-crop', f"{right - left}x{bottom - top}+{left}+{top}", '-copy', 'all',
+               '-outfile', temp_path, file_path]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        logging.error(f"jpegtran failed on {file_path}: {result.stderr.decode('utf-8', errors='replace')}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return None
+    os.replace(temp_path, file_path)
+    return crop
+
+
+def fit_size(size, max_size):
+    """Returns size scaled down to fit in a max_size square, keeping the aspect ratio."""
+    width, height = size
+    scale = min(1.0, max_size / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+@traced('make_preview', 'image')
+def make_preview(file_path, preview_size):
+    """Decodes a JPEG at the smallest DCT scale (1/2, 1/4 or 1/8) that still covers the preview size."""
+    with Image.open(file_path) as img:
+        # draft() keeps a scale only if both sides stay at least as large as requested,
+        # so a square box would make a 4:3 frame decode at full size
+        img.draft('RGB', fit_size(img.size, preview_size))
+        preview = img.convert('RGB')
+    preview.thumbnail((preview_size, preview_size), Image.BILINEAR)
+    return preview
+
+
+@traced('process_captured_photo', 'image')
+def process_captured_photo(file_path, crop, preview_size=DEFAULT_PREVIEW_SIZE):
+    """Decodes a captured JPEG once, stores the cropped photo and returns it with a preview.
+
+    The crop and the preview are both taken from the same in-memory frame, so the
+    review window does not need to decode the stored file again. In lossless mode,
+    or without a crop, only the preview is decoded, at a reduced DCT scale. The size
+    and checksum of the stored file are computed here as well, so committing the
+    interval does not read the photo again.
+    """
+    try:
+        applied_crop = crop if crop.is_empty() else None
+        if crop.mode == CROP_MODE_LOSSLESS and not crop.is_empty():
+            applied_crop = crop_image_lossless(file_path, crop)
+        if applied_crop is not None:
+            # The snapped origin of a lossless crop is recorded, not the configured one
+            return ProcessedPhoto(file_path, make_preview(file_path, preview_size), *hash_file(file_path),
+                                  applied_crop.describe())
+
+        with Image.open(file_path) as img:
+            img.load()
+        width, height = img.size
+
+        cropped_img = img.crop(crop.area(width, height))
+        temp_path = file_path + '.tmp'
+        cropped_img.save(temp_path, format='JPEG', quality=JPEG_QUALITY)
+        os.replace(temp_path, file_path)
+
+        preview = cropped_img.convert('RGB') if cropped_img.mode != 'RGB' else cropped_img.copy()
+        preview.thumbnail((preview_size, preview_size), Image.BILINEAR)
+        # The file was just written, so it is read back from the page cache
+        return ProcessedPhoto(file_path, preview, *hash_file(file_path), crop.describe())
+    except Exception as e:
+        logging.error(f"Error while processing {file_path}: {str(e)}")
+        raise
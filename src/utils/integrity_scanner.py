@@ -0,0 +1,331 @@
+import collections
+import csv
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src.utils.checksum import hash_file, verify_file
+from src.utils.data_base_manager import DataBaseManager
+from src.utils.photo_manager.base_photo_manager import CONTENT_FOLDER
+from src.utils.preview_cache import PREVIEWS_DIR, SCREEN, THUMBNAIL
+from src.utils.tracing import span
+
+DEFAULT_WORKERS = 4
+SCAN_BATCH_SIZE = 1000  # files inserted, or photos checked, at a time
+# A file changed this recently may belong to an interval that is being committed
+SETTLE_SECONDS = 60
+QUARANTINE_FOLDER = 'orphans'
+MAX_EXAMPLES = 20
+
+# Kinds of scanned files
+KIND_PHOTO = 'photo'
+KIND_PREVIEW = 'preview'
+
+# Problems found by a scan
+MISSING = 'missing'
+ORPHAN = 'orphan'
+CORRUPT = 'corrupt'
+ORPHAN_PREVIEW = 'orphan_preview'
+UNHASHED = 'unhashed'
+PROBLEMS = (MISSING, ORPHAN, CORRUPT, ORPHAN_PREVIEW, UNHASHED)
+FIXABLE_PROBLEMS = (MISSING, ORPHAN, ORPHAN_PREVIEW, UNHASHED)
+
+JPEG_START = b'\xff\xd8'
+JPEG_END = b'\xff\xd9'
+JPEG_TAIL_SIZE = 64  # some cameras pad the file after the end marker
+# Photos are stored three folders deep: media/<project>/<well>/ and objects/<ab>/<cd>/
+PHOTO_KEY_PARTS = 4
+
+
+def get_photo_key(path):
+    """Returns the part of a photo path that stays the same when the project folder is moved or copied."""
+    return '/'.join(path.replace('\\', '/').split('/')[-PHOTO_KEY_PARTS:])
+
+
+def resolve_photo_path(project, stored_path):
+    """Returns where a photo is in the project's folder, whichever folder its path was stored from."""
+    return os.path.join(project.path, *get_photo_key(stored_path).split('/'))
+
+
+def is_truncated_jpeg(path):
+    """Tells whether a JPEG misses its start or end marker, reading only its first and last bytes."""
+    try:
+        with open(path, 'rb') as file:
+            if file.read(2) != JPEG_START:
+                return True
+            file.seek(0, os.SEEK_END)
+            file.seek(max(2, file.tell() - JPEG_TAIL_SIZE))
+            return JPEG_END not in file.read()
+    except OSError:
+        return True
+
+
+def scan_directory(directory):
+    """Returns the regular files of a directory as (path, size, changed_at) tuples and its subdirectories."""
+    files = []
+    directories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    # A rename changes st_ctime, so a photo moved in by a commit counts as just changed
+                    files.append((entry.path, stat.st_size, max(stat.st_mtime, stat.st_ctime)))
+    except OSError as e:
+        logging.warning(f"Could not scan {directory}: {e}")
+    return files, directories
+
+
+def walk_files(roots, workers=DEFAULT_WORKERS):
+    """Yields the files under roots, one directory at a time, listing directories on worker threads.
+
+    At most two listings per worker are in flight, so listings do not pile up
+    while the caller is busy with the files.
+    """
+    directories = collections.deque(root for root in roots if os.path.isdir(root))
+    pending = set()
+    with ThreadPoolExecutor(workers, thread_name_prefix='IntegrityScan') as executor:
+        while directories or pending:
+            while directories and len(pending) < workers * 2:
+                pending.add(executor.submit(scan_directory, directories.popleft()))
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirectories = future.result()
+                directories.extend(subdirectories)
+                if files:
+                    yield files
+
+
+def get_preview_stem(name):
+    """Returns the name of the photo a preview belongs to, or None for a file that is not a preview."""
+    for kind in (SCREEN, THUMBNAIL):
+        suffix = f"_{kind}.jpg"
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return None
+
+
+class ScanReport:
+    """Numbers of the problems found by a scan, with a few example paths of each.
+
+    Every problem is also written to the CSV file given to the scanner, so the
+    report itself stays small for any project size.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.photos = 0
+        self.counts = {problem: 0 for problem in PROBLEMS}
+        self.fixed = {problem: 0 for problem in PROBLEMS}
+        self.examples = {problem: [] for problem in PROBLEMS}
+
+    def add(self, problem, path, fixed=False):
+        self.counts[problem] += 1
+        if fixed:
+            self.fixed[problem] += 1
+        if len(self.examples[problem]) < MAX_EXAMPLES:
+            self.examples[problem].append(path)
+
+    def has_problems(self):
+        """Tells whether the project has damage left; photos without a checksum are not damaged."""
+        return any(self.counts[problem] > self.fixed[problem] for problem in PROBLEMS if problem != UNHASHED)
+
+    def can_fix(self):
+        return any(self.counts[problem] > self.fixed[problem] for problem in FIXABLE_PROBLEMS)
+
+    def summary(self):
+        lines = [f"Scanned {self.files} files and {self.photos} photos."]
+        for problem in PROBLEMS:
+            if self.counts[problem]:
+                lines.append(f"{problem}: {self.counts[problem]} (fixed {self.fixed[problem]})")
+                lines.extend(f"    {path}" for path in self.examples[problem])
+        return '\n'.join(lines)
+
+
+class IntegrityScanner:
+    """Reconciles the Photos table of a project with the files in its media, objects and previews folders.
+
+    The folders are listed in parallel with os.scandir and the files are loaded
+    into a temporary table, which is then compared with the database in one pass
+    of set-based queries, a page at a time, so memory use does not grow with the
+    project. Files are matched with photos by the end of their path, so a project
+    copied to another folder is checked all the same. It finds:
+
+    - missing: photos whose file is gone,
+    - orphan: photo files that no photo refers to,
+    - corrupt: files whose size differs from the recorded one or that are
+      truncated JPEGs, and, with verify, files that no longer match their checksum,
+    - orphan_preview: previews of photo files that are gone,
+    - unhashed: photos saved before sizes and checksums were recorded.
+
+    With fix, the rows of missing photos are removed, orphan files are moved to
+    the project's orphans folder, orphan previews are removed, the checksums of
+    unhashed photos are filled in and the well sizes recounted. Corrupt files are
+    only reported. Files changed less than settle_seconds before the scan are
+    never orphans, they may belong to an interval being committed. The scanner
+    opens a connection of its own and can run on any thread, also while the
+    application uses the project.
+    """
+
+    def __init__(self, project, workers=DEFAULT_WORKERS, verify=False, fix=False, report_path=None,
+                 settle_seconds=SETTLE_SECONDS):
+        self.project = project
+        self.settle_seconds = settle_seconds
+        self.workers = workers
+        self.verify = verify
+        self.fix = fix
+        self.report_path = report_path
+        self.report = ScanReport()
+        self.report_writer = None
+
+    def get_roots(self):
+        return {
+            KIND_PHOTO: [self.project.media_path, os.path.join(self.project.path, CONTENT_FOLDER)],
+            KIND_PREVIEW: [os.path.join(self.project.path, PREVIEWS_DIR)],
+        }
+
+    def run(self):
+        """Scans the project and returns a ScanReport."""
+        self.report = ScanReport()
+        db_manager = DataBaseManager(self.project)
+        report_file = None
+        try:
+            if self.report_path:
+                report_file = open(self.report_path, 'w', newline='', encoding='utf-8')
+                self.report_writer = csv.writer(report_file)
+                self.report_writer.writerow(['problem', 'path', 'fixed'])
+            with ThreadPoolExecutor(self.workers, thread_name_prefix='IntegrityCheck') as executor:
+                db_manager.create_scan_table(get_photo_key)
+                # Photos added after the listing started are not checked, their files may not have been listed
+                max_photo_id = db_manager.get_max_photo_id()
+                started_at = time.time()
+                self.load_files(db_manager)
+                self.check_photos(db_manager, executor, max_photo_id)
+                self.check_orphans(db_manager, started_at - self.settle_seconds)
+                self.check_orphan_previews(db_manager)
+                if self.fix:
+                    db_manager.recalculate_well_sizes()
+        finally:
+            db_manager.drop_scan_table()
+            db_manager.close_connection()
+            if report_file:
+                report_file.close()
+            self.report_writer = None
+        logging.info(f"Integrity scan of project {self.project.name} finished. {self.report.summary()}")
+        return self.report
+
+    def add_problem(self, problem, path, fixed=False):
+        self.report.add(problem, path, fixed)
+        if self.report_writer:
+            self.report_writer.writerow([problem, path, int(fixed)])
+
+    def load_files(self, db_manager):
+        with span('integrity.load_files', 'storage'):
+            for kind, roots in self.get_roots().items():
+                for files in walk_files(roots, self.workers):
+                    for start in range(0, len(files), SCAN_BATCH_SIZE):
+                        db_manager.add_scanned_files([
+                            (get_photo_key(path), path, kind, self.get_stem(kind, path), size, changed_at)
+                            for path, size, changed_at in files[start:start + SCAN_BATCH_SIZE]])
+                    self.report.files += len(files)
+        logging.info(f"Integrity scan listed {self.report.files} files.")
+
+    @staticmethod
+    def get_stem(kind, path):
+        name = os.path.basename(path)
+        if kind == KIND_PREVIEW:
+            return get_preview_stem(name)
+        return os.path.splitext(name)[0]
+
+    def check_photos(self, db_manager, executor, max_photo_id):
+        """Finds missing, corrupt and unhashed photos, checking the files of a page on worker threads.
+
+        Every file a photo refers to, also one of a deleted interval, is marked as
+        referenced; the files left unmarked are the orphans.
+        """
+        after_id = 0
+        while True:
+            with span('integrity.check_photos', 'storage', after=after_id):
+                rows = db_manager.get_scanned_photos_page(after_id, SCAN_BATCH_SIZE)
+                if not rows:
+                    return
+                after_id = rows[-1][0]
+                db_manager.mark_scanned_files_referenced([row[5] for row in rows if row[5] is not None])
+                # Deleted photos are removed by the deletion service, newer ones are not listed yet
+                rows = [row for row in rows if not row[4] and row[0] <= max_photo_id]
+                self.report.photos += len(rows)
+                missing_ids = []
+                checksums = []
+                for row, (problem, checksum) in zip(rows, executor.map(self.check_photo, rows)):
+                    # The file found, which may be in another folder than the stored path tells
+                    photo_id, path = row[0], row[6] or row[1]
+                    if problem == MISSING and self.fix:
+                        missing_ids.append(photo_id)
+                    if checksum is not None:
+                        checksums.append(checksum + (photo_id,))
+                    if problem:
+                        self.add_problem(problem, path, fixed=self.fix and problem in (MISSING, UNHASHED))
+                if missing_ids:
+                    db_manager.remove_photos(missing_ids)
+                if checksums:
+                    db_manager.set_photo_checksums(checksums)
+
+    def check_photo(self, row):
+        """Returns the problem of a photo, if any, and the (size, hash) to store for an unhashed one."""
+        _, _, size, digest, _, _, path, scanned_size = row
+        if path is None:
+            return MISSING, None
+        if size is not None and size != scanned_size:
+            return CORRUPT, None
+        if is_truncated_jpeg(path):
+            return CORRUPT, None
+        if digest is None:
+            return UNHASHED, hash_file(path) if self.fix else None
+        if self.verify and not verify_file(path, size, digest):
+            return CORRUPT, None
+        return None, None
+
+    def check_orphans(self, db_manager, changed_before):
+        after_key = ''
+        while True:
+            rows = db_manager.get_orphan_files_page(after_key, changed_before, SCAN_BATCH_SIZE)
+            if not rows:
+                return
+            after_key = rows[-1][0]
+            for _, path in rows:
+                self.add_problem(ORPHAN, path, fixed=self.fix and self.quarantine(path))
+
+    def quarantine(self, path):
+        """Moves an orphan file to the orphans folder of the project, keeping its relative path."""
+        destination = os.path.join(self.project.path, QUARANTINE_FOLDER, os.path.relpath(path, self.project.path))
+        try:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.move(path, destination)
+        except OSError as e:
+            logging.warning(f"Could not move orphan file {path}: {e}")
+            return False
+        logging.info(f"Orphan file {path} moved to {destination}.")
+        return True
+
+    def check_orphan_previews(self, db_manager):
+        after_key = ''
+        while True:
+            rows = db_manager.get_orphan_previews_page(after_key, SCAN_BATCH_SIZE)
+            if not rows:
+                return
+            after_key = rows[-1][0]
+            for _, path in rows:
+                self.add_problem(ORPHAN_PREVIEW, path, fixed=self.fix and self.remove_preview(path))
+
+    @staticmethod
+    def remove_preview(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logging.warning(f"Could not remove orphan preview {path}: {e}")
+            return False
+        return True
@@ -5,6 +5,29 @@ import time
 import uuid
 from abc import ABC, abstractmethod
 
+from src.models.project import Project
+from src.utils.data_base_manager import DataBaseManager
+from src.utils.photo_manager.capture_session import CaptureSession, recover_sessions
+from src.utils.tracing import traced
+
+STORAGE_LAYOUT_NAMED = 'named'
+STORAGE_LAYOUT_CONTENT = 'content'
+CONTENT_FOLDER = 'objects'
+
+
+def is_session_committed(session):
+    """Tells whether the interval of a capture session being committed was stored in its project database."""
+    if session.project_path is None or session.interval_id is None or not session.targets:
+        return False
+    project = Project(session.project_name, session.project_path)
+    if not os.path.exists(DataBaseManager.get_database_path(project)):
+        return False
+    db_manager = DataBaseManager(project, read_only=True)
+    try:
+        return db_manager.has_photo(session.interval_id, session.targets[0]['destination'])
+    finally:
+        db_manager.close_connection()
+
 
 class BasePhotoManager(ABC):
     def __init__(self, temp_storage="temp/photos"):
@@ -12,10 +35,14 @@ class BasePhotoManager(ABC):
         self.permanent_storage_path_in_project = 'media'
         self.setup_default_command_parameters()
         self.setup_paths()
+        self.recover_capture_sessions()
 
     @abstractmethod
-    def take_photos(self, project, well, width=0, height=0):
-        """Captures photos using both configured cameras."""
+    def take_photos(self, project, well, width=0, height=0, session=None):
+        """Captures photos using both configured cameras into a capture session."""
+
+    def shutdown(self):
+        """Releases camera resources held between captures."""
 
     def setup_default_command_parameters(self):
         file_path = "./photo_command_parameters.txt"
@@ -27,6 +54,7 @@ class BasePhotoManager(ABC):
                         "# A comment line starts with symbol '#'\n",
                         "# the default command is \"libcamera-still --nopreview\"\n",
                         "# you can add and change any another parameters\n",
+                        "# parameters after a \"[camera N]\" line apply only to camera N\n",
                         "--autofocus-mode manual\n",
                         "--lens-position 5\n",
                         "--metering spot\n",
@@ -38,41 +66,79 @@ class BasePhotoManager(ABC):
         os.makedirs(self.temp_photo_path, exist_ok=True)
         logging.info("Storage paths set up at %s.", self.temp_photo_path)
 
-    def move_photos(self, destination, interval):
-        """Moves and renames all photos from the temporary location to the specified destination."""
-        moved_photos = []
-        for filename in os.listdir(self.temp_photo_path):
-            src = os.path.join(self.temp_photo_path, filename)
-            # Decompose the filename to insert interval name
-            parts = filename.split("_")
-            # Assuming filename format is "ProjectName_WellName_cameraX_timestamp_uuid.jpg"
-            new_filename_parts = parts[:2]  # ProjectName and WellName
-            new_filename_parts.append(interval.get_full_name())  # Add interval full name
-            new_filename_parts.extend(parts[2:3])  # cameraX, timestamp, uuid, and .jpg
-            new_filename = "_".join(new_filename_parts)
-            new_filename = new_filename + ".jpg"
-            dest = os.path.join(destination, new_filename)
-            shutil.move(src, dest)
-            moved_photos.append(dest)
-            logging.info("Photo moved and renamed to %s", dest)
-        return moved_photos
-
-    def clear_temp_storage(self):
-        """Clears all files in the temporary storage directory."""
+    def recover_capture_sessions(self):
+        """Finishes commits interrupted by a crash and drops sessions left from the previous run."""
+        return recover_sessions(self.temp_photo_path, is_session_committed)
+
+    def create_capture_session(self, project, well):
+        """Creates a staging directory of its own for one capture, so captures can overlap."""
+        return CaptureSession.create(self.temp_photo_path, project, well)
+
+    def plan_photos(self, destination, interval, session, content_root=None):
+        """Names the photos of a capture session after the interval and plans their move to destination."""
+        prefix = f"{session.project_name}_{session.well_name}_{interval.get_full_name()}"
+        return session.prepare_commit(interval.id, destination, prefix, content_root)
+
+    @traced('move_photos', 'storage')
+    def move_photos(self, session):
+        """Moves and renames the photos of a capture session to their planned destinations."""
+        session.finish_commit()
+
+    def clear_temp_storage(self, session=None):
+        """Discards a capture session, or the whole temporary storage directory if no session is given."""
+        if session:
+            session.discard()
+            return
         for filename in os.listdir(self.temp_photo_path):
             file_path = os.path.join(self.temp_photo_path, filename)
-            os.remove(file_path)
+            if os.path.isdir(file_path):
+                shutil.rmtree(file_path, ignore_errors=True)
+            else:
+                os.remove(file_path)
             logging.info("Cleared temporary file %s", file_path)
 
-    def save_photos_to_permanent_storage(self, project, well, interval):
-        """Moves photos from temporary to permanent storage, renaming them to include interval details."""
-        permanent_folder = os.path.join(
+    def get_permanent_folder(self, project, well):
+        return os.path.join(
             project.path,
             self.permanent_storage_path_in_project,
             project.name,
             well.name)
-        os.makedirs(permanent_folder, exist_ok=True)
-        return self.move_photos(permanent_folder, interval)
+
+    def get_content_folder(self, project):
+        return os.path.join(project.path, CONTENT_FOLDER)
+
+    def plan_permanent_storage(self, project, well, interval, session, layout=STORAGE_LAYOUT_NAMED):
+        """Plans the move of photos from temporary to permanent storage and returns them as Photo objects.
+
+        In the named layout the files are renamed to include interval details; in the
+        content layout they are stored under the project's objects folder by checksum.
+        """
+        if layout == STORAGE_LAYOUT_CONTENT:
+            return self.plan_photos(None, interval, session, self.get_content_folder(project))
+        return self.plan_photos(self.get_permanent_folder(project, well), interval, session)
+
+    def commit_interval(self, db_manager, project, well, interval_settings, session, layout=STORAGE_LAYOUT_NAMED):
+        """Stores an interval with the photos of a capture session and returns the new Interval.
+
+        The photos are named after the interval inside its transaction, but moved to
+        permanent storage only once it is committed. If the transaction fails the
+        session is left as it was, so the interval can be confirmed again. If the
+        move fails the session is kept and the move is finished on the next start.
+        Takes the DataBaseManager first, so it can be queued on the database service.
+        """
+        try:
+            interval = db_manager.commit_interval(
+                well.id, interval_settings,
+                lambda new_interval: self.plan_permanent_storage(project, well, new_interval, session, layout))
+        except Exception:
+            session.cancel_commit()
+            raise
+        try:
+            self.move_photos(session)
+        except Exception as e:
+            logging.error("Photos of capture session %s not moved, the move is finished on the next start: %s",
+                          session.directory, e)
+        return interval
 
     @staticmethod
     def generate_unique_photo_name(project, well, camera_num):
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import threading
+
+from src.utils.qt_future import QtFuture
+
+
+class CameraIoThread(threading.Thread):
+    """Owns the single asyncio event loop that runs all camera work.
+
+    Captures, camera probes and health checks are submitted as coroutines from any
+    thread. submit() returns a QtFuture whose signals reach the submitting Qt
+    thread; run_sync() blocks for code that runs outside the Qt event loop.
+    """
+
+    def __init__(self):
+        super().__init__(name="CameraIoThread", daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._periodic_tasks = []
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def start(self):
+        super().start()
+        self._started.wait()
+        logging.info("Camera I/O thread started.")
+        return self
+
+    def submit(self, coroutine):
+        """Schedules a coroutine on the camera loop and returns a QtFuture with its result."""
+        future = QtFuture()
+        concurrent_future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        concurrent_future.add_done_callback(lambda done: _resolve(future, done))
+        return future
+
+    def run_sync(self, coroutine, timeout=None):
+        """Runs a coroutine on the camera loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    def call_periodic(self, coroutine_function, interval):
+        """Runs coroutine_function() every interval seconds until the thread stops."""
+        async def repeat():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await coroutine_function()
+                except Exception as e:
+                    logging.error(f"Periodic camera task {coroutine_function.__name__} failed: {e}")
+
+        self._periodic_tasks.append(asyncio.run_coroutine_threadsafe(repeat(), self.loop))
+
+    def stop(self, timeout=5.0):
+        if not self.is_alive():
+            return
+        for task in self._periodic_tasks:
+            task.cancel()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(timeout)
+        logging.info("Camera I/O thread stopped.")
+
+
+def _resolve(future, concurrent_future):
+    if concurrent_future.cancelled():
+        future.set_exception(asyncio.CancelledError())
+    elif concurrent_future.exception() is not None:
+        future.set_exception(concurrent_future.exception())
+    else:
+        future.set_result(concurrent_future.result())
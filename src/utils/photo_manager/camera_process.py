@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+
+from src.utils.tracing import span
+
+# libcamera-still in "--signal" mode captures a frame on SIGUSR1 and quits on SIGUSR2.
+CAPTURE_SIGNAL = getattr(signal, 'SIGUSR1', None)
+STOP_SIGNAL = getattr(signal, 'SIGUSR2', None)
+
+JPEG_END_MARKER = b'\xff\xd9'
+
+
+class CameraProcessError(Exception):
+    """Raised when a resident camera process fails to deliver a frame."""
+
+
+class CameraProcess:
+    """Keeps one capture process per camera resident between shots.
+
+    The process is started once with the sensor open, so autofocus and AE/AWB settle
+    only at startup. Every capture sends it a signal and collects the next frame it
+    writes into its spool directory.
+    """
+
+    def __init__(self, camera_index, spool_dir, command_factory, width=0, height=0,
+                 warmup=2.0, frame_timeout=10.0, poll_interval=0.02):
+        self.camera_index = camera_index
+        self.spool_dir = spool_dir
+        self.command_factory = command_factory
+        self.width = width
+        self.height = height
+        self.warmup = warmup
+        self.frame_timeout = frame_timeout
+        self.poll_interval = poll_interval
+
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self._lock = threading.RLock()
+        # Serialises captures from overlapping capture sessions; not an asyncio.Lock so the process can be
+        # driven from any event loop
+        self._capture_lock = threading.Lock()
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    @property
+    def output_pattern(self):
+        return os.path.join(self.spool_dir, f"camera{self.camera_index}_%04d.jpg")
+
+    def start(self):
+        """Starts the resident process, clearing frames left by a previous instance."""
+        with self._lock:
+            self._clear_spool()
+            command = self.command_factory(self.camera_index, self.output_pattern, self.width, self.height)
+            logging.info(f"Starting resident camera process {self.camera_index}: {' '.join(command)}")
+            with span('subprocess spawn', 'camera', camera=self.camera_index, resident=True):
+                self.process = subprocess.Popen(
+                    command,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE)
+            self.started_at = time.monotonic()
+            threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+
+    def stop(self, timeout=3.0):
+        """Asks the process to quit and kills it if it does not exit in time."""
+        with self._lock:
+            process, self.process = self.process, None
+        if process is None or process.poll() is not None:
+            return
+        with span('subprocess exit', 'camera', camera=self.camera_index, resident=True):
+            try:
+                if STOP_SIGNAL is not None:
+                    process.send_signal(STOP_SIGNAL)
+                else:
+                    process.terminate()
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                logging.warning(f"Camera process {self.camera_index} did not stop, killing it.")
+                process.kill()
+                process.wait()
+        logging.info(f"Resident camera process {self.camera_index} stopped.")
+
+    def restart(self):
+        with self._lock:
+            self.stop()
+            self.restarts += 1
+            self.start()
+
+    def is_alive(self):
+        process = self.process
+        return process is not None and process.poll() is None
+
+    def check_health(self):
+        """Restarts the process if it has died. Returns True if it was already healthy.
+
+        Runs off the camera event loop. A capture in progress checks the process
+        itself, so the process is left to it rather than restarted under it.
+        """
+        if not self._capture_lock.acquire(blocking=False):
+            return True
+        try:
+            return self._ensure_running()
+        finally:
+            self._capture_lock.release()
+
+    def _ensure_running(self):
+        with self._lock:
+            process = self.process
+            if process is not None and process.poll() is None:
+                return True
+            if process is not None:
+                logging.error(f"Camera process {self.camera_index} exited with code {process.returncode}, "
+                              f"restarting.")
+            self.restart()
+            return False
+
+    def _reconfigure(self, width, height):
+        with self._lock:
+            if (width, height) == (self.width, self.height) and self.is_alive():
+                return
+            self.width, self.height = width, height
+            self.restart()
+
+    async def capture(self, photo_path, width=0, height=0):
+        """Triggers one frame at the given resolution and moves it to photo_path. Retries once after a restart.
+
+        Restarts wait for the old process to exit, so they run on an executor
+        thread and do not hold up the other cameras on the event loop.
+        """
+        while not self._capture_lock.acquire(blocking=False):
+            await asyncio.sleep(self.poll_interval)
+        loop = asyncio.get_running_loop()
+        try:
+            if (width, height) != (self.width, self.height):
+                await loop.run_in_executor(None, self._reconfigure, width, height)
+            try:
+                return await self._capture_once(photo_path)
+            except CameraProcessError as e:
+                logging.error(f"Camera {self.camera_index} capture failed: {e}. Restarting process and retrying.")
+                await loop.run_in_executor(None, self.restart)
+                return await self._capture_once(photo_path)
+        finally:
+            self._capture_lock.release()
+
+    async def _capture_once(self, photo_path):
+        if not self.is_alive():
+            await asyncio.get_running_loop().run_in_executor(None, self._ensure_running)
+        # stop() may clear self.process from another thread, so the capture keeps its own handle
+        process = self.process
+        if process is None:
+            raise CameraProcessError("process is not running")
+
+        remaining_warmup = self.started_at + self.warmup - time.monotonic()
+        if remaining_warmup > 0:
+            await asyncio.sleep(remaining_warmup)
+
+        self._clear_spool()
+        with span('resident frame', 'camera', camera=self.camera_index):
+            process.send_signal(CAPTURE_SIGNAL)
+            frame = await self._wait_for_frame(process)
+        os.replace(frame, photo_path)
+        logging.info(f"Photo taken with resident camera {self.camera_index}: {photo_path}")
+        return photo_path
+
+    async def _wait_for_frame(self, process):
+        deadline = time.monotonic() + self.frame_timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CameraProcessError(f"process exited with code {process.returncode}")
+            for filename in sorted(os.listdir(self.spool_dir)):
+                if not filename.endswith('.jpg'):
+                    continue
+                path = os.path.join(self.spool_dir, filename)
+                if is_complete_jpeg(path):
+                    return path
+            await asyncio.sleep(self.poll_interval)
+        raise CameraProcessError(f"no frame within {self.frame_timeout} s")
+
+    def _clear_spool(self):
+        for filename in os.listdir(self.spool_dir):
+            os.remove(os.path.join(self.spool_dir, filename))
+
+    def _drain_stderr(self, process):
+        for line in process.stderr:
+            line = line.decode('utf-8', errors='replace').rstrip()
+            if 'ERROR' in line or 'WARN' in line:
+                logging.error(f"Camera process {self.camera_index}: {line}")
+            else:
+                logging.debug(f"Camera process {self.camera_index}: {line}")
+
+
+def is_complete_jpeg(path):
+    """Checks that a JPEG file has been fully written by looking for the end-of-image marker."""
+    try:
+        with open(path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            if file.tell() < len(JPEG_END_MARKER):
+                return False
+            file.seek(-len(JPEG_END_MARKER), os.SEEK_END)
+            return file.read() == JPEG_END_MARKER
+    except OSError:
+        return False
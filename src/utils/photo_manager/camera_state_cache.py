@@ -0,0 +1,45 @@
+import json
+import logging
+import os
+import time
+
+CAMERA_STATE_FILE = './camera_state.json'
+
+
+class CameraStateCache:
+    """Remembers the result of the last successful camera probe for a limited time.
+
+    A warm restart within the TTL trusts the cached camera count and skips running
+    libcamera-hello. Failed probes are not cached, so newly attached cameras are
+    found on the next start.
+    """
+
+    def __init__(self, path=CAMERA_STATE_FILE, ttl=3600.0):
+        self.path = path
+        self.ttl = ttl
+
+    def load(self):
+        """Returns the cached number of cameras, or None if there is no fresh entry."""
+        if self.ttl <= 0 or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            age = time.time() - state['checked_at']
+            if 0 <= age <= self.ttl:
+                logging.info(f"Using cached camera state from {int(age)} s ago: {state['cameras']} cameras.")
+                return int(state['cameras'])
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable camera state file {self.path}: {e}")
+        return None
+
+    def save(self, cameras):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as file:
+                json.dump({'checked_at': time.time(), 'cameras': cameras}, file)
+        except OSError as e:
+            logging.warning(f"Failed to save camera state to {self.path}: {e}")
+
+    def invalidate(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
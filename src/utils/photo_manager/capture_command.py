@@ -0,0 +1,130 @@
+import logging
+import os
+import shlex
+
+COMMAND_PARAMETERS_FILE = './photo_command_parameters.txt'
+BASE_COMMAND = ['libcamera-still', '--nopreview']
+# Options a resident camera sets itself; the spool pattern and the signal trigger depend on them
+RESIDENT_OPTIONS = ('-o', '--output', '-t', '--timeout', '-s', '--signal')
+
+
+class CaptureCommandTemplate:
+    """photo_command_parameters.txt compiled into argv options, reloaded only when the file changes.
+
+    Lines before the first ``[camera N]`` header apply to every camera. Lines after
+    a header override options of the same name for that camera only, e.g.::
+
+        --lens-position 5
+        [camera 1]
+        --lens-position 4.5
+    """
+
+    def __init__(self, path=COMMAND_PARAMETERS_FILE, base_command=None):
+        self.path = path
+        self.base_command = base_command or BASE_COMMAND
+        self.common_options = {}
+        self.camera_options = {}
+        self._mtime = None
+
+    def refresh(self):
+        """Recompiles the template if the parameters file was modified since the last compile."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime or mtime is None:
+            self.compile()
+            self._mtime = mtime
+
+    def compile(self):
+        self.common_options = {}
+        self.camera_options = {}
+        if not os.path.exists(self.path):
+            return
+        options = self.common_options
+        with open(self.path, encoding='utf-8') as file_command_parameters:
+            for line in file_command_parameters:
+                format_line = line.strip()
+                if len(format_line) == 0 or format_line[0] == '#':
+                    continue
+                if format_line.startswith('[') and format_line.endswith(']'):
+                    options = self.camera_options.setdefault(parse_camera_section(format_line), {})
+                    continue
+                options.update(parse_options(shlex.split(format_line)))
+        logging.info(f"Capture command parameters compiled from {self.path}.")
+
+    def get_options(self, camera_index):
+        options = dict(self.common_options)
+        options.update(self.camera_options.get(camera_index, {}))
+        return options
+
+    def build(self, camera_index, photo_path, width=0, height=0):
+        """Returns the argv of a capture with camera camera_index into photo_path."""
+        self.refresh()
+        options = self.get_options(camera_index)
+        if '-o' not in options and '--output' not in options:
+            options['-o'] = [str(photo_path)]
+        return self.assemble(options, camera_index, width, height)
+
+    def build_resident(self, camera_index, output_pattern, width=0, height=0):
+        """Returns the argv of a camera that stays open and captures into output_pattern on every SIGUSR1.
+
+        Output, timeout and signal options of the parameters file are dropped
+        with a warning, since the spool depends on them.
+        """
+        self.refresh()
+        options = self.get_options(camera_index)
+        for option in RESIDENT_OPTIONS:
+            if option in options:
+                values = options.pop(option)
+                logging.warning(f"Capture command parameter {' '.join([option] + values)} is ignored "
+                                f"by the resident camera {camera_index}.")
+        options['-o'] = [str(output_pattern)]
+        options['--signal'] = []
+        options['--timeout'] = ['0']
+        return self.assemble(options, camera_index, width, height)
+
+    def assemble(self, options, camera_index, width, height):
+        if '--width' not in options and width != 0:
+            options['--width'] = [str(width)]
+        if '--height' not in options and height != 0:
+            options['--height'] = [str(height)]
+        if '--camera' not in options:
+            options['--camera'] = [str(camera_index)]
+
+        command = list(self.base_command)
+        for option, values in options.items():
+            command.append(option)
+            command.extend(values)
+        return command
+
+
+def parse_camera_section(header):
+    """Returns N from a ``[camera N]`` header."""
+    name = header[1:-1].split()
+    if len(name) != 2 or name[0].lower() != 'camera' or not name[1].isdigit():
+        raise ValueError(f"Invalid section {header} in capture command parameters, expected [camera N]")
+    return int(name[1])
+
+
+def parse_options(tokens):
+    """Groups argv tokens into {option: [values]}, keeping negative numbers as values."""
+    options = {}
+    current = None
+    for token in tokens:
+        if token.startswith('-') and not is_number(token):
+            current = token
+            options[current] = []
+        elif current is None:
+            raise ValueError(f"Capture command parameter value {token} has no option")
+        else:
+            options[current].append(token)
+    return options
+
+
+def is_number(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
@@ -0,0 +1,253 @@
+import errno
+import json
+import logging
+import os
+import shutil
+import uuid
+
+from src.models.photo import Photo
+from src.utils.checksum import hash_file
+
+MANIFEST_NAME = 'manifest.json'
+
+STATE_CAPTURING = 'capturing'
+STATE_CAPTURED = 'captured'
+STATE_COMMITTING = 'committing'
+
+
+class CaptureSession:
+    """Photos of one capture, staged in a directory of their own with a manifest.
+
+    The manifest records which file came from which camera, so committing never
+    has to list the directory or parse file names. Committing is done in two
+    steps: prepare_commit() writes the planned destinations to the manifest while
+    the interval transaction is open, and finish_commit() renames every file and
+    syncs the destination directory once the transaction is committed. A session
+    that is being committed is not discarded, and a crash in between is finished
+    by recover_sessions(). The size and checksum of every photo are recorded in
+    the manifest too, and so are the project folder and the ID of the interval
+    being committed, so recovery can tell whether the interval was stored.
+    """
+
+    def __init__(self, directory, project_name, well_name, photos=None, state=STATE_CAPTURING, targets=None,
+                 project_path=None, interval_id=None):
+        self.directory = directory
+        self.project_name = project_name
+        self.well_name = well_name
+        self.project_path = project_path
+        self.interval_id = interval_id
+        self.photos = photos or []  # [{"camera": 1, "file": "name.jpg", "size": 123, "hash": "blake2b:..."}]
+        self.state = state
+        # [{"source": "name.jpg", "destination": "/abs/path.jpg", "name": "...", "size": 123, "hash": "...",
+        #   "shared": false}]
+        self.targets = targets or []
+
+    @staticmethod
+    def create(root, project, well):
+        directory = os.path.join(root, uuid.uuid4().hex)
+        os.makedirs(directory)
+        session = CaptureSession(directory, project.name, well.name, project_path=os.path.abspath(project.path))
+        session.write_manifest()
+        return session
+
+    @staticmethod
+    def load(directory):
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as manifest_file:
+            data = json.load(manifest_file)
+        return CaptureSession(directory, data['project'], data['well'], data['photos'], data['state'],
+                              data.get('targets'), data.get('project_path'), data.get('interval_id'))
+
+    def to_dict(self):
+        return {
+            'project': self.project_name,
+            'well': self.well_name,
+            'project_path': self.project_path,
+            'interval_id': self.interval_id,
+            'state': self.state,
+            'photos': self.photos,
+            'targets': self.targets,
+        }
+
+    def write_manifest(self):
+        """Atomically replaces the manifest and makes the change durable."""
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(self.to_dict(), manifest_file, ensure_ascii=False, indent=4)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(temp_path, manifest_path)
+        fsync_directory(self.directory)
+
+    def new_photo_path(self, photo_name):
+        return os.path.join(self.directory, photo_name)
+
+    def add_photos(self, camera_photos):
+        """Records the captured photos as (camera number, path) pairs; failed captures are skipped."""
+        for camera, path in camera_photos:
+            if path:
+                self.photos.append({'camera': camera, 'file': os.path.basename(path)})
+        self.state = STATE_CAPTURED
+        self.write_manifest()
+
+    def get_photo_paths(self):
+        return [os.path.join(self.directory, photo['file']) for photo in self.photos]
+
+    def set_processed(self, processed_photo):
+        """Records the size, checksum and crop of a processed photo, so committing does not read it again."""
+        for photo in self.photos:
+            if photo['file'] == os.path.basename(processed_photo.path):
+                photo['size'] = processed_photo.size
+                photo['hash'] = processed_photo.digest
+                photo['crop'] = processed_photo.crop
+
+    def ensure_checksums(self):
+        for photo in self.photos:
+            if 'hash' not in photo:
+                photo['size'], photo['hash'] = hash_file(os.path.join(self.directory, photo['file']))
+
+    def plan_commit(self, destination, prefix, content_root=None):
+        """Returns the target of every photo, named <prefix>_camera<N>.
+
+        The file is stored as destination/<prefix>_camera<N>.jpg, or, with a
+        content_root, as content_root/<ab>/<cd>/<checksum>.jpg, where a file with
+        the same content is shared instead of stored twice.
+        """
+        for photo in self.photos:
+            if not os.path.exists(os.path.join(self.directory, photo['file'])):
+                raise FileNotFoundError(f"Photo {photo['file']} is missing from capture session {self.directory}")
+        self.ensure_checksums()
+        targets = []
+        for photo in self.photos:
+            name = f"{prefix}_camera{photo['camera']}"
+            if content_root:
+                path = content_path(content_root, photo['hash'])
+            else:
+                path = os.path.join(destination, f"{name}.jpg")
+            targets.append({'source': photo['file'], 'destination': path, 'name': name, 'size': photo['size'],
+                            'hash': photo['hash'], 'crop': photo.get('crop'), 'shared': bool(content_root)})
+        return targets
+
+    def prepare_commit(self, interval_id, destination, prefix, content_root=None):
+        """Plans where the photos go and returns them as Photo objects without IDs; nothing is moved yet."""
+        self.targets = self.plan_commit(destination, prefix, content_root)
+        self.interval_id = interval_id
+        self.state = STATE_COMMITTING
+        self.write_manifest()
+        return [Photo(None, target['destination'], None, target['size'], target['hash'], target['name'],
+                      target['crop']) for target in self.targets]
+
+    def cancel_commit(self):
+        """Returns a session whose interval was not stored to the captured state, so it can be committed again."""
+        self.targets = []
+        self.interval_id = None
+        self.state = STATE_CAPTURED
+        self.write_manifest()
+
+    def finish_commit(self):
+        """Moves the photos to their planned destinations and removes the session."""
+        self.apply_targets()
+        self.remove()
+
+    def apply_targets(self):
+        destinations = set()
+        for target in self.targets:
+            source = os.path.join(self.directory, target['source'])
+            destination = target['destination']
+            if os.path.exists(source):
+                if target.get('shared') and os.path.exists(destination):
+                    logging.info("Photo %s is already stored as %s", target['source'], destination)
+                    os.remove(source)
+                else:
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                    move_file(source, destination)
+                    logging.info("Photo moved and renamed to %s", destination)
+            elif not os.path.exists(destination):
+                raise FileNotFoundError(f"Photo {target['source']} is missing from capture session {self.directory} "
+                                        f"and from {destination}")
+            destinations.add(os.path.dirname(destination))
+        for directory in destinations:
+            fsync_directory(directory)
+
+    def discard(self):
+        """Removes the session, unless its interval is stored and its photos are still to be moved."""
+        if self.state == STATE_COMMITTING:
+            logging.warning("Capture session %s is being committed, kept until its photos are moved", self.directory)
+            return
+        self.remove()
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        logging.info("Capture session %s removed", self.directory)
+
+
+def content_path(root, digest):
+    """Returns root/<ab>/<cd>/<hex>.jpg for a digest "<algorithm>:<hex>"."""
+    value = digest.partition(':')[2]
+    return os.path.join(root, value[:2], value[2:4], f"{value}.jpg")
+
+
+def recover_sessions(root, is_committed):
+    """Finishes or drops interrupted commits and discards sessions that were never committed.
+
+    is_committed(session) tells whether the interval of a session being committed
+    is in its project database. If it is, the photos are moved as planned;
+    otherwise the transaction never committed, nothing was moved and the session
+    is discarded. A session that cannot be checked or finished is left in place
+    and tried again on the next start. Returns the sessions whose commit was finished.
+    """
+    resumed = []
+    if not os.path.isdir(root):
+        return resumed
+    for entry in os.scandir(root):
+        if not entry.is_dir():
+            continue
+        try:
+            session = CaptureSession.load(entry.path)
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning("Discarding capture session %s without a valid manifest: %s", entry.path, e)
+            shutil.rmtree(entry.path, ignore_errors=True)
+            continue
+        if session.state == STATE_COMMITTING:
+            try:
+                if is_committed(session):
+                    logging.warning("Finishing interrupted commit of capture session %s", entry.path)
+                    session.apply_targets()
+                    resumed.append(session)
+                else:
+                    logging.warning("Discarding capture session %s, its interval was not stored", entry.path)
+            except Exception as e:
+                logging.error("Capture session %s kept, its interrupted commit could not be recovered: %s",
+                              entry.path, e)
+                continue
+        else:
+            logging.info("Discarding uncommitted capture session %s", entry.path)
+        session.remove()
+    return resumed
+
+
+def move_file(source, destination):
+    """Renames source to destination, copying with fsync when they are on different filesystems."""
+    try:
+        os.rename(source, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        temp_destination = destination + '.tmp'
+        with open(source, 'rb') as source_file, open(temp_destination, 'wb') as destination_file:
+            shutil.copyfileobj(source_file, destination_file, 1024 * 1024)
+            destination_file.flush()
+            os.fsync(destination_file.fileno())
+        os.replace(temp_destination, destination)
+        os.remove(source)
+
+
+def fsync_directory(directory):
+    """Makes renames inside a directory durable. Not supported on Windows, where it is skipped."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
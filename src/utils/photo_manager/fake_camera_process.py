@@ -0,0 +1,65 @@
+"""Stand-in for a resident ``libcamera-still --signal`` process.
+
+Behaves like the real capture process as far as CameraProcess is concerned: every
+SIGUSR1 writes the next frame of the ``-o`` pattern (a copy of a sample image),
+SIGUSR2 or SIGTERM make it exit. Used to exercise the resident capture pipeline
+on machines without cameras.
+"""
+import argparse
+import os
+import random
+import shutil
+import signal
+import sys
+import time
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Fake resident camera process.")
+    parser.add_argument('--camera', type=int, default=0)
+    parser.add_argument('-o', '--output', required=True, help='Output file pattern, e.g. frame_%%04d.jpg')
+    parser.add_argument('--sample-dir', default=os.path.join("resources", "img", "sample_images"))
+    parser.add_argument('--startup-delay', type=float, default=0.0, help='Simulated sensor initialisation time')
+    parser.add_argument('--capture-delay', type=float, default=0.1, help='Simulated exposure and encoding time')
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    samples = [
+        os.path.join(args.sample_dir, f)
+        for f in os.listdir(args.sample_dir)
+        if f.lower().endswith(('.jpg', '.jpeg'))
+    ]
+    if not samples:
+        sys.stderr.write(f"ERROR: no sample images in {args.sample_dir}\n")
+        return 1
+
+    pending = []
+    stopped = []
+    signal.signal(signal.SIGUSR1, lambda *_: pending.append(True))
+    signal.signal(signal.SIGUSR2, lambda *_: stopped.append(True))
+    signal.signal(signal.SIGTERM, lambda *_: stopped.append(True))
+
+    time.sleep(args.startup_delay)
+    sys.stderr.write(f"Fake camera {args.camera} ready\n")
+    sys.stderr.flush()
+
+    frame = 0
+    while not stopped:
+        if not pending:
+            time.sleep(0.01)
+            continue
+        pending.pop()
+        time.sleep(args.capture_delay)
+        target = args.output % frame if '%' in args.output else args.output
+        temp_target = target + '.part'
+        shutil.copyfile(random.choice(samples), temp_target)
+        os.replace(temp_target, target)
+        frame += 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,28 +1,84 @@
 import asyncio
 import logging
 import os
+import sys
 from src.utils.photo_manager.base_photo_manager import BasePhotoManager
+from src.utils.photo_manager.capture_command import CaptureCommandTemplate
+from src.utils.photo_manager.camera_process import CameraProcess, CameraProcessError
+from src.utils.tracing import span, traced
 
 
 class PhotoManager(BasePhotoManager):
-    def __init__(self, temp_storage="temp/photos"):
+    def __init__(self, temp_storage="temp/photos", resident=True, command_factory=None,
+                 spool_storage=os.path.join("temp", "spool"), warmup=2.0):
         super().__init__(temp_storage)
         self.camera_indexes = [0, 1]  # indexes of cameras to be used
 
+        # Resident mode keeps one capture process per camera open between shots
+        self.resident = resident
+        self.camera_processes = {}
+        if self.resident:
+            command_factory = command_factory or make_resident_command
+            self.camera_processes = {
+                camera_index: CameraProcess(
+                    camera_index,
+                    os.path.join(spool_storage, f"camera{camera_index}"),
+                    command_factory,
+                    warmup=warmup)
+                for camera_index in self.camera_indexes
+            }
+            try:
+                for camera_process in self.camera_processes.values():
+                    camera_process.start()
+            except Exception:
+                self.shutdown()
+                raise
+
     # Asynchronously takes photos with both cameras set up
-    async def take_photos(self, project, well, width=0, height=0):
-        self.clear_temp_storage()
+    @traced('take_photos', 'camera')
+    async def take_photos(self, project, well, width=0, height=0, session=None):
+        session = session or self.create_capture_session(project, well)
         tasks = []
         for camera_index in self.camera_indexes:
-            photo_path = os.path.join(self.temp_photo_path,
-                                      self.generate_unique_photo_name(project, well, camera_index))
-            task = asyncio.create_task(take_photo_with_camera(camera_index, photo_path, width, height))
+            photo_path = session.new_photo_path(self.generate_unique_photo_name(project, well, camera_index))
+            if self.resident:
+                task = asyncio.create_task(self.take_photo_with_resident_camera(camera_index, photo_path,
+                                                                                width, height))
+            else:
+                task = asyncio.create_task(take_photo_with_camera(camera_index, photo_path, width, height))
             tasks.append(task)
-        return await asyncio.gather(*tasks)
+        photos = await asyncio.gather(*tasks)
+        session.add_photos(zip(self.camera_indexes, photos))
+        return photos
 
+    @traced('take_photo_with_resident_camera', 'camera')
+    async def take_photo_with_resident_camera(self, camera_index, photo_path, width=0, height=0):
+        camera_process = self.camera_processes[camera_index]
+        try:
+            return await camera_process.capture(photo_path, width, height)
+        except (CameraProcessError, OSError) as e:
+            logging.error(f"Error taking photo with camera {camera_index}: {e}")
+            return None
 
-# Asynchronously checks the number of available cameras by parsing the output of the command.
-async def check_cameras():
+    async def check_camera_health(self):
+        """Restarts resident camera processes that have exited. Meant to run periodically."""
+        loop = asyncio.get_running_loop()
+        for camera_process in self.camera_processes.values():
+            # Restarting waits for the old process, so keep it off the camera event loop
+            await loop.run_in_executor(None, camera_process.check_health)
+
+    def shutdown(self):
+        """Stops the resident camera processes."""
+        for camera_process in self.camera_processes.values():
+            camera_process.stop()
+
+
+REQUIRED_CAMERAS = 2
+
+
+# Asynchronously counts the available cameras by parsing the output of the command. Returns 0 on errors.
+@traced('probe_cameras', 'camera')
+async def probe_cameras():
     command = "libcamera-hello --list-cameras"
     try:
         process = await asyncio.create_subprocess_shell(
@@ -33,64 +89,72 @@ async def check_cameras():
         stdout, stderr = await process.communicate()
         if stderr:
             logging.error(f"Error checking cameras: {stderr.decode()}")
-            return False
+            return 0
 
         # Parsing the command output to determine the number of available cameras
-        num_cameras = sum(1 for line in stdout.decode().split('\n') if
-                          line.strip().startswith(tuple(f"{i} :" for i in range(10))))
-        if num_cameras >= 2:
-            logging.info(f"Camera availability confirmed. Number of cameras: {num_cameras}")
-            return True
-        else:
-            logging.error(f"Insufficient cameras available; at least 2 are required. Only {num_cameras} found.")
-            return False
+        return sum(1 for line in stdout.decode().split('\n') if
+                   line.strip().startswith(tuple(f"{i} :" for i in range(10))))
     except Exception as e:
         logging.error(f"An error occurred while checking cameras: {e}")
+        return 0
+
+
+# Asynchronously checks that enough cameras are available.
+@traced('check_cameras', 'camera')
+async def check_cameras():
+    num_cameras = await probe_cameras()
+    if num_cameras >= REQUIRED_CAMERAS:
+        logging.info(f"Camera availability confirmed. Number of cameras: {num_cameras}")
+        return True
+    else:
+        logging.error(f"Insufficient cameras available; at least {REQUIRED_CAMERAS} are required. "
+                      f"Only {num_cameras} found.")
         return False
 
-def make_command(camera_index, photo_path, width=0, height=0):
-    command = f"libcamera-still --nopreview"
-    with open('./photo_command_parameters.txt', encoding='utf-8') as file_command_parameters:
-        lines = file_command_parameters.readlines()
-        for line in lines:
-            format_line = line.lstrip().replace("\r","").replace("\n","")
-            if len(format_line) == 0 or format_line[0] == '#':
-                continue
-            command = command + " " + format_line
 
-    if command.find(" --width ") == -1 and width != 0:
-        command = command + f" --width {str(width)}"
+capture_command_template = CaptureCommandTemplate()
 
-    if command.find(" --height ") == -1 and width != 0:
-        command = command + f" --height {str(height)}"
 
-    if command.find(" --camera ") == -1:
-        command = command + f" --camera {str(camera_index)}"
+def make_command(camera_index, photo_path, width=0, height=0):
+    """Builds the libcamera-still argv from the compiled photo_command_parameters.txt."""
+    command = capture_command_template.build(camera_index, photo_path, width, height)
+    logging.debug(f"Photo command: {' '.join(command)}")
+    return command
 
-    if command.find(" -o ") == -1:
-        command = command + f" -o {str(photo_path)}"
 
-    print("photo command: " + command)
+# Builds the argv of a libcamera-still instance that stays open and captures a frame on every SIGUSR1.
+def make_resident_command(camera_index, output_pattern, width=0, height=0):
+    command = capture_command_template.build_resident(camera_index, output_pattern, width, height)
+    logging.debug(f"Resident photo command: {' '.join(command)}")
     return command
 
 
+# Builds the argv of the fake resident process, used to run the resident pipeline without cameras.
+def make_fake_resident_command(camera_index, output_pattern, width=0, height=0):
+    return [sys.executable, "-m", "src.utils.photo_manager.fake_camera_process",
+            "--camera", str(camera_index), "-o", output_pattern]
+
+
 # Asynchronously executes the libcamera-still command to take a picture.
+@traced('take_photo_with_camera', 'camera')
 async def take_photo_with_camera(camera_index, photo_path, width=0, height=0):
     command = make_command(camera_index, photo_path, width, height)
-    logging.info(f"Starting command {command}")
-    process = await asyncio.create_subprocess_shell(
-        command,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
-    )
-    logging.info(f"Wait command result {command}")
-    stdout, stderr = await process.communicate()
+    logging.info(f"Starting command {' '.join(command)}")
+    with span('subprocess spawn', 'camera', camera=camera_index):
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    logging.info(f"Wait command result {' '.join(command)}")
+    with span('subprocess exit', 'camera', camera=camera_index):
+        stdout, stderr = await process.communicate()
 
     stderr = stderr.decode('utf-8')
     if stderr:
         error_messages = [line for line in stderr.split('\n') if 'ERROR' in line or 'WARN' in line]
         if error_messages:
-            logging.error(f"Error taking photo with camera {camera_index}: {stderr.decode()}")
+            logging.error(f"Error taking photo with camera {camera_index}: {stderr}")
             return None
     logging.info(f"Photo taken with camera {camera_index}: {photo_path}")
     return photo_path
@@ -23,7 +23,7 @@ class PhotoManagerEmulator(BasePhotoManager):
                             self.sample_images_dir)
 
     # Imitates capturing a photo using a sample image instead of a real camera.
-    async def take_photo_with_camera(self, project, well, camera_num):
+    async def take_photo_with_camera(self, project, well, camera_num, session):
         await asyncio.sleep(random.uniform(0.5, 2.0))  # Simulate delay
         sample_image_path = self.choose_sample_image()
         if not sample_image_path:
@@ -31,7 +31,7 @@ class PhotoManagerEmulator(BasePhotoManager):
             return None
 
         photo_name = self.generate_unique_photo_name(project, well, camera_num)
-        photo_path = os.path.join(self.temp_photo_path, photo_name)
+        photo_path = session.new_photo_path(photo_name)
         shutil.copy(sample_image_path, photo_path)
         logging.info("Simulated photo taken and saved at %s using %s", photo_path, sample_image_path)
         return photo_path
@@ -48,10 +48,10 @@ class PhotoManagerEmulator(BasePhotoManager):
             return None
 
     # Simulates capturing photos using both configured cameras asynchronously.
-    async def take_photos(self, project, well, width=0, height=0):
-        self.clear_temp_storage()
-        tasks = [
-            self.take_photo_with_camera(project, well, 1),
-            self.take_photo_with_camera(project, well, 2)
-        ]
-        return await asyncio.gather(*tasks)
+    async def take_photos(self, project, well, width=0, height=0, session=None):
+        session = session or self.create_capture_session(project, well)
+        camera_nums = [1, 2]
+        tasks = [self.take_photo_with_camera(project, well, camera_num, session) for camera_num in camera_nums]
+        photos = await asyncio.gather(*tasks)
+        session.add_photos(zip(camera_nums, photos))
+        return photos
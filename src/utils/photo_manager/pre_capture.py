@@ -0,0 +1,165 @@
+import logging
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class PreCapture(QObject):
+    """Capture of one interval into its own capture session, possibly started ahead of time.
+
+    If process_photos is given it is called with the photos as soon as they are
+    taken and returns one QtFuture per photo, so the photos are processed before
+    the review asks for them.
+    """
+    photos_ready = pyqtSignal(list)
+
+    def __init__(self, camera_io, photo_manager, project, well, interval_settings, width, height,
+                 process_photos=None, parent=None):
+        super().__init__(parent)
+        self.camera_io = camera_io
+        self.photo_manager = photo_manager
+        self.project = project
+        self.well = well
+        self.interval_settings = interval_settings
+        self.session = photo_manager.create_capture_session(project, well)
+        self.width = width
+        self.height = height
+        self.photos = None
+        self.process_photos = process_photos
+        self.processing = None
+        self.processing_error = None
+        self.discarded = False
+        self.released = False
+        self.future = None
+
+    def start(self):
+        if self.future is None:
+            logging.info(f"Capture of interval {self.interval_settings.interval_from}-"
+                         f"{self.interval_settings.interval_to} started in {self.session.directory}.")
+            self.future = self.camera_io.submit(
+                self.photo_manager.take_photos(self.project, self.well, self.width, self.height, self.session))
+            self.future.then(self.on_photos_ready, self.on_capture_failed)
+
+    def is_started(self):
+        return self.future is not None
+
+    def is_running(self):
+        """Tells whether the capture, or the processing of its photos, is still in flight."""
+        if self.future is None:
+            return False
+        if not self.future.done():
+            return True
+        return self.processing is not None and not all(future.done() for future in self.processing)
+
+    def is_done(self):
+        return self.photos is not None
+
+    def matches(self, project, well, interval_settings):
+        return (self.project.path == project.path
+                and self.well.id == well.id
+                and self.interval_settings.has_same_position(interval_settings))
+
+    def discard(self):
+        """Frees the capture session; a capture still in flight is cleaned up when it finishes."""
+        self.discarded = True
+        if not self.is_running():
+            self.release()
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        self.photo_manager.clear_temp_storage(self.session)
+        self.deleteLater()
+
+    def on_photos_ready(self, photos):
+        if self.discarded:
+            self.release()
+            return
+        self.photos = photos
+        if photos and self.process_photos:
+            try:
+                self.processing = self.process_photos(photos)
+                # Every photo is waited for, failed or not: the session cannot be removed while any is written
+                for future in self.processing:
+                    future.then(self.on_photo_processed, self.on_photo_processed)
+            except Exception as e:
+                logging.error(f"Processing of captured photos not started: {e}")
+                self.processing_error = e
+        self.photos_ready.emit(photos)
+
+    def on_photo_processed(self, _):
+        if self.discarded and not self.is_running():
+            self.release()
+
+    def on_capture_failed(self, error):
+        logging.error(f"Capture failed: {error}")
+        self.on_photos_ready([])
+
+
+class PreCaptureScheduler(QObject):
+    """Starts the capture of the next interval while the operator reviews the current one.
+
+    Once the photos of an interval are taken the rig advances, so after a short
+    delay the next interval is captured into a separate capture session. When the
+    operator reaches the review of that interval the ready (or running) capture is
+    handed over instead of starting a new one. A capture for a different position
+    is discarded. Every capture is passed to process_photos, see PreCapture.
+    """
+
+    def __init__(self, camera_io, photo_manager_getter, enabled=False, delay=1.0, process_photos=None,
+                 parent=None):
+        super().__init__(parent)
+        self.camera_io = camera_io
+        self.photo_manager_getter = photo_manager_getter
+        self.process_photos = process_photos
+        self.enabled = enabled
+        self.delay_ms = int(delay * 1000)
+        self.pending = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.start_pending)
+
+    def capture(self, project, well, interval_settings, width, height):
+        """Returns the capture for an interval, reusing a pre-captured one when it matches."""
+        capture = self.take(project, well, interval_settings)
+        if capture is not None:
+            logging.info("Using pre-captured photos for the interval.")
+            return capture
+        capture = PreCapture(self.camera_io, self.photo_manager_getter(), project, well, interval_settings,
+                             width, height, self.process_photos, self)
+        capture.start()
+        return capture
+
+    def schedule(self, project, well, interval_settings, width, height):
+        """Schedules the capture of an upcoming interval if pipelined capture is enabled."""
+        photo_manager = self.photo_manager_getter()
+        if not self.enabled or photo_manager is None:
+            return
+        self.cancel()
+        self.pending = PreCapture(self.camera_io, photo_manager, project, well, interval_settings,
+                                  width, height, self.process_photos, self)
+        self.timer.start(self.delay_ms)
+
+    def start_pending(self):
+        if self.pending:
+            self.pending.start()
+
+    def take(self, project, well, interval_settings):
+        """Returns the scheduled capture for this interval, or None if there is no matching one."""
+        pending, self.pending = self.pending, None
+        self.timer.stop()
+        if pending is None:
+            return None
+        if not pending.matches(project, well, interval_settings):
+            logging.info("Pre-captured photos belong to another interval, discarding them.")
+            pending.discard()
+            return None
+        pending.start()
+        return pending
+
+    def cancel(self):
+        pending, self.pending = self.pending, None
+        self.timer.stop()
+        if pending:
+            pending.discard()
@@ -0,0 +1,201 @@
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+
+from PIL import Image
+from PyQt5.QtGui import QPixmap
+
+from src.utils.image_processing import make_preview
+from src.utils.qt_future import QtFuture
+from src.utils.qt_image import read_scaled_qimage
+from src.utils.tracing import span
+
+PREVIEWS_DIR = 'previews'
+PREVIEW_QUALITY = 85
+
+SCREEN = 'screen'
+THUMBNAIL = 'thumb'
+
+
+class PreviewStore:
+    """Screen-sized and thumbnail JPEGs of a project's photos, kept in <project>/previews.
+
+    A derivative is named after its photo and regenerated when the photo is newer
+    than it, so a photo that was replaced under the same name gets new previews.
+    """
+
+    def __init__(self, project_path, screen_size=1920, thumbnail_size=320):
+        self.directory = os.path.join(project_path, PREVIEWS_DIR)
+        self.sizes = {SCREEN: screen_size, THUMBNAIL: thumbnail_size}
+
+    def get_path(self, photo_path, kind):
+        name, _ = os.path.splitext(os.path.basename(photo_path))
+        return os.path.join(self.directory, f"{name}_{kind}.jpg")
+
+    def is_fresh(self, photo_path, kind):
+        preview_path = self.get_path(photo_path, kind)
+        try:
+            return os.path.getmtime(preview_path) >= os.path.getmtime(photo_path)
+        except OSError:
+            return False
+
+    def generate(self, photo_path, screen_image=None):
+        """Writes both derivatives of a photo. screen_image is an already decoded preview to reuse."""
+        if screen_image is None:
+            screen_image = make_preview(photo_path, self.sizes[SCREEN])
+        os.makedirs(self.directory, exist_ok=True)
+        self._save(screen_image, self.get_path(photo_path, SCREEN))
+        thumbnail = screen_image.copy()
+        thumbnail.thumbnail((self.sizes[THUMBNAIL], self.sizes[THUMBNAIL]), Image.BILINEAR)
+        self._save(thumbnail, self.get_path(photo_path, THUMBNAIL))
+
+    def ensure(self, photo_path, kind):
+        """Returns the path of a derivative, generating it first if it is missing or stale."""
+        if not self.is_fresh(photo_path, kind):
+            logging.info(f"Generating previews of {photo_path}.")
+            self.generate(photo_path)
+        return self.get_path(photo_path, kind)
+
+    def load_image(self, photo_path, kind, generate=True):
+        """Returns a derivative as a QImage. Safe to call from worker threads.
+
+        If the derivative cannot be written, for example in a project on read-only
+        media, the photo itself is decoded at a reduced scale. Without generate
+        only a fresh stored derivative is read, and None is returned otherwise.
+        """
+        if not generate:
+            if not self.is_fresh(photo_path, kind):
+                return None
+            return read_scaled_qimage(self.get_path(photo_path, kind), self.sizes[kind])
+        try:
+            preview_path = self.ensure(photo_path, kind)
+        except OSError as e:
+            logging.warning(f"Previews of {photo_path} not stored, decoding the photo: {e}")
+            return read_scaled_qimage(photo_path, self.sizes[kind])
+        return read_scaled_qimage(preview_path, self.sizes[kind])
+
+    def remove(self, photo_path):
+        for kind in self.sizes:
+            preview_path = self.get_path(photo_path, kind)
+            if os.path.exists(preview_path):
+                os.remove(preview_path)
+
+    @staticmethod
+    def _save(image, path):
+        # Each writer has a temporary file of its own, as the same preview may be generated by two threads at once
+        descriptor, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+        os.close(descriptor)
+        try:
+            image.save(temp_path, format='JPEG', quality=PREVIEW_QUALITY)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+class PixmapLru:
+    """Least recently used pixmaps, limited by the memory their pixels take."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.pixmaps = OrderedDict()
+
+    @staticmethod
+    def size_of(pixmap):
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+    def get(self, key):
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        self.discard(key)
+        self.pixmaps[key] = pixmap
+        self.total_bytes += self.size_of(pixmap)
+        while self.total_bytes > self.max_bytes and len(self.pixmaps) > 1:
+            _, evicted = self.pixmaps.popitem(last=False)
+            self.total_bytes -= self.size_of(evicted)
+        return pixmap
+
+    def discard(self, key):
+        pixmap = self.pixmaps.pop(key, None)
+        if pixmap is not None:
+            self.total_bytes -= self.size_of(pixmap)
+
+
+class PreviewCache:
+    """Serves photo previews as pixmaps: from memory, from the project's previews or by decoding the photo.
+
+    Decoding and reading from disk run on the processing executor; only the
+    conversion to a QPixmap happens on the GUI thread. Use it from the GUI thread.
+    """
+
+    def __init__(self, processing_executor, max_bytes=64 * 1024 * 1024, screen_size=1920, thumbnail_size=320):
+        self.processing_executor = processing_executor
+        self.screen_size = screen_size
+        self.thumbnail_size = thumbnail_size
+        self.pixmaps = PixmapLru(max_bytes)
+
+    @staticmethod
+    def from_config(config, processing_executor):
+        return PreviewCache(
+            processing_executor,
+            int(config.get('preview', 'cache_mb', fallback='64')) * 1024 * 1024,
+            int(config.get('preview', 'size', fallback='1920')),
+            int(config.get('preview', 'thumbnail_size', fallback='320')))
+
+    def get_store(self, project):
+        return PreviewStore(project.path, self.screen_size, self.thumbnail_size)
+
+    def get_cached(self, photo_path, kind=SCREEN):
+        return self.pixmaps.get((photo_path, kind))
+
+    def load(self, project, photo_path, kind=SCREEN, generate=True):
+        """Returns a QtFuture with the QPixmap of a photo preview.
+
+        Without generate the preview is only read if it is stored, and the result is None otherwise.
+        """
+        future = QtFuture()
+        pixmap = self.get_cached(photo_path, kind)
+        if pixmap is not None:
+            future.set_result(pixmap)
+            return future
+        try:
+            image_future = self.processing_executor.submit(self.get_store(project).load_image, photo_path, kind,
+                                                           generate)
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        image_future.then(lambda image: future.set_result(self._put_image(photo_path, kind, image)),
+                          future.set_exception)
+        return future
+
+    def store(self, project, photo_path, preview_image, pixmap=None):
+        """Saves the previews of a newly captured photo from its already decoded preview image.
+
+        The derivatives are written on the processing executor; the pixmap, if given,
+        is cached right away so the photo can be shown without reading it back.
+        """
+        if pixmap is not None:
+            self.pixmaps.put((photo_path, SCREEN), pixmap)
+        try:
+            return self.processing_executor.submit(self.get_store(project).generate, photo_path, preview_image)
+        except Exception as e:
+            # The previews are generated on first view instead
+            logging.warning(f"Previews of {photo_path} not stored: {e}")
+            return None
+
+    def forget(self, photo_path):
+        for kind in (SCREEN, THUMBNAIL):
+            self.pixmaps.discard((photo_path, kind))
+
+    def _put_image(self, photo_path, kind, image):
+        if image is None:
+            return None
+        with span('QPixmap load', 'ui', path=photo_path, kind=kind):
+            pixmap = QPixmap.fromImage(image)
+        return self.pixmaps.put((photo_path, kind), pixmap)
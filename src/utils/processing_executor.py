@@ -0,0 +1,107 @@
+import logging
+import threading
+
+from PyQt5.QtCore import QRunnable, QThreadPool
+
+from src.utils.qt_future import QtFuture, gather
+
+
+class ProcessingQueueFull(Exception):
+    """Raised when the executor already holds its maximum number of pending tasks."""
+
+
+class ProcessingTask(QRunnable):
+    def __init__(self, fn, args, kwargs, future, on_complete):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.on_complete = on_complete
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            logging.error(f"Processing task {getattr(self.fn, '__name__', self.fn)} failed: {e}")
+            self.on_complete()
+            self.future.set_exception(e)
+        else:
+            self.on_complete()
+            self.future.set_result(result)
+
+
+class ProcessingExecutor:
+    """Runs image work (crops, previews, checksums...) on a pool of worker threads.
+
+    PIL releases the GIL while decoding and encoding, so tasks for different
+    cameras run on separate cores. Every task returns a QtFuture whose signals are
+    delivered on the submitting thread. The number of pending tasks is bounded, so
+    a burst of intervals cannot queue an unbounded number of decoded images.
+    """
+
+    def __init__(self, max_workers=0, max_pending=8):
+        self.thread_pool = QThreadPool()
+        if max_workers > 0:
+            self.thread_pool.setMaxThreadCount(max_workers)
+        self.max_pending = max_pending
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._active = set()
+        logging.info(f"Processing executor started with {self.thread_pool.maxThreadCount()} workers "
+                     f"and {max_pending} pending tasks at most.")
+
+    def submit(self, fn, *args, timeout=0, **kwargs):
+        """Queues fn(*args, **kwargs) and returns its QtFuture.
+
+        Waits up to timeout seconds for a free slot and raises ProcessingQueueFull
+        if none becomes available.
+        """
+        self._acquire(1, timeout)
+        return self._start(fn, args, kwargs)
+
+    def submit_batch(self, fn, items, *args, timeout=0, **kwargs):
+        """Queues fn(item, *args, **kwargs) for every item.
+
+        Returns a QtFuture with the list of results in submission order, or the
+        first error raised by any of the tasks.
+        """
+        return gather(self.submit_each(fn, items, *args, timeout=timeout, **kwargs))
+
+    def submit_each(self, fn, items, *args, timeout=0, **kwargs):
+        """Queues fn(item, *args, **kwargs) for every item and returns their QtFutures.
+
+        Either all items are queued or, if there are not enough free slots, none.
+        """
+        items = list(items)
+        self._acquire(len(items), timeout)
+        return [self._start(fn, (item,) + args, kwargs) for item in items]
+
+    def pending_count(self):
+        return len(self._active)
+
+    def shutdown(self, wait=True):
+        self.thread_pool.clear()
+        if wait:
+            self.thread_pool.waitForDone()
+
+    def _acquire(self, count, timeout):
+        if count > self.max_pending:
+            raise ProcessingQueueFull(f"{count} tasks exceed the limit of {self.max_pending} pending tasks")
+        acquired = 0
+        for _ in range(count):
+            if timeout:
+                has_slot = self._pending.acquire(timeout=timeout)
+            else:
+                has_slot = self._pending.acquire(blocking=False)
+            if not has_slot:
+                for _ in range(acquired):
+                    self._pending.release()
+                raise ProcessingQueueFull(f"Processing queue is full ({self.max_pending} pending tasks)")
+            acquired += 1
+
+    def _start(self, fn, args, kwargs):
+        future = QtFuture()
+        self._active.add(future)
+        future.then(lambda _: self._active.discard(future), lambda _: self._active.discard(future))
+        self.thread_pool.start(ProcessingTask(fn, args, kwargs, future, self._pending.release))
+        return future
@@ -0,0 +1,257 @@
+import csv
+import json
+import logging
+import os
+import shutil
+import tarfile
+import time
+import zipfile
+
+from src.models.project import Project
+from src.utils.data_base_manager import DataBaseManager
+from src.utils.integrity_scanner import get_photo_key, resolve_photo_path
+from src.utils.tracing import span
+
+EXPORT_CHUNK_SIZE = 8 * 1024 * 1024
+# The archive is synced and the progress saved after every this many bytes of photos
+CHECKPOINT_BYTES = 256 * 1024 * 1024
+EXPORT_PAGE_SIZE = 1000  # photo paths read from the snapshot at a time
+MANIFEST_NAME = 'manifest.csv'
+MANIFEST_COLUMNS = ['well', 'interval_from', 'interval_to', 'condition', 'is_marked', 'version', 'photo', 'path',
+                    'size', 'hash']
+
+FORMAT_TAR = 'tar'
+FORMAT_ZIP = 'zip'
+
+
+def get_archive_format(output_path):
+    if output_path.lower().endswith('.zip'):
+        return FORMAT_ZIP
+    if output_path.lower().endswith('.tar'):
+        return FORMAT_TAR
+    raise ValueError(f"Unknown archive format of {output_path}, expected .tar or .zip")
+
+
+def open_for_sequential_read(path):
+    file = open(path, 'rb', buffering=0)
+    if hasattr(os, 'posix_fadvise'):
+        # Lets the kernel read ahead in large blocks
+        os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return file
+
+
+class TarArchive:
+    """An uncompressed tar archive, which can be continued from the end of any member."""
+
+    def __init__(self, output_path, resume_offset=None):
+        if resume_offset is None:
+            self.file = open(output_path, 'wb', buffering=EXPORT_CHUNK_SIZE)
+        else:
+            # Whatever was written after the last checkpoint is dropped and written again
+            self.file = open(output_path, 'r+b', buffering=EXPORT_CHUNK_SIZE)
+            self.file.truncate(resume_offset)
+            self.file.seek(resume_offset)
+        self.tar = tarfile.open(fileobj=self.file, mode='w', format=tarfile.PAX_FORMAT,
+                                copybufsize=EXPORT_CHUNK_SIZE)
+
+    def add_file(self, name, path):
+        info = self.tar.gettarinfo(path, name)
+        with open_for_sequential_read(path) as file:
+            self.tar.addfile(info, file)
+        return info.size
+
+    def sync(self):
+        """Makes everything written so far durable and returns the offset to resume from."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.tar.offset
+
+    def close(self):
+        self.tar.close()
+        self.sync()
+        self.file.close()
+
+
+class ZipArchive:
+    """A zip archive with stored, not compressed, members; photos do not compress.
+
+    The central directory is written only when the archive is closed, so an
+    interrupted zip export starts over.
+    """
+
+    def __init__(self, output_path):
+        self.zip = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED, allowZip64=True)
+
+    def add_file(self, name, path):
+        info = zipfile.ZipInfo.from_file(path, name)
+        with open_for_sequential_read(path) as source, self.zip.open(info, 'w', force_zip64=True) as target:
+            shutil.copyfileobj(source, target, EXPORT_CHUNK_SIZE)
+        return info.file_size
+
+    def sync(self):
+        return None
+
+    def close(self):
+        self.zip.close()
+
+
+class ProjectExporter:
+    """Writes a project, or some of its wells, into a single tar or zip archive.
+
+    The database is first copied with the SQLite backup API into a staging folder
+    next to the archive, and everything else is read from that snapshot. Deleted
+    wells and intervals and, with well_names, the other wells are removed from
+    it, and its photo paths are made relative to the project folder, so the
+    unpacked archive opens as a project wherever it is. The archive holds the
+    project file, the snapshot, the photos and a manifest.csv with the well,
+    interval, version and path of every photo, all under a folder named after
+    the project. Photos are read in large sequential chunks in path order, a
+    page of paths at a time, so memory use does not depend on the size of the
+    project.
+
+    A tar export saves its progress after every CHECKPOINT_BYTES of photos and
+    an interrupted one continues from there when run again with the same output
+    path. Previews are not exported; they are made again when needed.
+    """
+
+    def __init__(self, project, output_path, well_names=None):
+        self.project = project
+        self.output_path = output_path
+        self.well_names = well_names
+        self.format = get_archive_format(output_path)
+        self.staging_path = output_path + '.parts'
+        self.progress_path = output_path + '.progress'
+        self.snapshot = Project(project.name, self.staging_path)
+        self.archive = None
+        self.photos = 0
+        self.missing = 0
+        self.bytes_written = 0
+
+    def get_archive_name(self, relative_path):
+        return f"{self.project.name}/{relative_path}"
+
+    def load_progress(self):
+        if self.format != FORMAT_TAR or not os.path.exists(self.progress_path):
+            return None
+        if not os.path.exists(self.output_path) or not os.path.exists(self.get_snapshot_database_path()):
+            logging.warning(f"Progress of the export into {self.output_path} found without its files, starting over.")
+            return None
+        with open(self.progress_path, 'r', encoding='utf-8') as progress_file:
+            return json.load(progress_file)
+
+    def save_progress(self, after_path):
+        offset = self.archive.sync()
+        if offset is None:
+            return
+        temp_path = self.progress_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as progress_file:
+            json.dump({'offset': offset, 'after_path': after_path}, progress_file)
+        os.replace(temp_path, self.progress_path)
+
+    def run(self):
+        """Exports the project and returns the number of photos written.
+
+        A resumed export counts only the photos written since it was resumed.
+        """
+        started_at = time.perf_counter()
+        progress = self.load_progress()
+        if progress is None:
+            self.make_snapshot()
+            self.archive = self.open_archive(None)
+            self.archive.add_file(self.get_archive_name(os.path.basename(self.project.get_file_path())),
+                                  self.project.get_file_path())
+            database_path = self.get_snapshot_database_path()
+            self.archive.add_file(self.get_archive_name(f"database/{os.path.basename(database_path)}"),
+                                  database_path)
+            self.save_progress('')
+            after_path = ''
+        else:
+            logging.info(f"Resuming the export into {self.output_path} at offset {progress['offset']}.")
+            self.archive = self.open_archive(progress['offset'])
+            after_path = progress['after_path']
+
+        db_manager = DataBaseManager(self.snapshot)
+        try:
+            self.export_photos(db_manager, after_path)
+            manifest_path = self.write_manifest(db_manager)
+        finally:
+            db_manager.close_connection()
+        self.archive.add_file(self.get_archive_name(MANIFEST_NAME), manifest_path)
+        self.archive.close()
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        elapsed = time.perf_counter() - started_at
+        logging.info(f"Exported {self.photos} photos, {self.bytes_written / 2 ** 20:.0f} MiB, into "
+                     f"{self.output_path} in {elapsed:.1f} s ({self.bytes_written / 2 ** 20 / max(elapsed, 1e-6):.0f} "
+                     f"MiB/s); {self.missing} photos were missing.")
+        return self.photos
+
+    def open_archive(self, resume_offset):
+        if self.format == FORMAT_TAR:
+            return TarArchive(self.output_path, resume_offset)
+        return ZipArchive(self.output_path)
+
+    def get_snapshot_database_path(self):
+        return os.path.join(self.staging_path, 'database', f"{self.project.name}_geo_photo_database.db")
+
+    def make_snapshot(self):
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+        os.makedirs(os.path.dirname(self.get_snapshot_database_path()))
+        with span('export.snapshot', 'storage'):
+            source = DataBaseManager(self.project, read_only=True)
+            try:
+                source.backup_to(self.get_snapshot_database_path())
+            finally:
+                source.close_connection()
+            snapshot = DataBaseManager(self.snapshot)
+            try:
+                snapshot.trim_for_export(get_photo_key, self.well_names)
+                # The snapshot is archived as a single file
+                snapshot.cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                snapshot.close_connection()
+
+    def export_photos(self, db_manager, after_path):
+        unsaved = 0
+        while True:
+            paths = db_manager.get_photo_paths_page(after_path, EXPORT_PAGE_SIZE)
+            if not paths:
+                break
+            with span('export.photos', 'storage', count=len(paths)):
+                for path in paths:
+                    unsaved += self.export_photo(path)
+                    after_path = path
+                    if unsaved >= CHECKPOINT_BYTES:
+                        self.save_progress(after_path)
+                        unsaved = 0
+        self.save_progress(after_path)
+
+    def export_photo(self, stored_path):
+        """Adds one photo to the archive and returns its size.
+
+        The photo is looked up in this project's folder, so a project copied from
+        another folder is exported all the same.
+        """
+        path = resolve_photo_path(self.project, stored_path)
+        try:
+            size = self.archive.add_file(self.get_archive_name(get_photo_key(stored_path)), path)
+        except FileNotFoundError:
+            logging.warning(f"Photo {path} is missing, not exported.")
+            self.missing += 1
+            return 0
+        self.photos += 1
+        self.bytes_written += size
+        return size
+
+    def write_manifest(self, db_manager):
+        manifest_path = os.path.join(self.staging_path, MANIFEST_NAME)
+        with open(manifest_path, 'w', newline='', encoding='utf-8') as manifest_file:
+            writer = csv.writer(manifest_file)
+            writer.writerow(MANIFEST_COLUMNS)
+            for row in db_manager.get_manifest_rows():
+                *fields, name, path, size, digest = row
+                relative_path = get_photo_key(path)
+                writer.writerow(fields + [name or os.path.splitext(os.path.basename(path))[0], relative_path,
+                                          size, digest])
+        return manifest_path
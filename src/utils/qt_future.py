@@ -0,0 +1,117 @@
+import logging
+import threading
+from functools import partial
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class QtFuture(QObject):
+    """Result of work running on another thread, delivered through Qt signals.
+
+    Create it on the thread that consumes the result (normally the GUI thread);
+    the worker calls set_result or set_exception. Callbacks registered with then()
+    run on the consuming thread, even if the work finished before they were
+    registered.
+    """
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.RLock()
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+
+    def set_result(self, result):
+        with self._lock:
+            self._result = result
+            self._event.set()
+            self.finished.emit(result)
+
+    def set_exception(self, error):
+        with self._lock:
+            self._error = error
+            self._event.set()
+            self.failed.emit(error)
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """Blocks until the result is available. Do not call it from the GUI thread."""
+        if not self._event.wait(timeout):
+            raise TimeoutError("Future did not complete in time")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def exception(self):
+        return self._error
+
+    def then(self, on_result, on_error=None):
+        with self._lock:
+            if self.done():
+                if self._error is None:
+                    QTimer.singleShot(0, partial(_call_if_alive, on_result, self._result))
+                elif on_error is not None:
+                    QTimer.singleShot(0, partial(_call_if_alive, on_error, self._error))
+            else:
+                self.finished.connect(on_result)
+                if on_error is not None:
+                    self.failed.connect(on_error)
+        return self
+
+
+def _call_if_alive(callback, value):
+    # Signal connections to a deleted window are dropped by Qt; do the same for deferred callbacks
+    receiver = getattr(callback, '__self__', None)
+    if isinstance(receiver, QObject) and sip.isdeleted(receiver):
+        return
+    callback(value)
+
+
+def gather(futures, parent=None):
+    """Returns a future with the list of results, failing with the first error of any future."""
+    futures = list(futures)
+    combined = QtFuture(parent)
+    results = [None] * len(futures)
+    remaining = [len(futures)]
+
+    def on_result(index, result):
+        results[index] = result
+        remaining[0] -= 1
+        if remaining[0] == 0 and not combined.done():
+            combined.set_result(results)
+
+    def on_error(error):
+        if not combined.done():
+            combined.set_exception(error)
+
+    if not futures:
+        combined.set_result(results)
+    for index, future in enumerate(futures):
+        future.then(partial(on_result, index), on_error)
+    return combined
+
+
+def run_in_thread(fn, *args, name=None):
+    """Runs fn(*args) on a thread of its own and returns a QtFuture with its result.
+
+    For long jobs, such as an integrity scan, that would hold a processing worker
+    for minutes. Call it from the thread that consumes the result.
+    """
+    future = QtFuture()
+
+    def run():
+        try:
+            result = fn(*args)
+        except Exception as e:
+            logging.error(f"Background job {name or getattr(fn, '__name__', fn)} failed: {e}")
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
@@ -0,0 +1,25 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QImageReader
+
+
+def pil_to_qimage(image):
+    """Converts an RGB PIL image to a QImage that owns its pixel data."""
+    width, height = image.size
+    data = image.tobytes('raw', 'RGB')
+    return QImage(data, width, height, 3 * width, QImage.Format_RGB888).copy()
+
+
+def read_scaled_qimage(path, max_size):
+    """Reads an image scaled down to fit in a max_size square.
+
+    For JPEG files Qt passes the scaled size to libjpeg, which decodes at 1/2, 1/4
+    or 1/8 scale instead of producing the full frame first. Safe to call from worker threads.
+    """
+    reader = QImageReader(path)
+    size = reader.size()
+    if size.isValid() and max(size.width(), size.height()) > max_size:
+        reader.setScaledSize(size.scaled(max_size, max_size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        raise OSError(f"Cannot read image {path}: {reader.errorString()}")
+    return image
@@ -0,0 +1,37 @@
+import logging
+import os
+
+from PyQt5.QtCore import QObject, QFileSystemWatcher
+from PyQt5.QtWidgets import QApplication
+
+
+class StyleSheet(QObject):
+    """Applies a Qt style sheet once to the whole application.
+
+    Windows inherit it from QApplication, so it is parsed once instead of for every
+    window. With watch enabled the file is applied again whenever it changes, which
+    lets styles be edited while the application is running.
+    """
+
+    def __init__(self, path, watch=False, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.watcher = None
+        if watch:
+            self.watcher = QFileSystemWatcher([self.path], self)
+            self.watcher.fileChanged.connect(self.on_file_changed)
+            logging.info(f"Watching {self.path} for style changes.")
+
+    def apply(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as style_file:
+                QApplication.instance().setStyleSheet(style_file.read())
+        except Exception as e:
+            logging.error(f"Error loading styles: {e}")
+
+    def on_file_changed(self, path):
+        # Editors often save by replacing the file, which drops it from the watcher
+        if path not in self.watcher.files() and os.path.exists(path):
+            self.watcher.addPath(path)
+        logging.info(f"Styles changed, reloading {path}.")
+        self.apply()
@@ -0,0 +1,188 @@
+import csv
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_CAPACITY = 100000
+CSV_FIELDS = ['name', 'category', 'thread', 'start_ms', 'duration_ms', 'args']
+
+
+class Span:
+    """One timed operation. Times are perf_counter_ns() values."""
+    __slots__ = ('name', 'category', 'start', 'end', 'thread_id', 'thread_name', 'args')
+
+    def __init__(self, name, category, start, end, thread_id, thread_name, args):
+        self.name = name
+        self.category = category
+        self.start = start
+        self.end = end
+        self.thread_id = thread_id
+        self.thread_name = thread_name
+        self.args = args
+
+
+class _ActiveSpan:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NullSpan:
+    """Shared span returned while tracing is disabled, so a disabled span costs one call."""
+    args = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects spans into a fixed-size ring buffer; the oldest spans are dropped first.
+
+    Spans recorded since the previous flush_interval() call make up one interval and
+    are written to their own CSV file, the whole buffer can be exported as a Chrome
+    trace (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.enabled = False
+        self.output_dir = None
+        self.spans = deque(maxlen=capacity)
+        self.origin = time.perf_counter_ns()
+        self.interval_start = self.origin
+        self._lock = threading.Lock()
+
+    def enable(self, output_dir, capacity=DEFAULT_CAPACITY):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.spans = deque(maxlen=capacity)
+        self.origin = time.perf_counter_ns()
+        self.interval_start = self.origin
+        self.enabled = True
+        logging.info(f"Tracing enabled, traces are written to {output_dir}.")
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, category='app', **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return _ActiveSpan(self, name, category, args)
+
+    def record(self, name, category, start, end, args=None):
+        thread = threading.current_thread()
+        with self._lock:
+            self.spans.append(Span(name, category, start, end, thread.ident, thread.name, args or {}))
+
+    def get_spans(self, since=None):
+        with self._lock:
+            spans = list(self.spans)
+        if since is not None:
+            spans = [span for span in spans if span.end >= since]
+        return spans
+
+    def flush_interval(self, interval_name):
+        """Writes the spans recorded since the previous flush to <output_dir>/<interval_name>.csv."""
+        if not self.enabled:
+            return None
+        now = time.perf_counter_ns()
+        spans = self.get_spans(self.interval_start)
+        self.interval_start = now
+        path = os.path.join(self.output_dir, f"{interval_name}.csv")
+        self.export_csv(path, spans, origin=spans[0].start if spans else now)
+        return path
+
+    def export_csv(self, path, spans=None, origin=None):
+        spans = self.get_spans() if spans is None else spans
+        origin = self.origin if origin is None else origin
+        with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(CSV_FIELDS)
+            for span in sorted(spans, key=lambda s: s.start):
+                writer.writerow([
+                    span.name,
+                    span.category,
+                    span.thread_name,
+                    f"{(span.start - origin) / 1e6:.3f}",
+                    f"{(span.end - span.start) / 1e6:.3f}",
+                    json.dumps(span.args, ensure_ascii=False, default=str) if span.args else '',
+                ])
+        logging.info(f"Trace of {len(spans)} spans written to {path}.")
+
+    def export_chrome_trace(self, path=None):
+        """Writes the ring buffer in the Chrome trace event format and returns the file path."""
+        path = path or os.path.join(self.output_dir, 'trace.json')
+        spans = self.get_spans()
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id, 'args': {'name': thread_name}}
+                  for thread_id, thread_name in {(s.thread_id, s.thread_name) for s in spans}]
+        for span in spans:
+            events.append({
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': (span.start - self.origin) / 1000,
+                'dur': (span.end - span.start) / 1000,
+                'pid': pid,
+                'tid': span.thread_id,
+                'args': {key: str(value) for key, value in span.args.items()},
+            })
+        with open(path, 'w', encoding='utf-8') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+        logging.info(f"Chrome trace of {len(spans)} spans written to {path}.")
+        return path
+
+
+tracer = Tracer()
+
+
+def span(name, category='app', **args):
+    """Context manager timing a block: ``with span('crop_image', 'image', path=path): ...``"""
+    return tracer.span(name, category, **args)
+
+
+def traced(name=None, category='app'):
+    """Decorator recording a span for every call of a function or coroutine function."""
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await function(*args, **kwargs)
+                with _ActiveSpan(tracer, span_name, category, {}):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with _ActiveSpan(tracer, span_name, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
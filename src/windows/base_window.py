@@ -1,14 +1,16 @@
-import logging
 import os.path
 import sys
 
+from PyQt5 import sip
 from PyQt5.QtCore import Qt
 from PyQt5.QtCore import QEvent
+from PyQt5.QtCore import QModelIndex
 from PyQt5.QtWidgets import QWidget
 from PyQt5.QtWidgets import QMainWindow
 from PyQt5.QtWidgets import QDoubleSpinBox
 from PyQt5.QtWidgets import QScrollArea
 from PyQt5.QtWidgets import QSpinBox
+from PyQt5.QtWidgets import QAbstractItemView
 
 
 class BaseWindow(QMainWindow):
@@ -18,11 +20,24 @@ class BaseWindow(QMainWindow):
         self.start_focus = None
         self.focusable_elements = []
         self.scroll_area = None
+        # Incremented by rebind() of cached windows, so results requested for earlier data can be recognised
+        self.binding = 0
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
 
-        self.load_styles()
+    def bound(self, callback):
+        """Wraps a callback so it is ignored if the window has been deleted or rebound to other data meanwhile.
+
+        Windows kept in the App window cache implement rebind() to show new data.
+        """
+        binding = self.binding
+
+        def call(*args):
+            # A cached window deleted by App.clear_window_cache() still gets the results it asked for
+            if not sip.isdeleted(self) and self.binding == binding:
+                callback(*args)
+        return call
 
     def install_focus_event_filters(self):
         for element in self.focusable_elements:
@@ -39,17 +54,21 @@ class BaseWindow(QMainWindow):
         if event.type() == QEvent.KeyPress and source in self.focusable_elements:
             idx = self.focusable_elements.index(source)
 
+            # A list is one element of the chain: Up/Down move through its rows and leave it at its ends
+            if isinstance(source, QAbstractItemView) and self.move_in_list(source, event.key()):
+                return True
+
             if event.key() == Qt.Key_Up:
                 if idx > 0:
-                    self.focusable_elements[idx - 1].setFocus()
+                    self.focus_element(self.focusable_elements[idx - 1], from_below=True)
                 else:
-                    self.focusable_elements[-1].setFocus()
+                    self.focus_element(self.focusable_elements[-1], from_below=True)
                 return True
             elif event.key() == Qt.Key_Down:
                 if idx < len(self.focusable_elements) - 1:
-                    self.focusable_elements[idx + 1].setFocus()
+                    self.focus_element(self.focusable_elements[idx + 1], from_below=False)
                 else:
-                    self.focusable_elements[0].setFocus()
+                    self.focus_element(self.focusable_elements[0], from_below=False)
                 return True
             elif event.key() in [Qt.Key_Left, Qt.Key_Right]:
                 if isinstance(source, QDoubleSpinBox) or isinstance(source, QSpinBox):
@@ -63,6 +82,35 @@ class BaseWindow(QMainWindow):
         # Для всех остальных событий пропускаем обработку через базовый класс
         return super().eventFilter(source, event)
 
+    @staticmethod
+    def focus_element(element, from_below):
+        if isinstance(element, QAbstractItemView) and element.model() is not None:
+            rows = element.model().rowCount()
+            if rows > 0:
+                element.setCurrentIndex(element.model().index(rows - 1 if from_below else 0, 0))
+        element.setFocus()
+
+    @staticmethod
+    def move_in_list(view, key):
+        """Moves the current row of a list view. Returns False when focus should leave the list."""
+        model = view.model()
+        if model is None or key not in (Qt.Key_Up, Qt.Key_Down):
+            return False
+        row = view.currentIndex().row()
+        if key == Qt.Key_Up:
+            if row <= 0:
+                return False
+            view.setCurrentIndex(model.index(row - 1, 0))
+            return True
+        if row < model.rowCount() - 1:
+            view.setCurrentIndex(model.index(row + 1, 0))
+            return True
+        if model.canFetchMore(QModelIndex()):
+            model.fetchMore(QModelIndex())
+            return True
+        # Stay on the last row while the next rows are still being loaded
+        return getattr(model, 'loading', False)
+
     def set_scroll_area(self, scroll_area):
         if isinstance(scroll_area, QScrollArea):
             self.scroll_area = scroll_area
@@ -75,22 +123,27 @@ class BaseWindow(QMainWindow):
     def switch_interface(self, interface_class, *args, **kwargs):
         self.app.switch_interface(interface_class, *args, **kwargs)
 
-    def get_database_manager(self):
-        return self.app.db_manager
+    def get_database_service(self):
+        return self.app.database_service
+
+    def get_deletion_service(self):
+        return self.app.deletion_service
 
     def get_photo_manager(self):
         return self.app.photo_manager
 
+    def get_processing_executor(self):
+        return self.app.processing_executor
+
+    def get_preview_cache(self):
+        return self.app.preview_cache
+
+    def get_pre_capture_scheduler(self):
+        return self.app.pre_capture_scheduler
+
     def get_config(self):
         return self.app.config_manager
 
-    def load_styles(self):
-        try:
-            with open(resource_path(os.path.join("resources", "styles", "styles.qss")), "r") as style_file:
-                self.setStyleSheet(style_file.read())
-        except Exception as e:
-            logging.error(f"Error loading styles: {e}")
-
 
 def resource_path(relative_path):
     try:
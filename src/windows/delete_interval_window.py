@@ -1,9 +1,6 @@
 from src.windows.base_window import BaseWindow
 from src.core.window_types import WindowType
 from resources.py.DeleteForm import Ui_DeleteForm
-import shutil
-import os
-import logging
 
 
 class DeleteIntervalWindow(BaseWindow):
@@ -30,15 +27,17 @@ class DeleteIntervalWindow(BaseWindow):
         self.start_focus = self.ui.no_pushButton
 
     def on_yes_clicked(self):
-        self.get_database_manager().delete_interval_and_related_photos(self.interval.id)
-        path_to_delete = os.path.join(self.project.media_path, self.well.name, self.interval.get_full_name())
-        try:
-            shutil.rmtree(path_to_delete)
-            logging.info(f"Directory '{path_to_delete}' and all its contents have been successfully deleted.")
-        except Exception as e:
-            logging.error(f"Error deleting directory '{path_to_delete}': {e}")
+        self.ui.yes_pushButton.setEnabled(False)
+        self.get_deletion_service().delete_interval(self.interval.id).then(
+            self.on_interval_deleted, self.on_delete_failed)
+
+    def on_interval_deleted(self, result):
         self.goto_well()
 
+    def on_delete_failed(self, error):
+        self.ui.question_label.setText(f"Не удалось удалить интервал: {str(error)}")
+        self.ui.yes_pushButton.setEnabled(True)
+
     def goto_well(self):
         self.switch_interface(WindowType.WELL_WINDOW, self.project, self.well)
 
@@ -1,7 +1,3 @@
-import shutil
-import os
-import logging
-
 from resources.py.DeleteForm import Ui_DeleteForm
 
 from src.windows.base_window import BaseWindow
@@ -31,15 +27,17 @@ class DeleteWellWindow(BaseWindow):
         self.start_focus = self.ui.no_pushButton
 
     def on_yes_clicked(self):
-        self.get_database_manager().delete_well_and_related_data(self.well.id)
-        path_to_delete = os.path.join(self.project.media_path, self.well.name)
-        try:
-            shutil.rmtree(path_to_delete)
-            logging.info(f"Directory '{path_to_delete}' and all its contents have been successfully deleted.")
-        except Exception as e:
-            logging.error(f"Error deleting directory '{path_to_delete}': {e}")
+        self.ui.yes_pushButton.setEnabled(False)
+        # The well disappears at once; its photos are removed in the background
+        self.get_deletion_service().delete_well(self.well.id).then(self.on_well_deleted, self.on_delete_failed)
+
+    def on_well_deleted(self, result):
         self.goto_project()
 
+    def on_delete_failed(self, error):
+        self.ui.question_label.setText(f"Не удалось удалить скважину: {str(error)}")
+        self.ui.yes_pushButton.setEnabled(True)
+
     def goto_well(self):
         self.switch_interface(WindowType.WELL_WINDOW, self.project, self.well)
 
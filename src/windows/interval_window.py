@@ -1,50 +1,72 @@
+import logging
 from functools import partial
 from PyQt5.QtWidgets import QPushButton
 from resources.py.IntervalForm import Ui_IntervalForm
 from src.windows.base_window import BaseWindow
 from src.core.window_types import WindowType
 from src.models.interval import BaseIntervalSettings
+from src.utils.data_base_manager import DataBaseManager
 
 
 class IntervalWindow(BaseWindow):
     def __init__(self, project, well, interval, app_instance, parent=None):
         super().__init__(app_instance, parent)
-        self.project = project
-        self.well = well
-        self.interval = interval
-
         self.ui = Ui_IntervalForm()
         self.ui.setupUi(self.central_widget)
         self.set_scroll_area(self.ui.scrollArea)
 
+        self.ui.back_button.clicked.connect(self.goto_well)
+
+        self.ui.next_interval_pushButton.clicked.connect(self.goto_new_interval)
+        self.ui.delete_interval_pushButton.clicked.connect(self.goto_delete_interval)
+
+        self.photos_buttons_list = []
+
+        self.rebind(project, well, interval)
+
+    def rebind(self, project, well, interval):
+        self.binding += 1
+        self.project = project
+        self.well = well
+        self.interval = interval
+
         self.ui.project_name_label.setText(self.project.name)
         self.ui.well_name_label.setText(self.well.name)
         self.ui.interval_name_label.setText(self.interval.get_full_name())
 
-        self.ui.back_button.clicked.connect(self.goto_well)
+        for photo_button in self.photos_buttons_list:
+            photo_button.deleteLater()
+        self.photos_buttons_list = []
 
-        self.ui.next_interval_pushButton.clicked.connect(self.goto_new_interval)
-        self.ui.delete_interval_pushButton.clicked.connect(self.goto_delete_interval)
+        # Focus
+        self.install_focusable_elements(
+            self.ui.back_button,
+            self.ui.next_interval_pushButton,
+            self.ui.delete_interval_pushButton)
+
+        self.start_focus = self.ui.next_interval_pushButton
 
-        photos_buttons_list = []
+        self.get_database_service().read(DataBaseManager.get_all_photos_by_interval_id, self.interval.id).then(
+            self.bound(self.on_photos_loaded), self.bound(self.on_photos_load_failed))
 
-        photos = self.get_database_manager().get_all_photos_by_interval_id(self.interval.id)
+    def on_photos_loaded(self, photos):
         for photo in photos:
             photo_button = QPushButton(photo.name)
             self.ui.photos_buttons_verticalLayout.layout().addWidget(photo_button)
-            photos_buttons_list.append(photo_button)
+            self.photos_buttons_list.append(photo_button)
             photo_button.clicked.connect(partial(self.goto_photo_view, photo))
-            self.focusable_elements.append(photo_button)
 
-        # Focus
         self.install_focusable_elements(
             self.ui.back_button,
-            *photos_buttons_list,
+            *self.photos_buttons_list,
             self.ui.next_interval_pushButton,
             self.ui.delete_interval_pushButton)
 
         self.start_focus = self.ui.next_interval_pushButton
 
+    def on_photos_load_failed(self, error):
+        logging.error(f"Failed to load photos of interval {self.interval.get_full_name()}: {error}")
+
     def goto_well(self):
         self.switch_interface(WindowType.WELL_WINDOW, self.project, self.well)
 
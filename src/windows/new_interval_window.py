@@ -11,13 +11,6 @@ class NewIntervalWindow(BaseWindow):
         self.ui = Ui_NewIntervalForm()
         self.ui.setupUi(self.central_widget)
 
-        self.project = project
-        self.well = well
-        self.interval_settings = interval_settings
-
-        self.ui.project_name_label.setText(self.project.name)
-        self.ui.well_name_label.setText(self.well.name)
-
         self.ui.back_button.clicked.connect(self.goto_well)
 
         self.custom_interval_from = CustomSpinBox(
@@ -38,15 +31,6 @@ class NewIntervalWindow(BaseWindow):
             float(self.get_config().get("logic", "interval_button_step", fallback="0.05"))
         )
 
-        self.custom_interval_from.setValue(self.interval_settings.interval_from)
-        self.custom_interval_to.setValue(self.interval_settings.interval_to)
-
-        self.ui.is_marked_checkBox.setChecked(self.interval_settings.is_marked)
-        if self.interval_settings.condition == IntervalCondition.WET:
-            self.ui.wet_radioButton.setChecked(True)
-        else:
-            self.ui.dry_radioButton.setChecked(True)
-
         self.ui.create_new_interval_button.clicked.connect(self.goto_photo_review)
 
         # Focus
@@ -59,6 +43,26 @@ class NewIntervalWindow(BaseWindow):
             self.ui.dry_radioButton,
             self.ui.create_new_interval_button)
 
+        self.rebind(project, well, interval_settings)
+
+    def rebind(self, project, well, interval_settings):
+        self.binding += 1
+        self.project = project
+        self.well = well
+        self.interval_settings = interval_settings
+
+        self.ui.project_name_label.setText(self.project.name)
+        self.ui.well_name_label.setText(self.well.name)
+
+        self.custom_interval_from.setValue(self.interval_settings.interval_from)
+        self.custom_interval_to.setValue(self.interval_settings.interval_to)
+
+        self.ui.is_marked_checkBox.setChecked(self.interval_settings.is_marked)
+        if self.interval_settings.condition == IntervalCondition.WET:
+            self.ui.wet_radioButton.setChecked(True)
+        else:
+            self.ui.dry_radioButton.setChecked(True)
+
         self.start_focus = self.ui.create_new_interval_button
 
     def goto_well(self):
@@ -1,5 +1,7 @@
 from src.windows.base_window import BaseWindow
 from src.core.window_types import WindowType
+from src.models.well import Well
+from src.utils.data_base_manager import DataBaseManager
 
 from resources.py.NewWellForm import Ui_NewWellForm
 
@@ -28,12 +30,23 @@ class NewWellWindow(BaseWindow):
     def on_create_new_well_clicked(self):
         well_name = self.ui.well_name_input.text()
         if well_name:
-            new_well_id = self.get_database_manager().add_well(well_name)
-            new_well = self.get_database_manager().get_well(new_well_id)
-            self.goto_well(new_well)
+            self.ui.create_new_well.setEnabled(False)
+            self.get_database_service().write(DataBaseManager.add_well, well_name).then(
+                lambda new_well_id: self.on_well_added(new_well_id, well_name),
+                self.on_well_add_failed)
         else:
             self.ui.error_message_label.setText("Название скважины не может быть пустое.")
 
+    def on_well_added(self, new_well_id, well_name):
+        if new_well_id is None:
+            self.on_well_add_failed(None)
+            return
+        self.goto_well(Well(new_well_id, well_name))
+
+    def on_well_add_failed(self, error):
+        self.ui.create_new_well.setEnabled(True)
+        self.ui.error_message_label.setText("Не удалось создать скважину.")
+
     def goto_project(self):
         self.switch_interface(WindowType.PROJECT_WINDOW, self.project)
 
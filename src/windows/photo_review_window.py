@@ -1,50 +1,67 @@
-import asyncio
-import logging
 import os.path
+from functools import partial
 
-from PIL import Image
-
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtCore import Qt, QTimer, pyqtSlot
 from PyQt5.QtGui import QPixmap, QMovie
+from PyQt5.QtWidgets import QLabel
 
+from src.custom_elements.pixmap_scaler import PixmapScaler
 from src.windows.base_window import BaseWindow, resource_path
 from src.core.window_types import WindowType
+from src.utils.photo_manager.base_photo_manager import STORAGE_LAYOUT_NAMED
+from src.utils.qt_future import gather
+from src.utils.qt_image import pil_to_qimage
+from src.utils.tracing import span, tracer
 from resources.py.PhotoReviewForm import Ui_PhotoReviewForm
 
+REVIEW_LAYOUT_SEQUENTIAL = 'sequential'
+REVIEW_LAYOUT_SIDE_BY_SIDE = 'side_by_side'
+
 
 class PhotoReviewWindow(BaseWindow):
     def __init__(self, project, well, interval_settings, app_instance, parent=None):
         super().__init__(app_instance, parent)
 
-        self.project = project
-        self.well = well
-        self.interval_settings = interval_settings
-
-        self.photos = None
-        self.current_photo_index = 0
-
         self.ui = Ui_PhotoReviewForm()
         self.ui.setupUi(self.central_widget)
+        # One label per camera in the side by side layout, only the first one in the sequential layout
+        self.photo_labels = [self.ui.photo_label]
+        self.photo_scalers = [PixmapScaler(self.ui.photo_label, parent=self)]
 
         self.ui.yes_pushButton.clicked.connect(self.on_yes_clicked)
         self.ui.no_pushButton.clicked.connect(self.on_no_clicked)
 
-        if self.get_photo_manager():
-            self.photo_thread = PhotoThread(
-                self.get_photo_manager(),
-                project,
-                well,
-                int(self.get_config().get('camera', 'width', fallback=0)),
-                int(self.get_config().get('camera', 'height', fallback=0)))
-            self.photo_thread.photos_ready.connect(self.update_photos)
-            self.photo_thread.start()
+        self.loading_movie = QMovie(resource_path(os.path.join("resources", "animations", "loading.gif")))
+
+        self.waiting_for_photo_manager = False
+        self.app.photo_manager_ready.connect(self.on_photo_manager_ready)
+
+        self.rebind(project, well, interval_settings)
 
+    def rebind(self, project, well, interval_settings):
+        """Starts the review of the photos of another interval."""
+        self.binding += 1
+        self.project = project
+        self.well = well
+        self.interval_settings = interval_settings
+
+        self.photos = None
+        self.previews = []
+        self.preview_pixmaps = []
+        self.current_photo_index = 0
+        self.processing = None
+        self.capture = None
+        self.waiting_for_photo_manager = False
+        self.side_by_side = self.get_config().get(
+            'preview', 'review_layout', fallback=REVIEW_LAYOUT_SEQUENTIAL) == REVIEW_LAYOUT_SIDE_BY_SIDE
+        self.show_photo_labels(1)
+
+        if self.get_photo_manager() or self.app.camera_discovery_running:
             # Блокировка кнопок
             self.ui.yes_pushButton.setEnabled(False)
             self.ui.no_pushButton.setEnabled(False)
 
             # Показать анимацию загрузки
-            self.loading_movie = QMovie(resource_path(os.path.join("resources", "animations", "loading.gif")))
             self.ui.photo_label.setMovie(self.loading_movie)
             self.loading_movie.start()
 
@@ -54,116 +71,174 @@ class PhotoReviewWindow(BaseWindow):
                 self.ui.no_pushButton)
 
             self.start_focus = self.ui.yes_pushButton
+
+            if self.get_photo_manager():
+                self.start_capture()
+            else:
+                # Camera discovery is still running, capture as soon as it finishes
+                self.waiting_for_photo_manager = True
         else:
-            self.ui.photo_label.setText("Камеры не подключены")
-            self.ui.yes_pushButton.setEnabled(False)
+            self.show_cameras_unavailable()
+
+    def start_capture(self):
+        self.capture = self.get_pre_capture_scheduler().capture(
+            self.project,
+            self.well,
+            self.interval_settings,
+            int(self.get_config().get('camera', 'width', fallback=0)),
+            int(self.get_config().get('camera', 'height', fallback=0)))
+        if self.capture.is_done():
+            QTimer.singleShot(0, partial(self.bound(self.update_photos), self.capture.photos))
+        else:
+            self.capture.photos_ready.connect(self.bound(self.update_photos))
+
+    @pyqtSlot(object)
+    def on_photo_manager_ready(self, photo_manager):
+        if not self.waiting_for_photo_manager:
+            return
+        self.waiting_for_photo_manager = False
+        if photo_manager:
+            self.start_capture()
+        else:
+            self.show_cameras_unavailable()
 
-            self.install_focusable_elements(self.ui.no_pushButton)
-            self.start_focus = self.ui.no_pushButton
+    def show_cameras_unavailable(self):
+        self.loading_movie.stop()
+        self.ui.photo_label.setText("Камеры не подключены")
+        self.ui.yes_pushButton.setEnabled(False)
+        self.ui.no_pushButton.setEnabled(True)
 
+        self.install_focusable_elements(self.ui.no_pushButton)
+        self.start_focus = self.ui.no_pushButton
+        self.ui.no_pushButton.setFocus()
 
     @pyqtSlot(list)
     def update_photos(self, photos):
-        self.photos = photos
-        self.current_photo_index = 0
-        if self.photos:
-            for photo in self.photos:
-                try:
-                    crop_image(
-                        photo,
-                        int(self.get_config().get("crop", "left", fallback=0)),
-                        int(self.get_config().get("crop", "right", fallback=0)),
-                        int(self.get_config().get("crop", "top", fallback=0)),
-                        int(self.get_config().get("crop", "bottom", fallback=0)))
-                except Exception as e:
-                    self.ui.photo_label.setText(f"Ошибка при обработке фото: {str(e)}")
-                    self.ui.no_pushButton.setEnabled(True)
-                    self.ui.no_pushButton.setFocus()
-                    return
-            self.load_image()
-            self.ui.yes_pushButton.setEnabled(True)
-            self.ui.yes_pushButton.setFocus()
-            self.ui.no_pushButton.setEnabled(True)
-        else:
+        """Shows the photos of a capture as the processing of each camera finishes."""
+        if not photos:
+            self.loading_movie.stop()
             self.ui.photo_label.setText("Фотографии не найдены.")
+            self.ui.no_pushButton.setEnabled(True)
+            self.ui.no_pushButton.setFocus()
+            return
+        # The rig advances once the photos are taken, so the next interval can be captured during the review
+        self.get_pre_capture_scheduler().schedule(
+            self.project,
+            self.well,
+            self.interval_settings.get_next_settings(
+                float(self.get_config().get('logic', 'interval_step', fallback='0.5'))),
+            int(self.get_config().get('camera', 'width', fallback=0)),
+            int(self.get_config().get('camera', 'height', fallback=0)))
+        # The capture started cropping every camera in parallel as soon as the photos were taken
+        if self.capture.processing_error is not None:
+            self.on_processing_failed(self.capture.processing_error)
+            return
+        processing = self.capture.processing
+        self.photos = [None] * len(processing)
+        self.previews = [None] * len(processing)
+        self.preview_pixmaps = [None] * len(processing)
+        self.show_photo_labels(len(processing) if self.side_by_side else 1)
+        for index, future in enumerate(processing):
+            future.then(self.bound(partial(self.on_photo_processed, index)))
+        self.processing = gather(processing).then(
+            self.bound(self.on_photos_processed), self.bound(self.on_processing_failed))
+
+    def on_photo_processed(self, index, processed_photo):
+        """Shows the preview of one camera as soon as it is ready, without waiting for the others."""
+        self.photos[index] = processed_photo.path
+        self.previews[index] = processed_photo.preview
+        with span('QPixmap load', 'ui', camera=index):
+            self.preview_pixmaps[index] = QPixmap.fromImage(pil_to_qimage(processed_photo.preview))
+        if self.side_by_side or index == self.current_photo_index:
+            self.load_image()
 
-
+    @pyqtSlot(object)
+    def on_photos_processed(self, processed_photos):
+        """Enables the confirmation once every camera has been cropped."""
+        self.loading_movie.stop()
+        self.photos = [processed_photo.path for processed_photo in processed_photos]
+        self.previews = [processed_photo.preview for processed_photo in processed_photos]
+        for processed_photo in processed_photos:
+            self.capture.session.set_processed(processed_photo)
+        self.current_photo_index = 0
+        self.load_image()
+        self.ui.yes_pushButton.setEnabled(True)
+        self.ui.yes_pushButton.setFocus()
+        self.ui.no_pushButton.setEnabled(True)
+
+    @pyqtSlot(object)
+    def on_processing_failed(self, error):
+        self.loading_movie.stop()
+        self.show_photo_labels(1)
+        self.ui.photo_label.setText(f"Ошибка при обработке фото: {str(error)}")
+        self.ui.no_pushButton.setEnabled(True)
+        self.ui.no_pushButton.setFocus()
+
+    def show_photo_labels(self, count):
+        """Clears the photo labels and shows the first count of them, creating the missing ones."""
+        while len(self.photo_labels) < count:
+            label = QLabel(self.central_widget)
+            label.setAlignment(Qt.AlignCenter)
+            self.ui.photos_layout.addWidget(label)
+            self.photo_labels.append(label)
+            self.photo_scalers.append(PixmapScaler(label, parent=self))
+        for index, (label, scaler) in enumerate(zip(self.photo_labels, self.photo_scalers)):
+            scaler.clear()
+            if index > 0:
+                label.clear()
+            label.setVisible(index < count)
 
     def on_yes_clicked(self):
-        if self.current_photo_index < len(self.photos) - 1:
+        if not self.side_by_side and self.current_photo_index < len(self.photos) - 1:
             self.current_photo_index += 1
             self.load_image()
         else:
-            new_interval_id = self.get_database_manager().add_interval(self.well.id, self.interval_settings)
-            new_interval = self.get_database_manager().get_interval(new_interval_id)
-
-            permanent_photo_paths = self.get_photo_manager().save_photos_to_permanent_storage(
-                self.project,
-                self.well,
-                new_interval)
-
-            for path in permanent_photo_paths:
-                self.get_database_manager().add_photo(path, new_interval.id)
-
-            self.goto_interval(new_interval)
+            self.ui.yes_pushButton.setEnabled(False)
+            self.ui.no_pushButton.setEnabled(False)
+            photo_manager = self.get_photo_manager()
+            project, well, session = self.project, self.well, self.capture.session
+            layout = self.get_config().get('storage', 'layout', fallback=STORAGE_LAYOUT_NAMED)
+            # Photos are named after the interval version inside its transaction and moved once it is committed
+            self.get_database_service().write(
+                photo_manager.commit_interval, project, well, self.interval_settings, session, layout
+            ).then(self.bound(self.on_interval_committed), self.bound(self.on_interval_commit_failed))
+
+    def on_interval_committed(self, new_interval):
+        self.store_previews(self.capture.session)
+        self.capture.discard()
+        tracer.flush_interval(f"{self.well.name}_{new_interval.get_full_name()}")
+        self.goto_interval(new_interval)
+
+    def store_previews(self, session):
+        """Keeps the previews shown during the review as the previews of the moved photos."""
+        destinations = {target['source']: target['destination'] for target in session.targets}
+        for photo, preview, pixmap in zip(self.photos, self.previews, self.preview_pixmaps):
+            destination = destinations.get(os.path.basename(photo))
+            if destination:
+                self.get_preview_cache().store(self.project, destination, preview, pixmap)
+
+    def on_interval_commit_failed(self, error):
+        self.show_photo_labels(1)
+        self.ui.photo_label.setText(f"Ошибка при сохранении интервала: {str(error)}")
+        self.ui.no_pushButton.setEnabled(True)
+        self.ui.no_pushButton.setFocus()
 
     def on_no_clicked(self):
-        if self.get_photo_manager():
-            self.get_photo_manager().clear_temp_storage()
+        if self.capture:
+            self.capture.discard()
+            self.get_pre_capture_scheduler().cancel()
         self.goto_new_interval()
 
     def load_image(self):
-        if self.photos:
-            pixmap = QPixmap(self.photos[self.current_photo_index])
-            scaled_pixmap = pixmap.scaled(self.ui.photo_label.size(), Qt.KeepAspectRatio,
-                                          Qt.SmoothTransformation)
-            self.ui.photo_label.setPixmap(scaled_pixmap)
-
-    # def showEvent(self, event):
-    #     super().showEvent(event)
-    #     self.load_image()
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        if hasattr(self, 'ui'):
-            self.load_image()
+        if self.side_by_side:
+            for scaler, pixmap in zip(self.photo_scalers, self.preview_pixmaps):
+                if pixmap is not None:
+                    scaler.set_pixmap(pixmap)
+        elif self.preview_pixmaps and self.preview_pixmaps[self.current_photo_index] is not None:
+            self.photo_scalers[0].set_pixmap(self.preview_pixmaps[self.current_photo_index])
 
     def goto_interval(self, interval):
         self.switch_interface(WindowType.INTERVAL_WINDOW, self.project, self.well, interval)
 
     def goto_new_interval(self):
         self.switch_interface(WindowType.NEW_INTERVAL_WINDOW, self.project, self.well, self.interval_settings)
-
-
-class PhotoThread(QThread):
-    photos_ready = pyqtSignal(list)
-
-    def __init__(self, photo_manager, project, well, width, height, parent=None):
-        super().__init__(parent)
-        self.photo_manager = photo_manager
-        self.project = project
-        self.well = well
-        self.width = width
-        self.height = height
-
-    def run(self):
-        """Запускает event loop asyncio и получает фотографии асинхронно."""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        photos = loop.run_until_complete(self.photo_manager.take_photos(self.project, self.well, self.height))
-        loop.close()
-        self.photos_ready.emit(photos)
-
-
-def crop_image(file_path, left, right, top, bottom):
-    try:
-        with Image.open(file_path) as img:
-            width, height = img.size
-
-            crop_area = (left, top, width - right, height - bottom)
-            cropped_img = img.crop(crop_area)
-            cropped_img.save(file_path, quality=95)
-    except Exception as e:
-        logging.error(f"Error while cropp {file_path}: {str(e)}")
-        raise
-
@@ -1,8 +1,9 @@
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap
+import logging
 
+from src.custom_elements.pixmap_scaler import PixmapScaler
 from src.windows.base_window import BaseWindow
 from src.core.window_types import WindowType
+from src.utils.preview_cache import SCREEN, THUMBNAIL
 
 from resources.py.PhotoViewForm import Ui_PhotoViewForm
 
@@ -14,9 +15,11 @@ class PhotoViewWindow(BaseWindow):
         self.well = well
         self.interval = interval
         self.photo = photo
+        self.screen_preview_shown = False
 
         self.ui = Ui_PhotoViewForm()
         self.ui.setupUi(self.central_widget)
+        self.photo_scaler = PixmapScaler(self.ui.photo_label, parent=self)
 
         self.ui.back_pushButton.clicked.connect(self.goto_interval)
 
@@ -25,19 +28,33 @@ class PhotoViewWindow(BaseWindow):
             self.ui.back_pushButton)
 
     def load_image(self):
-        pixmap = QPixmap(self.photo.path)
-        scaled_pixmap = pixmap.scaled(self.ui.photo_label.size(), Qt.KeepAspectRatio,
-                                      Qt.SmoothTransformation)
-        self.ui.photo_label.setPixmap(scaled_pixmap)
+        """Shows the screen preview, with the stored thumbnail as a placeholder while it loads."""
+        preview_cache = self.get_preview_cache()
+        pixmap = preview_cache.get_cached(self.photo.path, SCREEN)
+        if pixmap is not None:
+            self.on_screen_preview_loaded(pixmap)
+            return
+        # The thumbnail is small and read first; it is never generated here, the screen preview request does that
+        preview_cache.load(self.project, self.photo.path, THUMBNAIL, generate=False).then(self.on_thumbnail_loaded)
+        preview_cache.load(self.project, self.photo.path, SCREEN).then(
+            self.on_screen_preview_loaded, self.on_preview_failed)
+
+    def on_thumbnail_loaded(self, pixmap):
+        if pixmap is not None and not self.screen_preview_shown:
+            self.photo_scaler.set_pixmap(pixmap)
+
+    def on_screen_preview_loaded(self, pixmap):
+        self.screen_preview_shown = True
+        self.photo_scaler.set_pixmap(pixmap)
+
+    def on_preview_failed(self, error):
+        logging.error(f"Failed to load preview of {self.photo.path}: {error}")
+        self.photo_scaler.clear()
+        self.ui.photo_label.setText("Не удалось загрузить фото.")
 
     def showEvent(self, event):
         super().showEvent(event)
         self.load_image()
 
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        if hasattr(self, 'ui'):
-            self.load_image()
-
     def goto_interval(self):
         self.switch_interface(WindowType.INTERVAL_WINDOW, self.project, self.well, self.interval)
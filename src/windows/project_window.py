@@ -1,3 +1,4 @@
+import logging
 from functools import partial
 
 from PyQt5.QtWidgets import QSpacerItem, QSizePolicy
@@ -6,6 +7,9 @@ from PyQt5 import QtCore, QtWidgets
 
 from src.windows.base_window import BaseWindow
 from src.core.window_types import WindowType
+from src.utils.data_base_manager import DataBaseManager
+from src.utils.integrity_scanner import IntegrityScanner, MISSING, ORPHAN, CORRUPT, ORPHAN_PREVIEW
+from src.utils.qt_future import run_in_thread
 
 from resources.py.ProjectForm import Ui_ProjectForm
 
@@ -25,9 +29,23 @@ class ProjectWindow(BaseWindow):
 
         self.ui.new_well_button.clicked.connect(self.goto_new_well)
 
-        wells_buttons_list = []
+        self.ui.scan_button.clicked.connect(self.on_scan_clicked)
+        # The report of the last scan; the next click fixes what it found
+        self.scan_report = None
+
+        # Focus
+        self.install_focusable_elements(
+            self.ui.back_button,
+            self.ui.new_well_button,
+            self.ui.scan_button)
 
-        wells = self.get_database_manager().get_all_wells()
+        self.start_focus = self.ui.new_well_button
+
+        self.get_database_service().read(DataBaseManager.get_all_wells).then(
+            self.on_wells_loaded, self.on_wells_load_failed)
+
+    def on_wells_loaded(self, wells):
+        wells_buttons_list = []
         for well in wells:
             well_button = QPushButton(well.name)
             self.ui.wells_buttons_verticalLayout.layout().addWidget(well_button)
@@ -37,14 +55,48 @@ class ProjectWindow(BaseWindow):
         spacer = QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding)
         self.ui.wells_buttons_verticalLayout.addItem(spacer)
 
-        # Focus
         self.install_focusable_elements(
             self.ui.back_button,
             self.ui.new_well_button,
+            self.ui.scan_button,
             *wells_buttons_list)
 
         self.start_focus = self.ui.new_well_button
 
+    def on_wells_load_failed(self, error):
+        logging.error(f"Failed to load wells of project {self.project.name}: {error}")
+
+    def on_scan_clicked(self):
+        fix = self.scan_report is not None and self.scan_report.can_fix()
+        scanner = IntegrityScanner(
+            self.project,
+            workers=int(self.get_config().get('integrity', 'workers', fallback='4')),
+            verify=self.get_config().get('integrity', 'verify', fallback='false').lower() == 'true',
+            fix=fix)
+        self.ui.scan_button.setEnabled(False)
+        self.ui.scan_status_label.setText("Исправление файлов..." if fix else "Проверка файлов...")
+        run_in_thread(scanner.run, name='IntegrityScanner').then(self.on_scan_finished, self.on_scan_failed)
+
+    def on_scan_finished(self, report):
+        self.scan_report = report
+        counts = report.counts
+        if not any(counts[problem] for problem in (MISSING, ORPHAN, CORRUPT, ORPHAN_PREVIEW)):
+            text = f"Проверено фотографий: {report.photos}. Проблем не найдено."
+        else:
+            text = (f"Проверено фотографий: {report.photos}. Отсутствуют: {counts[MISSING]}, "
+                    f"лишние файлы: {counts[ORPHAN]}, повреждены: {counts[CORRUPT]}, "
+                    f"лишние превью: {counts[ORPHAN_PREVIEW]}.")
+            if report.can_fix():
+                text += " Нажмите «Исправить», чтобы исправить найденное."
+        self.ui.scan_status_label.setText(text)
+        self.ui.scan_button.setText("Исправить" if report.can_fix() else "Проверить файлы")
+        self.ui.scan_button.setEnabled(True)
+
+    def on_scan_failed(self, error):
+        logging.error(f"Integrity scan of project {self.project.name} failed: {error}")
+        self.ui.scan_status_label.setText(f"Ошибка при проверке файлов: {str(error)}")
+        self.ui.scan_button.setEnabled(True)
+
     def close_project(self):
         self.app.close_database_connection()
         self.goto_start()
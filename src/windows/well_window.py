@@ -1,21 +1,23 @@
-from functools import partial
+import logging
 
-from PyQt5.QtWidgets import QSpacerItem, QSizePolicy
-from PyQt5.QtWidgets import QPushButton
+from PyQt5.QtCore import Qt, QEvent
 
 from src.windows.base_window import BaseWindow
 from src.core.window_types import WindowType
+from src.custom_elements.lazy_list_model import LazyListModel
 from src.models.interval import BaseIntervalSettings
+from src.utils.data_base_manager import DataBaseManager
 
 from resources.py.WellForm import Ui_WellForm
 
+INTERVALS_PAGE_SIZE = 100
+
 
 class WellWindow(BaseWindow):
     def __init__(self, project, well, app_instance, parent=None):
         super().__init__(app_instance, parent)
         self.ui = Ui_WellForm()
         self.ui.setupUi(self.central_widget)
-        self.set_scroll_area(self.ui.scrollArea)
 
         self.project = project
         self.well = well
@@ -23,35 +25,69 @@ class WellWindow(BaseWindow):
         self.ui.project_name_label.setText(project.name)
         self.ui.well_name_label.setText(self.well.name)
 
-        self.focusable_elements.append(self.ui.back_button)
-
-        intervals_buttons_list = []
-
-        self.intervals = self.get_database_manager().get_all_intervals_by_well_id(self.well.id)
-        for interval in self.intervals:
-            interval_button = QPushButton(interval.get_full_name())
-            self.ui.intervals_buttons_verticalLayout.layout().addWidget(interval_button)
-            intervals_buttons_list.append(interval_button)
-            interval_button.clicked.connect(partial(self.goto_interval, interval))
+        self.last_interval = None
 
         self.ui.back_button.clicked.connect(self.goto_project)
         self.ui.new_interval_button.clicked.connect(self.goto_new_interval)
         self.ui.delete_well_pushButton.clicked.connect(self.goto_delete_well)
 
-        spacer = QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding)
-        self.ui.intervals_buttons_verticalLayout.addItem(spacer)
+        # Intervals are loaded from the database page by page as the list is scrolled
+        self.intervals_model = LazyListModel(self.fetch_intervals_page, lambda interval: interval.get_full_name(),
+                                             INTERVALS_PAGE_SIZE, self)
+        self.ui.intervals_listView.setModel(self.intervals_model)
+        self.ui.intervals_listView.clicked.connect(self.on_interval_activated)
+        self.intervals_model.fetchMore()
+
+        # The next interval follows the last one, so it cannot be started before it is loaded
+        self.ui.new_interval_button.setEnabled(False)
+        self.get_database_service().read(DataBaseManager.get_last_interval_by_well_id, self.well.id).then(
+            self.on_last_interval_loaded, self.on_last_interval_load_failed)
+        self.get_database_service().read(DataBaseManager.get_well_size, self.well.id).then(self.on_well_size_loaded)
 
         # Focus
         self.install_focusable_elements(
             self.ui.back_button,
             self.ui.new_interval_button,
-            *intervals_buttons_list,
+            self.ui.intervals_listView,
             self.ui.delete_well_pushButton)
 
+        self.start_focus = self.ui.back_button
+
+    def on_well_size_loaded(self, size):
+        if size:
+            self.ui.well_name_label.setText(f"{self.well.name} ({size / (1024 * 1024):.1f} МБ)")
+
+    def fetch_intervals_page(self, last_interval, limit):
+        return self.get_database_service().read(
+            DataBaseManager.get_intervals_page_by_well_id,
+            self.well.id,
+            last_interval.id if last_interval else 0,
+            limit)
+
+    def on_last_interval_loaded(self, last_interval):
+        self.last_interval = last_interval
         self.start_focus = self.ui.new_interval_button
+        self.ui.new_interval_button.setEnabled(True)
+        if self.focusWidget() in (None, self.ui.back_button):
+            self.ui.new_interval_button.setFocus()
+
+    def on_last_interval_load_failed(self, error):
+        logging.error(f"Failed to load intervals of well {self.well.name}: {error}")
+
+    def eventFilter(self, source, event):
+        if (source is self.ui.intervals_listView and event.type() == QEvent.KeyPress
+                and event.key() in (Qt.Key_Return, Qt.Key_Enter, Qt.Key_Space)):
+            self.on_interval_activated(self.ui.intervals_listView.currentIndex())
+            return True
+        return super().eventFilter(source, event)
+
+    def on_interval_activated(self, index):
+        interval = self.intervals_model.item(index)
+        if interval is not None:
+            self.goto_interval(interval)
 
     def goto_new_interval(self):
-        last_interval = self.intervals[-1] if self.intervals else None
+        last_interval = self.last_interval
         self.switch_interface(
             WindowType.NEW_INTERVAL_WINDOW,
             self.project,